@@ -0,0 +1,7 @@
+# grades/admin.py
+from django.contrib import admin
+from .models import GradeComponent, GradeEntry, FinalGrade
+
+admin.site.register(GradeComponent)
+admin.site.register(GradeEntry)
+admin.site.register(FinalGrade)
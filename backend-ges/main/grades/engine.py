@@ -0,0 +1,143 @@
+# grades/engine.py
+"""
+Set-based grade computation.
+
+Final grades, GPAs and rankings are each produced by one grouped query over the
+whole selection (a subject, a program or everything) rather than a Python loop per
+student, so term-end processing scales with the database, not with the number of
+students. The only per-row Python work is building the rows handed to a batched
+upsert.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, ExpressionWrapper, F, FloatField, Sum, Value, When, Window
+from django.db.models.functions import Cast, Rank
+from django.utils import timezone
+
+from students.term import invalidate_terms
+from .models import GradeEntry, FinalGrade
+
+UPSERT_BATCH_SIZE = 1000
+DEFAULT_PERIOD_WEIGHTS = {'prelim': 1, 'midterm': 1, 'finals': 1}
+TWO_PLACES = Decimal('0.01')
+
+
+def _period_weight():
+    weights = getattr(settings, 'GRADING_PERIOD_WEIGHTS', DEFAULT_PERIOD_WEIGHTS)
+    return Case(
+        *[When(period=period, then=Value(float(weight))) for period, weight in weights.items()],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def final_grade_rows(subject_ids=None, student_ids=None, program_id=None):
+    """
+    Yields (student_id, subject_id, score) computed as the component- and period-weighted
+    mean of every recorded entry: sum(period_w * component_w * score) / sum(period_w * component_w).
+    """
+    entries = GradeEntry.objects.all()
+    if subject_ids is not None:
+        entries = entries.filter(component__subject_id__in=subject_ids)
+    if student_ids is not None:
+        entries = entries.filter(student_id__in=student_ids)
+    if program_id is not None:
+        entries = entries.filter(component__subject__program_id=program_id)
+
+    weight = ExpressionWrapper(F('component__weight') * _period_weight(), output_field=FloatField())
+    rows = (
+        entries.values('student_id', 'component__subject_id')
+        .annotate(
+            weighted=Sum(weight * F('score'), output_field=FloatField()),
+            total=Sum(weight, output_field=FloatField()),
+        )
+        .filter(total__gt=0)
+        .order_by()
+        .values_list('student_id', 'component__subject_id', 'weighted', 'total')
+    )
+    for student_id, subject_id, weighted, total in rows.iterator(chunk_size=UPSERT_BATCH_SIZE):
+        yield student_id, subject_id, Decimal(weighted / total).quantize(TWO_PLACES, ROUND_HALF_UP)
+
+
+def compute_final_grades(subject_ids=None, student_ids=None, program_id=None, progress=None):
+    """
+    Recomputes and upserts FinalGrade rows for the selection, then drops rows in the
+    selection that no longer have any entries. Returns the number of rows written.
+
+    Each batch of UPSERT_BATCH_SIZE rows commits on its own, so a long run never
+    holds one transaction open and `progress`, if given, is called with the number
+    of rows written after every batch (background jobs pass `job.set_progress`).
+    Every row is recomputed from scratch, so a run that fails part way is simply
+    run again; stale rows are only dropped once every batch has been written.
+    """
+    started = timezone.now()
+    written = 0
+    batch = []
+    for student_id, subject_id, score in final_grade_rows(subject_ids, student_ids, program_id):
+        batch.append(FinalGrade(student_id=student_id, subject_id=subject_id, score=score))
+        if len(batch) >= UPSERT_BATCH_SIZE:
+            written += _upsert(batch, progress, written)
+            batch = []
+    if batch:
+        written += _upsert(batch, progress, written)
+
+    stale = FinalGrade.objects.filter(computed_at__lt=started)
+    if subject_ids is not None:
+        stale = stale.filter(subject_id__in=subject_ids)
+    if student_ids is not None:
+        stale = stale.filter(student_id__in=student_ids)
+    if program_id is not None:
+        stale = stale.filter(subject__program_id=program_id)
+    with transaction.atomic():
+        touched = list(stale.values_list('student_id', flat=True))
+        stale.delete()
+    invalidate_terms(touched)
+    return written
+
+
+def _upsert(batch, progress, written):
+    FinalGrade.objects.bulk_create(
+        batch,
+        update_conflicts=True,
+        unique_fields=['student', 'subject'],
+        update_fields=['score', 'computed_at'],
+    )
+    # bulk_create sends no post_save, so cached "my term" views are dropped here.
+    invalidate_terms(row.student_id for row in batch)
+    if progress is not None:
+        progress(written + len(batch))
+    return len(batch)
+
+
+def gpa_queryset(program_id=None, student_ids=None):
+    """
+    One row per student with `credits`, `gpa` (credit-weighted mean of final grades)
+    and `rank` (1 = highest GPA, ties share a rank) within the selection.
+    """
+    finals = FinalGrade.objects.all()
+    if program_id is not None:
+        finals = finals.filter(student__user__program_id=program_id)
+    if student_ids is not None:
+        finals = finals.filter(student_id__in=student_ids)
+    return (
+        finals.values('student_id', 'student__user__student_id')
+        .annotate(
+            credits=Sum('subject__credits'),
+            points=Sum(Cast('score', FloatField()) * F('subject__credits'), output_field=FloatField()),
+        )
+        .annotate(gpa=ExpressionWrapper(F('points') / F('credits'), output_field=FloatField()))
+        .annotate(rank=Window(expression=Rank(), order_by=F('gpa').desc()))
+        .order_by('rank', 'student_id')
+    )
+
+
+def subject_ranking_queryset(subject_id):
+    """Final grades of one subject (a class section) ranked highest first."""
+    return (
+        FinalGrade.objects.filter(subject_id=subject_id)
+        .values('student_id', 'student__user__student_id', 'score')
+        .annotate(rank=Window(expression=Rank(), order_by=F('score').desc()))
+        .order_by('rank', 'student_id')
+    )
@@ -0,0 +1,142 @@
+# grades/importer.py
+"""
+Streaming grade import.
+
+Rows flow through a chain of generators (file reader -> chunker -> validator ->
+batched upsert), so memory use is bounded by one chunk however large the upload
+is. Each chunk costs one student lookup (by the user's student_id) and one bulk
+upsert.
+"""
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from students.models import Student
+from students.term import invalidate_terms
+from .models import GradeComponent, GradeEntry, PERIOD_CHOICES
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+REQUIRED_COLUMNS = ('student_id', 'component', 'period', 'score')
+PERIODS = {value for value, _ in PERIOD_CHOICES}
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+def read_csv(fileobj):
+    """Yields (line_number, row_dict) from a binary CSV upload."""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(text)
+    _check_columns(reader.fieldnames or [])
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_xlsx(fileobj):
+    """Yields (row_number, row_dict) from the first sheet of an XLSX upload."""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFormatError("XLSX import requires the openpyxl package; upload a CSV file instead.")
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else '' for cell in next(rows, ())]
+        _check_columns(header)
+        for number, values in enumerate(rows, start=2):
+            yield number, {name: ('' if value is None else str(value)) for name, value in zip(header, values)}
+    finally:
+        workbook.close()
+
+
+def read_upload(fileobj, name):
+    """Picks the reader for an upload by its file name."""
+    return read_xlsx(fileobj) if name.lower().endswith('.xlsx') else read_csv(fileobj)
+
+
+def _check_columns(columns):
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ImportFormatError(f"Missing column(s): {', '.join(missing)}.")
+
+
+def chunked(rows, size=CHUNK_SIZE):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _parse(row, components):
+    component = components.get((row.get('component') or '').strip().casefold())
+    if component is None:
+        return None, "Unknown component for this subject."
+    period = (row.get('period') or '').strip().lower()
+    if period not in PERIODS:
+        return None, f"Period must be one of: {', '.join(sorted(PERIODS))}."
+    try:
+        score = Decimal((row.get('score') or '').strip())
+    except InvalidOperation:
+        return None, "Score is not a number."
+    if not score.is_finite():  # NaN and sNaN parse, but cannot be compared
+        return None, "Score is not a number."
+    if not 0 <= score <= 100:
+        return None, "Score must be between 0 and 100."
+    return (component, period, score.quantize(Decimal('0.01'))), None
+
+
+def import_grades(rows, subject, progress=None):
+    """
+    Upserts grade entries for `subject` from an iterable of (line_number, row_dict).
+    Returns a summary with the number of rows written and a per-row error report
+    (capped at MAX_REPORTED_ERRORS entries; `error_count` is always exact).
+    `progress`, if given, is called with the number of rows read after each chunk.
+    """
+    components = {c.name.casefold(): c.id for c in GradeComponent.objects.filter(subject=subject)}
+    summary = {'imported': 0, 'error_count': 0, 'errors': []}
+
+    def report(line, student_id, message):
+        summary['error_count'] += 1
+        if len(summary['errors']) < MAX_REPORTED_ERRORS:
+            summary['errors'].append({'row': line, 'student_id': student_id, 'error': message})
+
+    read = 0
+    for chunk in chunked(rows):
+        codes = {(row.get('student_id') or '').strip() for _, row in chunk}
+        codes.discard('')
+        students = dict(
+            Student.objects.filter(user__student_id__in=codes, user__role='student').values_list('user__student_id', 'id')
+        )
+
+        entries = {}
+        for line, row in chunk:
+            code = (row.get('student_id') or '').strip()
+            if code not in students:
+                report(line, code, "Unknown student ID.")
+                continue
+            parsed, error = _parse(row, components)
+            if error:
+                report(line, code, error)
+                continue
+            component, period, score = parsed
+            # A later row for the same cell wins, as it would with row-by-row saves.
+            entries[students[code], component, period] = score
+
+        if entries:
+            GradeEntry.objects.bulk_create(
+                [GradeEntry(student_id=s, component_id=c, period=p, score=score) for (s, c, p), score in entries.items()],
+                update_conflicts=True,
+                unique_fields=['student', 'component', 'period'],
+                update_fields=['score', 'updated_at'],
+            )
+            invalidate_terms(student_pk for student_pk, _, _ in entries)
+            summary['imported'] += len(entries)
+        read += len(chunk)
+        if progress is not None:
+            progress(read)
+    return summary
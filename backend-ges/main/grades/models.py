@@ -0,0 +1,46 @@
+# grades/models.py
+from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db import models
+
+PERIOD_CHOICES = [
+    ('prelim', 'Prelim'),
+    ('midterm', 'Midterm'),
+    ('finals', 'Finals'),
+]
+
+class GradeComponent(models.Model):
+    subject = models.ForeignKey('programs.Subject', on_delete=models.CASCADE, related_name='grade_components')
+    name = models.CharField(max_length=100)
+    weight = models.DecimalField(max_digits=5, decimal_places=2, validators=[MinValueValidator(0), MaxValueValidator(100)])
+
+    class Meta:
+        unique_together = ('subject', 'name')
+
+    def __str__(self):
+        return f"{self.subject.course_code} - {self.name} ({self.weight}%)"
+
+class GradeEntry(models.Model):
+    student = models.ForeignKey('students.Student', on_delete=models.CASCADE, related_name='grade_entries')
+    component = models.ForeignKey(GradeComponent, on_delete=models.CASCADE, related_name='entries')
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    score = models.DecimalField(max_digits=5, decimal_places=2, validators=[MinValueValidator(0), MaxValueValidator(100)])
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('student', 'component', 'period')
+
+    def __str__(self):
+        return f"{self.student_id} - {self.component_id} {self.period}: {self.score}"
+
+class FinalGrade(models.Model):
+    # Written by grades.engine.compute_final_grades; never edited by hand.
+    student = models.ForeignKey('students.Student', on_delete=models.CASCADE, related_name='final_grades')
+    subject = models.ForeignKey('programs.Subject', on_delete=models.CASCADE, related_name='final_grades')
+    score = models.DecimalField(max_digits=5, decimal_places=2)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('student', 'subject')
+
+    def __str__(self):
+        return f"{self.student_id} - {self.subject_id}: {self.score}"
@@ -0,0 +1,47 @@
+# grades/serializers.py
+from django.db.models import Sum
+from rest_framework import serializers
+from programs.models import Subject
+from students.models import Student
+from .models import GradeComponent, GradeEntry, FinalGrade
+
+class GradeComponentSerializer(serializers.ModelSerializer):
+    subject_id = serializers.PrimaryKeyRelatedField(queryset=Subject.objects.all(), source='subject')
+
+    class Meta:
+        model = GradeComponent
+        fields = ['id', 'subject_id', 'name', 'weight']
+
+    def validate(self, data):
+        subject = data.get('subject', getattr(self.instance, 'subject', None))
+        weight = data.get('weight', getattr(self.instance, 'weight', 0))
+        others = GradeComponent.objects.filter(subject=subject)
+        if self.instance:
+            others = others.exclude(id=self.instance.id)
+        used = others.aggregate(total=Sum('weight'))['total'] or 0
+        if used + weight > 100:
+            raise serializers.ValidationError(f"Component weights for this subject would total {used + weight}%, above 100%.")
+        return data
+
+class GradeEntrySerializer(serializers.ModelSerializer):
+    student_id = serializers.PrimaryKeyRelatedField(queryset=Student.objects.all(), source='student')
+    component_id = serializers.PrimaryKeyRelatedField(queryset=GradeComponent.objects.all(), source='component')
+
+    class Meta:
+        model = GradeEntry
+        fields = ['id', 'student_id', 'component_id', 'period', 'score', 'updated_at']
+        read_only_fields = ['updated_at']
+
+class FinalGradeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FinalGrade
+        fields = ['id', 'student_id', 'subject_id', 'score', 'computed_at']
+        read_only_fields = fields
+
+class ComputeRequestSerializer(serializers.Serializer):
+    subject_id = serializers.IntegerField(required=False, min_value=1)
+    program_id = serializers.IntegerField(required=False, min_value=1)
+
+class GradeImportSerializer(serializers.Serializer):
+    subject_id = serializers.PrimaryKeyRelatedField(queryset=Subject.objects.all(), source='subject')
+    file = serializers.FileField()
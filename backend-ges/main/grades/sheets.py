@@ -0,0 +1,43 @@
+# grades/sheets.py
+from django.db.models import Q
+from programs.exports import keyset_chunks
+from students.models import Student
+from .models import GradeComponent, GradeEntry, FinalGrade, PERIOD_CHOICES
+
+
+def _grade_sheet_rows(subject, components):
+    """Yields one dict per student in the class: every component/period score plus the final grade."""
+    students = (
+        Student.objects.filter(Q(enrolled_subjects=subject) | Q(grade_entries__component__subject=subject))
+        .distinct()
+        .values('id', 'user__student_id', 'user__last_name', 'user__first_name')
+    )
+    for chunk in keyset_chunks(students):
+        ids = [row['id'] for row in chunk]
+        scores = {}
+        entries = GradeEntry.objects.filter(student_id__in=ids, component__subject=subject)
+        for student_id, component_id, period, score in entries.values_list('student_id', 'component_id', 'period', 'score'):
+            scores[student_id, component_id, period] = score
+        finals = dict(FinalGrade.objects.filter(student_id__in=ids, subject=subject).values_list('student_id', 'score'))
+        for row in chunk:
+            for component in components:
+                for period, _ in PERIOD_CHOICES:
+                    row[f'{component.id}:{period}'] = scores.get((row['id'], component.id, period))
+            row['final'] = finals.get(row['id'])
+            yield row
+
+
+def grade_sheet(subject):
+    """Returns `(rows, columns)` for a subject's grade sheet, ready for an export writer."""
+    components = list(GradeComponent.objects.filter(subject=subject).order_by('id'))
+    columns = [('user__student_id', 'student_id'), ('user__last_name', 'last_name'), ('user__first_name', 'first_name')]
+    columns += [
+        (f'{component.id}:{period}', f'{component.name} ({label})')
+        for component in components for period, label in PERIOD_CHOICES
+    ]
+    columns.append(('final', 'final'))
+    return _grade_sheet_rows(subject, components), columns
+
+
+def grade_sheet_filename(subject):
+    return f'{subject.course_code}-grades'
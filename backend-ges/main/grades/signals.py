@@ -0,0 +1,20 @@
+# grades/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from students.models import Student
+from students.term import invalidate_terms
+from .models import GradeComponent, GradeEntry
+
+
+# FinalGrade rows are only written by grades.engine, which invalidates in bulk.
+@receiver(post_save, sender=GradeEntry)
+@receiver(post_delete, sender=GradeEntry)
+def drop_cached_term(sender, instance, **kwargs):
+    invalidate_terms([instance.student_id])
+
+
+@receiver(post_save, sender=GradeComponent)
+@receiver(post_delete, sender=GradeComponent)
+def drop_cached_terms_for_subject(sender, instance, **kwargs):
+    invalidate_terms(Student.objects.filter(enrolled_subjects=instance.subject_id).values_list('pk', flat=True))
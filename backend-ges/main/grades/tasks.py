@@ -0,0 +1,42 @@
+# grades/tasks.py
+from programs.exports import export_chunks
+from programs.models import Subject
+from jobs.registry import PermanentJobError, task
+from .engine import compute_final_grades
+from .importer import ImportFormatError, import_grades, read_upload
+from .sheets import grade_sheet, grade_sheet_filename
+
+
+@task('grades.compute')
+def compute(job):
+    subject_id = job.payload.get('subject_id')
+    written = compute_final_grades(
+        subject_ids=[subject_id] if subject_id else None,
+        program_id=job.payload.get('program_id'),
+        progress=job.set_progress,
+    )
+    job.set_progress(written, written)
+    return {"computed": written}
+
+
+@task('grades.import')
+def import_sheet(job):
+    # Safe to retry: every row is an upsert, so rows written before a failure are just rewritten.
+    subject = Subject.objects.get(pk=job.payload['subject_id'])
+    try:
+        with job.input_file.open('rb') as upload:
+            return import_grades(read_upload(upload, job.input_file.name), subject, progress=job.set_progress)
+    except ImportFormatError as e:
+        raise PermanentJobError(str(e))
+    except UnicodeDecodeError:
+        raise PermanentJobError("CSV file must be UTF-8 encoded.")
+
+
+@task('grades.export_sheet')
+def export_sheet(job):
+    subject = Subject.objects.get(pk=job.payload['subject_id'])
+    output = job.payload.get('output', 'csv')
+    rows, columns = grade_sheet(subject)
+    chunks = export_chunks(rows, columns, output, progress=job.set_progress)
+    job.save_output(f'{grade_sheet_filename(subject)}.{output}', chunks)
+    return {"file": job.output_file.name}
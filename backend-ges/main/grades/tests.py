@@ -0,0 +1,175 @@
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from programs.models import Program, Subject
+from users.models import User
+from .engine import compute_final_grades, gpa_queryset
+from .models import GradeComponent, GradeEntry, FinalGrade
+
+
+class GradeEngineTests(TestCase):
+    def setUp(self):
+        self.program = Program.objects.create(code='BSCS', name='Computer Science')
+        self.math = Subject.objects.create(program=self.program, course_code='MATH1', title='Math', credits=3)
+        self.art = Subject.objects.create(program=self.program, course_code='ART1', title='Art', credits=1)
+        self.quiz = GradeComponent.objects.create(subject=self.math, name='Quizzes', weight=40)
+        self.exam = GradeComponent.objects.create(subject=self.math, name='Exam', weight=60)
+        self.project = GradeComponent.objects.create(subject=self.art, name='Project', weight=100)
+        self.ana = User.objects.create(student_id='S1', first_name='Ana', last_name='A', email='a@example.com', username='a', gender='Female', role='student', program=self.program).student_profile
+        self.ben = User.objects.create(student_id='S2', first_name='Ben', last_name='B', email='b@example.com', username='b', gender='Male', role='student', program=self.program).student_profile
+
+    def grade(self, student, component, score, periods=('prelim', 'midterm', 'finals')):
+        GradeEntry.objects.bulk_create(
+            GradeEntry(student=student, component=component, period=period, score=score) for period in periods
+        )
+
+    def test_final_grade_is_weighted_mean(self):
+        self.grade(self.ana, self.quiz, 80)
+        self.grade(self.ana, self.exam, 90)
+        compute_final_grades()
+        self.assertEqual(FinalGrade.objects.get(student=self.ana, subject=self.math).score, Decimal('86.00'))
+
+    def test_gpa_and_rank_are_credit_weighted(self):
+        self.grade(self.ana, self.quiz, 90)
+        self.grade(self.ana, self.exam, 90)
+        self.grade(self.ana, self.project, 70)
+        self.grade(self.ben, self.quiz, 85)
+        self.grade(self.ben, self.exam, 85)
+        self.grade(self.ben, self.project, 95)
+        compute_final_grades(program_id=self.program.pk)
+
+        rows = list(gpa_queryset(program_id=self.program.pk))
+        self.assertEqual([r['student_id'] for r in rows], [self.ben.pk, self.ana.pk])
+        self.assertAlmostEqual(rows[0]['gpa'], 87.5)
+        self.assertAlmostEqual(rows[1]['gpa'], 85.0)
+        self.assertEqual([r['rank'] for r in rows], [1, 2])
+
+    def test_compute_query_count_is_flat(self):
+        self.grade(self.ana, self.quiz, 80)
+        with CaptureQueriesContext(connection) as small:
+            compute_final_grades()
+        for i in range(20):
+            student = User.objects.create(student_id=f'X{i}', first_name='X', last_name='X', email=f'x{i}@example.com', username=f'x{i}', gender='Male', role='student').student_profile
+            self.grade(student, self.quiz, 70 + i)
+        with CaptureQueriesContext(connection) as large:
+            compute_final_grades()
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_stale_final_grades_removed(self):
+        self.grade(self.ana, self.project, 90)
+        compute_final_grades()
+        GradeEntry.objects.all().delete()
+        compute_final_grades(subject_ids=[self.art.pk])
+        self.assertFalse(FinalGrade.objects.exists())
+
+
+    def test_progress_is_reported_after_each_written_batch(self):
+        for student in (self.ana, self.ben):
+            self.grade(student, self.quiz, 80)
+            self.grade(student, self.project, 90)
+        reports = []
+
+        def progress(done):
+            reports.append((done, FinalGrade.objects.count()))
+
+        with mock.patch('grades.engine.UPSERT_BATCH_SIZE', 3):
+            self.assertEqual(compute_final_grades(progress=progress), 4)
+        self.assertEqual(reports, [(3, 3), (4, 4)])
+
+class GradeApiTests(TestCase):
+    def setUp(self):
+        teacher = User.objects.create_user(
+            email='teacher@example.com', password='pass12345', username='teacher',
+            first_name='T', last_name='Eacher', role='teacher'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(teacher)
+        program = Program.objects.create(code='BSCS', name='Computer Science')
+        self.subject = Subject.objects.create(program=program, course_code='MATH1', title='Math', credits=3)
+
+    def test_component_weights_cannot_exceed_100(self):
+        url = '/api/grades/components/'
+        ok = self.client.post(url, {'subject_id': self.subject.pk, 'name': 'Exam', 'weight': '70'}, format='json')
+        self.assertEqual(ok.status_code, 201, ok.data)
+        over = self.client.post(url, {'subject_id': self.subject.pk, 'name': 'Quiz', 'weight': '40'}, format='json')
+        self.assertEqual(over.status_code, 400)
+
+
+class GradeImportTests(TestCase):
+    def setUp(self):
+        teacher = User.objects.create_user(
+            email='teacher@example.com', password='pass12345', username='teacher',
+            first_name='T', last_name='Eacher', role='teacher'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(teacher)
+        program = Program.objects.create(code='BSCS', name='Computer Science')
+        self.subject = Subject.objects.create(program=program, course_code='MATH1', title='Math', credits=3)
+        self.exam = GradeComponent.objects.create(subject=self.subject, name='Exam', weight=100)
+        for i in range(3):
+            User.objects.create(student_id=f'S{i}', email=f'u{i}@example.com', username=f'u{i}', first_name='S', last_name='S', role='student')
+
+    def upload(self, text):
+        return self.client.post('/api/grades/import/', {
+            'subject_id': self.subject.pk,
+            'file': SimpleUploadedFile('grades.csv', text.encode(), content_type='text/csv'),
+        }, format='multipart')
+
+    def test_imports_valid_rows_and_reports_bad_ones(self):
+        response = self.upload(
+            "student_id,component,period,score\n"
+            "S0,Exam,prelim,88\n"
+            "S1,exam,Midterm,91.5\n"
+            "S9,Exam,prelim,70\n"
+            "S2,Exam,prelim,120\n"
+            "S0,Exam,prelim,90\n"
+            "S1,Exam,prelim,NaN\n"
+            "S2,Exam,midterm,sNaN\n"
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['imported'], 2)
+        self.assertEqual([e['row'] for e in response.data['errors']], [4, 5, 7, 8])
+        self.assertEqual(response.data['errors'][2]['error'], "Score is not a number.")
+        self.assertEqual(GradeEntry.objects.get(student__user__student_id='S0').score, Decimal('90.00'))
+
+    def test_missing_columns_rejected(self):
+        response = self.upload("student_id,score\nS0,90\n")
+        self.assertEqual(response.status_code, 400)
+
+
+class GradeSheetExportTests(TestCase):
+    def setUp(self):
+        teacher = User.objects.create_user(
+            email='teacher@example.com', password='pass12345', username='teacher',
+            first_name='T', last_name='Eacher', role='teacher'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(teacher)
+        program = Program.objects.create(code='BSCS', name='Computer Science')
+        self.subject = Subject.objects.create(program=program, course_code='MATH1', title='Math', credits=3)
+        exam = GradeComponent.objects.create(subject=self.subject, name='Exam', weight=100)
+        for i in range(5):
+            student = User.objects.create(student_id=f'S{i}', first_name='S', last_name=f'L{i}', email=f's{i}@example.com', username=f's{i}', gender='Male', role='student').student_profile
+            student.enrolled_subjects.add(self.subject)
+            GradeEntry.objects.create(student=student, component=exam, period='prelim', score=80 + i)
+
+    def test_csv_sheet_streams_one_row_per_student(self):
+        response = self.client.get(f'/api/grades/sheets/export/?subject_id={self.subject.pk}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'student_id,last_name,first_name,Exam (Prelim),Exam (Midterm),Exam (Finals),final')
+        self.assertEqual(lines[1], 'S0,L0,S,80.00,,,')
+        self.assertEqual(len(lines), 6)
+
+    def test_json_output(self):
+        response = self.client.get(f'/api/grades/sheets/export/?subject_id={self.subject.pk}&output=json')
+        rows = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(rows), 5)
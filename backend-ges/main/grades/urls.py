@@ -0,0 +1,18 @@
+# grades/urls.py
+from django.urls import path
+from .views import (
+    GradeComponentListView, GradeComponentDetailView, GradeEntryListView, GradeEntryDetailView,
+    FinalGradeListView, ComputeFinalGradesView, RankingView, GradeImportView, GradeSheetExportView,
+)
+
+urlpatterns = [
+    path('components/', GradeComponentListView.as_view(), name='grade-component-list'),
+    path('components/<int:pk>/', GradeComponentDetailView.as_view(), name='grade-component-detail'),
+    path('entries/', GradeEntryListView.as_view(), name='grade-entry-list'),
+    path('entries/<int:pk>/', GradeEntryDetailView.as_view(), name='grade-entry-detail'),
+    path('finals/', FinalGradeListView.as_view(), name='final-grade-list'),
+    path('compute/', ComputeFinalGradesView.as_view(), name='grade-compute'),
+    path('rankings/', RankingView.as_view(), name='grade-rankings'),
+    path('import/', GradeImportView.as_view(), name='grade-import'),
+    path('sheets/export/', GradeSheetExportView.as_view(), name='grade-sheet-export'),
+]
@@ -0,0 +1,152 @@
+# grades/views.py
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
+from programs.views import IsTeacherOrAdmin
+from programs.pagination import KeysetPagination
+from programs.exports import requested_format, streaming_export
+from programs.models import Subject
+from jobs.registry import enqueue
+from jobs.views import wants_background, job_accepted
+from .models import GradeComponent, GradeEntry, FinalGrade
+from .serializers import GradeComponentSerializer, GradeEntrySerializer, FinalGradeSerializer, ComputeRequestSerializer, GradeImportSerializer
+from .engine import compute_final_grades, gpa_queryset, subject_ranking_queryset
+from .importer import ImportFormatError, import_grades, read_upload
+from .sheets import grade_sheet, grade_sheet_filename
+
+class GradeComponentListView(generics.ListCreateAPIView):
+    serializer_class = GradeComponentSerializer
+    permission_classes = [IsTeacherOrAdmin]
+
+    def get_queryset(self):
+        queryset = GradeComponent.objects.all()
+        subject_id = self.request.query_params.get('subject_id')
+        if subject_id:
+            queryset = queryset.filter(subject_id=subject_id)
+        return queryset
+
+class GradeComponentDetailView(generics.RetrieveUpdateDestroyAPIView):
+    queryset = GradeComponent.objects.all()
+    serializer_class = GradeComponentSerializer
+    permission_classes = [IsTeacherOrAdmin]
+
+class GradeEntryListView(generics.ListCreateAPIView):
+    serializer_class = GradeEntrySerializer
+    permission_classes = [IsTeacherOrAdmin]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        queryset = GradeEntry.objects.all()
+        params = self.request.query_params
+        if params.get('subject_id'):
+            queryset = queryset.filter(component__subject_id=params['subject_id'])
+        if params.get('student_id'):
+            queryset = queryset.filter(student_id=params['student_id'])
+        if params.get('period'):
+            queryset = queryset.filter(period=params['period'])
+        return queryset
+
+class GradeEntryDetailView(generics.RetrieveUpdateDestroyAPIView):
+    queryset = GradeEntry.objects.all()
+    serializer_class = GradeEntrySerializer
+    permission_classes = [IsTeacherOrAdmin]
+
+class FinalGradeListView(generics.ListAPIView):
+    serializer_class = FinalGradeSerializer
+    permission_classes = [IsTeacherOrAdmin]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        queryset = FinalGrade.objects.all()
+        params = self.request.query_params
+        if params.get('subject_id'):
+            queryset = queryset.filter(subject_id=params['subject_id'])
+        if params.get('student_id'):
+            queryset = queryset.filter(student_id=params['student_id'])
+        return queryset
+
+class ComputeFinalGradesView(APIView):
+    """
+    Recomputes final grades for a subject, a program, or (with an empty body) everything.
+    With `?background=1` the work is queued and a job status link is returned.
+    """
+    permission_classes = [IsTeacherOrAdmin]
+
+    def post(self, request):
+        serializer = ComputeRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        subject_id = serializer.validated_data.get('subject_id')
+        if wants_background(request):
+            payload = {'subject_id': subject_id, 'program_id': serializer.validated_data.get('program_id')}
+            return job_accepted(request, enqueue('grades.compute', payload, user=request.user))
+        written = compute_final_grades(
+            subject_ids=[subject_id] if subject_id else None,
+            program_id=serializer.validated_data.get('program_id'),
+        )
+        return Response({"computed": written}, status=status.HTTP_200_OK)
+
+class RankingView(APIView):
+    """`?subject_id=` ranks a class by final grade; `?program_id=` ranks a program by GPA."""
+    permission_classes = [IsTeacherOrAdmin]
+
+    def get(self, request):
+        subject_id = request.query_params.get('subject_id')
+        if subject_id:
+            rows = subject_ranking_queryset(subject_id)
+            return Response([
+                {"student_id": row['student__user__student_id'], "score": row['score'], "rank": row['rank']}
+                for row in rows
+            ])
+        rows = gpa_queryset(program_id=request.query_params.get('program_id'))
+        return Response([
+            {"student_id": row['student__user__student_id'], "credits": row['credits'], "gpa": round(row['gpa'], 2), "rank": row['rank']}
+            for row in rows
+        ])
+
+
+class GradeImportView(APIView):
+    """
+    Imports a CSV or XLSX sheet with columns student_id, component, period, score
+    for one subject. Valid rows are written even when others fail; the response
+    lists the rejected rows. With `?background=1` the file is queued and the same
+    summary becomes the job's result.
+    """
+    permission_classes = [IsTeacherOrAdmin]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        serializer = GradeImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data['file']
+        subject = serializer.validated_data['subject']
+        if wants_background(request):
+            job = enqueue('grades.import', {'subject_id': subject.pk}, user=request.user, input_file=upload)
+            return job_accepted(request, job)
+        try:
+            summary = import_grades(read_upload(upload, upload.name), subject)
+        except ImportFormatError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except UnicodeDecodeError:
+            return Response({"detail": "CSV file must be UTF-8 encoded."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(summary, status=status.HTTP_200_OK)
+
+
+class GradeSheetExportView(APIView):
+    """Streams the grade sheet of `?subject_id=` as CSV or JSON (`?output=`), or queues it with `?background=1`."""
+    permission_classes = [IsTeacherOrAdmin]
+
+    def get(self, request):
+        output = requested_format(request)
+        if output is None:
+            return Response({"detail": "Unsupported output format."}, status=status.HTTP_400_BAD_REQUEST)
+        subject_id = request.query_params.get('subject_id')
+        if not subject_id:
+            return Response({"detail": "subject_id is required."}, status=status.HTTP_400_BAD_REQUEST)
+        subject = get_object_or_404(Subject, pk=subject_id)
+        if wants_background(request):
+            job = enqueue('grades.export_sheet', {'subject_id': subject.pk, 'output': output}, user=request.user)
+            return job_accepted(request, job)
+        rows, columns = grade_sheet(subject)
+        return streaming_export(rows, columns, output, grade_sheet_filename(subject))
@@ -0,0 +1,9 @@
+# jobs/admin.py
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'progress_done', 'progress_total', 'attempts', 'created_by', 'created_at')
+    list_filter = ('status', 'kind')
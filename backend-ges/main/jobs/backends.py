@@ -0,0 +1,18 @@
+# jobs/backends.py
+from .runner import claim, run_job
+
+
+class DatabaseBackend:
+    """Leaves the job row queued; `manage.py run_jobs` workers pick it up."""
+
+    def enqueue(self, job):
+        pass
+
+
+class ImmediateBackend:
+    """Runs the job, retries included (without the backoff delay), before `enqueue()` returns. For development and tests."""
+
+    def enqueue(self, job):
+        while (claimed := claim(job.pk, 'immediate')) is not None:
+            run_job(claimed)
+        job.refresh_from_db()
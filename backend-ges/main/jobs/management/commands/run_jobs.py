@@ -0,0 +1,58 @@
+# jobs/management/commands/run_jobs.py
+import os
+import signal
+import socket
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs.runner import claim_next, requeue_stale, run_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs queued background jobs. Start one process per job you want to run in parallel "
+        "(e.g. under systemd or supervisord); they share the queue table safely. "
+        "SIGTERM/SIGINT let the current job finish before exiting."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run every due job, then exit.")
+        parser.add_argument('--poll', type=float, default=None,
+                            help="Seconds to sleep when the queue is empty (default: JOBS_POLL_INTERVAL).")
+        parser.add_argument('--worker-id', default=f'{socket.gethostname()}:{os.getpid()}')
+
+    def handle(self, *args, **options):
+        poll = options['poll'] if options['poll'] is not None else getattr(settings, 'JOBS_POLL_INTERVAL', 2)
+        worker_id = options['worker_id']
+        self.stopping = False
+
+        def stop(signum, frame):
+            self.stopping = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(f"Worker {worker_id} started")
+        last_sweep = 0.0
+        while not self.stopping:
+            close_old_connections()
+            if time.monotonic() - last_sweep > 60:
+                requeued, failed = requeue_stale()
+                if requeued or failed:
+                    self.stdout.write(f"Recovered {requeued} stale job(s), failed {failed}")
+                last_sweep = time.monotonic()
+
+            job = claim_next(worker_id)
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(poll)
+                continue
+            started = time.monotonic()
+            run_job(job)
+            self.stdout.write(f"{job.kind} #{job.pk}: {job.status} in {time.monotonic() - started:.1f}s")
+        close_old_connections()
+        self.stdout.write(f"Worker {worker_id} stopped")
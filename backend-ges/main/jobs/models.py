@@ -0,0 +1,81 @@
+# jobs/models.py
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+from django.utils import timezone
+
+
+class JobFileStorage(FileSystemStorage):
+    """Job uploads and exports live under JOBS_FILE_ROOT, outside MEDIA_ROOT, so they are only reachable through the API."""
+
+    @property
+    def base_location(self):
+        return str(settings.JOBS_FILE_ROOT)
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+
+def job_file_storage():
+    return JobFileStorage()
+
+
+class Job(models.Model):
+    QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    progress_done = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    input_file = models.FileField(upload_to='input/', storage=job_file_storage, blank=True)
+    output_file = models.FileField(upload_to='output/', storage=job_file_storage, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker's claim query: queued jobs that are due, oldest first.
+            models.Index(fields=['status', 'run_after'], name='job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    def set_progress(self, done, total=None):
+        """Records progress; also refreshes the lock so a long job that reports progress is never taken for a dead one."""
+        self.progress_done = done
+        if total is not None:
+            self.progress_total = total
+        Job.objects.filter(pk=self.pk).update(
+            progress_done=self.progress_done, progress_total=self.progress_total, locked_at=timezone.now()
+        )
+
+    def save_output(self, filename, chunks):
+        """Writes text `chunks` (e.g. an export stream) to the job's output file without holding them in memory."""
+        with tempfile.TemporaryFile() as spool:
+            for chunk in chunks:
+                spool.write(chunk.encode('utf-8'))
+            spool.seek(0)
+            self.output_file.save(filename, File(spool), save=False)
+        Job.objects.filter(pk=self.pk).update(output_file=self.output_file.name)
@@ -0,0 +1,72 @@
+# jobs/registry.py
+"""
+Background jobs.
+
+Each app declares its handlers in a `tasks.py` module (loaded when the app
+registry is ready):
+
+    @task('grades.compute')
+    def compute(job):
+        ...
+        return {"computed": n}
+
+A handler receives the Job row, may call `job.set_progress()` and
+`job.save_output()`, and returns a JSON-serializable result. Raising
+PermanentJobError fails the job at once; any other exception is retried with
+exponential backoff until `max_attempts` is reached.
+
+`enqueue()` stores the job and hands it to the backend named by JOBS_BACKEND.
+The database backend leaves it for `manage.py run_jobs` workers, so no broker is
+needed. The immediate backend runs it before returning, for development
+without a worker.
+"""
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+DEFAULT_BACKEND = 'jobs.backends.DatabaseBackend'
+
+_handlers = {}
+
+
+class PermanentJobError(Exception):
+    """A failure that retrying cannot fix (bad input). `result` is stored on the job."""
+
+    def __init__(self, message, result=None):
+        super().__init__(message)
+        self.result = result
+
+
+def task(kind, max_attempts=3):
+    def decorator(func):
+        _handlers[kind] = (func, max_attempts)
+        return func
+    return decorator
+
+
+def get_handler(kind):
+    try:
+        return _handlers[kind][0]
+    except KeyError:
+        raise PermanentJobError(f"No handler registered for job kind '{kind}'.")
+
+
+def get_backend():
+    return import_string(getattr(settings, 'JOBS_BACKEND', DEFAULT_BACKEND))()
+
+
+def enqueue(kind, payload=None, user=None, input_file=None):
+    if kind not in _handlers:
+        raise ValueError(f"No handler registered for job kind '{kind}'.")
+    job = Job(
+        kind=kind,
+        payload=payload or {},
+        max_attempts=_handlers[kind][1],
+        created_by_id=getattr(user, 'pk', None),
+    )
+    if input_file is not None:
+        job.input_file.save(input_file.name, input_file, save=False)
+    job.save()
+    get_backend().enqueue(job)
+    return job
@@ -0,0 +1,98 @@
+# jobs/runner.py
+"""
+Claiming and running queued jobs.
+
+A job is claimed with a conditional UPDATE (`status = queued` -> `running`), so
+any number of worker processes can poll the same table without double-running a
+job and without needing SKIP LOCKED support from the database.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+from .registry import PermanentJobError, get_handler
+
+logger = logging.getLogger(__name__)
+
+CLAIM_BATCH = 10
+
+
+def claim(pk, worker_id):
+    """Marks job `pk` as running for `worker_id` if it is still queued; returns it, or None if another worker won."""
+    now = timezone.now()
+    claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+        status=Job.RUNNING, locked_by=worker_id, locked_at=now, started_at=now, attempts=F('attempts') + 1
+    )
+    return Job.objects.get(pk=pk) if claimed else None
+
+
+def claim_next(worker_id):
+    """Claims the oldest due queued job, or returns None."""
+    due = Job.objects.filter(status=Job.QUEUED, run_after__lte=timezone.now())
+    for pk in due.order_by('run_after', 'id').values_list('id', flat=True)[:CLAIM_BATCH]:
+        job = claim(pk, worker_id)
+        if job is not None:
+            return job
+    return None
+
+
+def run_job(job):
+    """Runs a claimed job and records success, a retry, or failure."""
+    try:
+        result = get_handler(job.kind)(job)
+    except PermanentJobError as exc:
+        _finish(job, Job.FAILED, result=exc.result, error=str(exc))
+    except Exception as exc:
+        logger.exception("Job %s (%s) failed on attempt %s", job.pk, job.kind, job.attempts)
+        error = ''.join(traceback.format_exception_only(type(exc), exc)).strip()
+        if job.attempts < job.max_attempts:
+            delay = getattr(settings, 'JOBS_RETRY_DELAY', 30) * 2 ** (job.attempts - 1)
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.QUEUED, run_after=timezone.now() + timedelta(seconds=delay),
+                locked_by='', locked_at=None, error=error,
+            )
+            job.status = Job.QUEUED
+        else:
+            _finish(job, Job.FAILED, error=error)
+    else:
+        _finish(job, Job.SUCCEEDED, result=result)
+    return job
+
+
+def _finish(job, status, result=None, error=''):
+    job.status, job.result, job.error, job.finished_at = status, result, error, timezone.now()
+    Job.objects.filter(pk=job.pk).update(
+        status=status, result=result, error=error, finished_at=job.finished_at, locked_by='', locked_at=None
+    )
+
+
+def requeue_stale(timeout=None):
+    """
+    Hands back jobs whose worker died mid-run: running jobs whose lock has not been
+    refreshed for `timeout` seconds go back to the queue, or fail once out of attempts.
+    """
+    timeout = timeout if timeout is not None else getattr(settings, 'JOBS_LOCK_TIMEOUT', 900)
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, error="Worker stopped responding.", finished_at=timezone.now(), locked_by='', locked_at=None
+    )
+    requeued = stale.update(status=Job.QUEUED, locked_by='', locked_at=None)
+    return requeued, failed
+
+
+def run_pending(worker_id, limit=None):
+    """Runs queued jobs until none are due (or `limit` have run). Returns how many ran."""
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next(worker_id)
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
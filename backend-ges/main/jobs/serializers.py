@@ -0,0 +1,27 @@
+# jobs/serializers.py
+from django.urls import reverse
+from rest_framework import serializers
+from .models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'kind', 'status', 'progress', 'attempts', 'max_attempts', 'result', 'error',
+            'download_url', 'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = fields
+
+    def get_progress(self, job):
+        return {'done': job.progress_done, 'total': job.progress_total}
+
+    def get_download_url(self, job):
+        if not job.output_file:
+            return None
+        url = reverse('job-download', args=[job.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
@@ -0,0 +1,119 @@
+import shutil
+import tempfile
+from datetime import time, timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from programs.models import Program, Schedule, Subject
+from users.models import User
+from .models import Job
+from .registry import enqueue, task
+from .runner import claim, requeue_stale, run_pending
+
+calls = []
+
+
+@task('tests.flaky')
+def flaky(job):
+    calls.append(job.attempts)
+    if job.attempts < 2:
+        raise RuntimeError("temporary failure")
+    return {"attempts": job.attempts}
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+        self.files = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.files, ignore_errors=True)
+        override = override_settings(JOBS_FILE_ROOT=self.files, JOBS_BACKEND='jobs.backends.DatabaseBackend')
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.teacher = User.objects.create_user(
+            email='teacher@example.com', password='pass12345', username='teacher',
+            first_name='T', last_name='Eacher', role='teacher'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        program = Program.objects.create(code='BSCS', name='Computer Science')
+        self.subject = Subject.objects.create(program=program, course_code='CS101', title='Intro', credits=3)
+
+    def test_background_request_is_queued_then_run_by_worker(self):
+        response = self.client.post('/api/grades/compute/?background=1', {'subject_id': self.subject.pk}, format='json')
+        self.assertEqual(response.status_code, 202, response.data)
+        status_url = response['Location']
+        self.assertEqual(self.client.get(status_url).data['status'], Job.QUEUED)
+
+        self.assertEqual(run_pending('test'), 1)
+        job = self.client.get(status_url).data
+        self.assertEqual(job['status'], Job.SUCCEEDED)
+        self.assertEqual(job['result'], {'computed': 0})
+
+    def test_failures_are_retried_with_backoff(self):
+        job = enqueue('tests.flaky')
+        with self.assertLogs('jobs.runner', 'ERROR'):
+            run_pending('test')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertEqual(run_pending('test'), 0)  # not due yet
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        run_pending('test')
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(calls, [1, 2])
+
+    def test_rejected_enrollment_fails_without_retry(self):
+        response = self.client.post('/api/students/enrollments/bulk/?background=1', {
+            'enrollments': [{'student_id': 'missing', 'subject_id': self.subject.pk}]
+        }, format='json')
+        run_pending('test')
+        job = Job.objects.get(pk=response.data['job_id'])
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 1))
+        self.assertEqual(job.result['errors'][0]['student_id'], 'missing')
+
+    def test_export_job_output_is_downloadable_by_owner_only(self):
+        response = self.client.get('/api/programs/schedules/export/?background=1')
+        run_pending('test')
+        job = self.client.get(response['Location']).data
+        self.assertEqual(job['status'], Job.SUCCEEDED)
+        download = self.client.get(job['download_url'])
+        self.assertEqual(b''.join(download.streaming_content).decode().splitlines()[0],
+                         'id,course_code,subject,day,start_time,end_time,room')
+
+        other = User.objects.create_user(email='o@example.com', password='pass12345', username='o', role='teacher')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(job['download_url']).status_code, 404)
+
+    def test_export_job_reports_progress_per_chunk(self):
+        Schedule.objects.bulk_create(
+            Schedule(subject=self.subject, day='Monday', start_time=time(7 + i), end_time=time(8 + i), room='R1')
+            for i in range(5)
+        )
+        job = enqueue('programs.export_schedules', user=self.teacher)
+        reports = []
+        with mock.patch('programs.exports.EXPORT_CHUNK_SIZE', 2), \
+                mock.patch.object(Job, 'set_progress', autospec=True, side_effect=lambda job, done, total=None: reports.append(done)):
+            run_pending('test')
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.SUCCEEDED)
+        self.assertEqual(reports, [2, 4, 5])
+
+    def test_claim_is_exclusive_and_stale_jobs_are_requeued(self):
+        job = enqueue('tests.flaky')
+        self.assertIsNotNone(claim(job.pk, 'a'))
+        self.assertIsNone(claim(job.pk, 'b'))
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(timeout=60), (1, 0))
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.QUEUED)
+
+    @override_settings(JOBS_BACKEND='jobs.backends.ImmediateBackend')
+    def test_immediate_backend_runs_inline(self):
+        with self.assertLogs('jobs.runner', 'ERROR'):
+            job = enqueue('tests.flaky')
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result, {'attempts': 2})
@@ -0,0 +1,9 @@
+# jobs/urls.py
+from django.urls import path
+from .views import JobListView, JobDetailView, JobDownloadView
+
+urlpatterns = [
+    path('', JobListView.as_view(), name='job-list'),
+    path('<int:pk>/', JobDetailView.as_view(), name='job-detail'),
+    path('<int:pk>/download/', JobDownloadView.as_view(), name='job-download'),
+]
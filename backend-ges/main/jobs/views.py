@@ -0,0 +1,64 @@
+# jobs/views.py
+import os
+
+from django.http import FileResponse, Http404
+from django.urls import reverse
+from rest_framework import generics, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from programs.pagination import KeysetPagination
+from .models import Job
+from .serializers import JobSerializer
+
+BACKGROUND_QUERY_PARAM = 'background'
+
+
+def wants_background(request):
+    """`?background=1` asks an endpoint to enqueue its work instead of doing it inline."""
+    return request.query_params.get(BACKGROUND_QUERY_PARAM, '').lower() in ('1', 'true', 'yes')
+
+
+def job_accepted(request, job):
+    """202 response pointing the client at the job's status endpoint."""
+    status_url = request.build_absolute_uri(reverse('job-detail', args=[job.pk]))
+    return Response(
+        {"job_id": job.pk, "status": job.status, "status_url": status_url},
+        status=status.HTTP_202_ACCEPTED,
+        headers={'Location': status_url},
+    )
+
+
+class OwnJobsMixin:
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.role == 'admin' or user.is_superuser:
+            return Job.objects.all()
+        return Job.objects.filter(created_by_id=user.pk)
+
+
+class JobListView(OwnJobsMixin, generics.ListAPIView):
+    serializer_class = JobSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        job_status = self.request.query_params.get('status')
+        if job_status:
+            queryset = queryset.filter(status=job_status)
+        return queryset
+
+
+class JobDetailView(OwnJobsMixin, generics.RetrieveAPIView):
+    serializer_class = JobSerializer
+
+
+class JobDownloadView(OwnJobsMixin, generics.GenericAPIView):
+    """Serves a finished export job's file."""
+
+    def get(self, request, pk):
+        job = self.get_object()
+        if not job.output_file:
+            raise Http404("This job has no output file.")
+        return FileResponse(job.output_file.open('rb'), as_attachment=True, filename=os.path.basename(job.output_file.name))
@@ -5,12 +5,55 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Requests served from here resolve against ``main.asgi_urls``, which puts the
+async read views (catalog, profile, students by program) in front of the
+regular URLconf. ``main.wsgi`` is unchanged and keeps serving the DRF views.
+
+Worker model
+------------
+Run one event-loop process per CPU core, e.g.::
+
+    uvicorn main.asgi:application --workers 4
+    gunicorn main.asgi:application -k uvicorn.workers.UvicornWorker -w 4
+
+- Each process serves many concurrent requests on one event loop. An async view
+  only holds a thread while one of its queries runs, so a worker is not capped at
+  ``threads`` in-flight requests the way a WSGI worker is.
+- Django's async ORM still runs each query in a thread from asgiref's executor.
+  Synchronous views (every write, and the other endpoints) run there too. Size
+  the executor with the ``ASGI_THREADS`` environment variable. Keep it at or
+  below what the database allows per process.
+- Every executor thread holds its own database connection. Leave
+  ``CONN_MAX_AGE`` at 0 under ASGI, as Django recommends. Connections opened in
+  executor threads are otherwise not reliably closed.
+- The caches (catalog, default) and the schedule index behave as they do under
+  WSGI. Point the caches at a shared backend when running several workers.
+
+Compare the two stacks in-process with ``python manage.py bench_asgi``.
 """
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main.settings')
 
-application = get_asgi_application()
+ASYNC_URLCONF = 'main.asgi_urls'
+
+
+class ReadPathASGIHandler(ASGIHandler):
+    """ASGIHandler that resolves requests against the async-first URLconf."""
+
+    async def get_response_async(self, request):
+        request.urlconf = ASYNC_URLCONF
+        return await super().get_response_async(request)
+
+
+def get_application():
+    django.setup(set_prefix=False)
+    return ReadPathASGIHandler()
+
+
+application = get_application()
@@ -0,0 +1,24 @@
+"""
+URL configuration used when the project is served through main.asgi.
+
+The read-heavy endpoints resolve to their async views first; they hand writes and
+paginated reads back to the DRF views, and every other URL falls through to
+main.urls unchanged.
+"""
+from django.urls import path
+
+from programs import async_views as catalog
+from students.async_views import students_by_program
+from users.async_views import user_profile
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/users/me/', user_profile),
+    path('api/students/programs/<int:program_id>/students/', students_by_program),
+    path('api/programs/programs/', catalog.program_list),
+    path('api/programs/programs/<int:pk>/', catalog.program_detail),
+    path('api/programs/subjects/', catalog.subject_list),
+    path('api/programs/subjects/<int:pk>/', catalog.subject_detail),
+    path('api/programs/schedules/', catalog.schedule_list),
+    path('api/programs/schedules/<int:pk>/', catalog.schedule_detail),
+] + sync_urlpatterns
@@ -0,0 +1,13 @@
+"""MySQL backend with per-process connection pooling (see main.db.pool)."""
+from django.db.backends.mysql import base
+
+from main.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    def ping(self, connection):
+        try:
+            connection.ping()
+        except self.Database.Error:
+            return False
+        return True
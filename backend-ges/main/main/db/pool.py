@@ -0,0 +1,206 @@
+"""
+Per-process database connection pooling.
+
+Django keeps one connection per thread: with CONN_MAX_AGE = 0 it connects and
+disconnects around every request, and with a positive CONN_MAX_AGE each thread
+holds its own connection, however many threads a worker runs. The backends in
+main.db.mysql and main.db.sqlite3 instead check connections out of a
+`ConnectionPool` when Django connects and hand them back when Django closes,
+which (with CONN_MAX_AGE = 0) is at the end of every request:
+
+* at most MAX_SIZE connections exist per process and alias; a request that
+  finds them all in use waits up to TIMEOUT seconds, then fails with an
+  OperationalError;
+* an idle connection unused for more than PING_AFTER seconds is pinged before
+  it is handed out, and dropped (and replaced) if the ping fails;
+* connections older than RECYCLE seconds are closed rather than reused, so
+  server-side timeouts (MySQL's wait_timeout) never hit a pooled connection.
+
+`connection_settings` turns the DB_CONNECTIONS mode from settings into the
+CONN_MAX_AGE / CONN_HEALTH_CHECKS / POOL keys of a DATABASES entry.
+"""
+import os
+import threading
+import time
+from contextlib import closing
+
+from django.core.exceptions import ImproperlyConfigured
+
+MODES = ('pool', 'persistent', 'per-request')
+POOL_DEFAULTS = {'MAX_SIZE': 10, 'TIMEOUT': 10, 'RECYCLE': 3600, 'PING_AFTER': 30}
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, max_size=10, timeout=10, recycle=3600, ping_after=30):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._idle = []  # (connection, created, released), most recently released last
+        self._in_use = {}  # id(connection) -> created
+        self._counts = {'opened': 0, 'reused': 0, 'discarded': 0, 'timeouts': 0}
+
+    def acquire(self, connect, ping):
+        """A connection from the pool, or a new one from `connect()`; `ping(connection)` -> bool checks idle ones."""
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._counts['timeouts'] += 1
+            raise PoolTimeout(f"All {self.max_size} pooled connections stayed in use for {self.timeout}s.")
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    connection, created, released = self._idle.pop()
+                now = time.monotonic()
+                if now - created > self.recycle or (now - released > self.ping_after and not ping(connection)):
+                    self._discard(connection)
+                    continue
+                with self._lock:
+                    self._in_use[id(connection)] = created
+                    self._counts['reused'] += 1
+                return connection
+            connection = connect()
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._in_use[id(connection)] = time.monotonic()
+            self._counts['opened'] += 1
+        return connection
+
+    def release(self, connection, reusable=True):
+        with self._lock:
+            created = self._in_use.pop(id(connection), None)
+        if created is None:  # not ours (or already released)
+            return
+        if reusable and time.monotonic() - created <= self.recycle:
+            with self._lock:
+                self._idle.append((connection, created, time.monotonic()))
+        else:
+            self._discard(connection)
+        self._slots.release()
+
+    def _discard(self, connection):
+        with self._lock:
+            self._counts['discarded'] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close_idle(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _, _ in idle:
+            self._discard(connection)
+
+    def stats(self):
+        with self._lock:
+            return {'max_size': self.max_size, 'in_use': len(self._in_use), 'idle': len(self._idle), **self._counts}
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pools_pid = os.getpid()
+
+
+def get_pool(settings_dict, alias):
+    """The process-wide pool for this alias and server; None if the entry has no POOL."""
+    global _pools_pid
+    options = settings_dict.get('POOL')
+    if not options:
+        return None
+    key = (alias, settings_dict['NAME'], settings_dict.get('HOST'), settings_dict.get('PORT'), settings_dict.get('USER'))
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            # A forked worker must not share sockets with its parent: start empty.
+            _pools.clear()
+            _pools_pid = os.getpid()
+        pool = _pools.get(key)
+        if pool is None:
+            options = {**POOL_DEFAULTS, **(options if isinstance(options, dict) else {})}
+            pool = _pools[key] = ConnectionPool(
+                max_size=options['MAX_SIZE'], timeout=options['TIMEOUT'],
+                recycle=options['RECYCLE'], ping_after=options['PING_AFTER'],
+            )
+        return pool
+
+
+def pool_stats():
+    with _pools_lock:
+        return {key[0]: pool.stats() for key, pool in _pools.items()}
+
+
+def reset_pools():
+    """Closes idle connections and forgets every pool (tests, benchmarks)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_idle()
+
+
+def connection_settings(mode, max_age=60, pool=None):
+    """The DATABASES keys for a DB_CONNECTIONS mode: 'pool', 'persistent' or 'per-request'."""
+    if mode not in MODES:
+        raise ImproperlyConfigured(f"DB_CONNECTIONS must be one of {', '.join(MODES)}, not {mode!r}.")
+    return {
+        # Pooled connections go back to the pool when Django closes them after each request.
+        'CONN_MAX_AGE': max_age if mode == 'persistent' else 0,
+        'CONN_HEALTH_CHECKS': mode == 'persistent',
+        'POOL': {**POOL_DEFAULTS, **(pool or {})} if mode == 'pool' else False,
+    }
+
+
+class PooledDatabaseWrapperMixin:
+    """Mixed into a backend's DatabaseWrapper: connect() checks out of the pool and close() checks back in."""
+
+    def can_pool(self):
+        return True
+
+    @property
+    def pool(self):
+        return get_pool(self.settings_dict, self.alias) if self.can_pool() else None
+
+    def ping(self, connection):
+        try:
+            with closing(connection.cursor()) as cursor:
+                cursor.execute('SELECT 1')
+        except self.Database.Error:
+            return False
+        return True
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        try:
+            return pool.acquire(lambda: super(PooledDatabaseWrapperMixin, self).get_new_connection(conn_params), self.ping)
+        except PoolTimeout as exc:
+            raise self.Database.OperationalError(str(exc)) from exc
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        if self.in_atomic_block:
+            # close() keeps the wrapper pointing at this connection until the
+            # atomic block exits, so it cannot be handed to anyone else.
+            pool.release(self.connection, reusable=False)
+            return super()._close()
+        reusable = True
+        try:
+            if not self.get_autocommit():
+                self.connection.rollback()
+            if self.errors_occurred:
+                reusable = self.ping(self.connection)
+        except self.Database.Error:
+            reusable = False
+        pool.release(self.connection, reusable)
@@ -0,0 +1,222 @@
+"""
+Read replica routing.
+
+`ReplicaRouter` sends writes to the primary (`default`) and, during requests
+that `main.middleware.ReplicaRoutingMiddleware` marked as read-only, sends
+reads to one of DATABASE_REPLICAS. Everything else reads from the primary:
+
+* requests with an unsafe method (POST, PUT, PATCH, DELETE), and the rest of
+  any request once it has written;
+* reads inside a transaction on the primary, and code under `primary()`: cache
+  fills use it, so a lagging replica is never cached under a fresh version;
+* for REPLICA_STICKY_SECONDS after a user's own write, that user's requests,
+  so they read their writes (e.g. GET /api/users/me/ after PUT). The pin is kept
+  in the REPLICA_PIN_CACHE cache alias, so it spans workers only if that cache
+  is shared;
+* management commands and jobs, which run outside requests.
+
+A replica is skipped while it is down or more than REPLICA_MAX_LAG seconds
+behind; its lag is measured at most every REPLICA_CHECK_INTERVAL seconds per
+process (`SHOW REPLICA STATUS` on MySQL; for a local SQLite stand-in, the age
+of its last `copy_sqlite_replica`, see `manage.py sync_sqlite_replicas`).
+"""
+import contextvars
+import logging
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+PIN_CACHE_KEY = 'replica:pin:{}'
+# Sessions are written on login and read on the very next request.
+PRIMARY_ONLY_APPS = {'sessions'}
+HEARTBEAT_TABLE = 'replica_heartbeat'
+
+
+class RoutingState:
+    """Per-request routing decisions, held in a context variable by ReplicaRoutingMiddleware."""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned  # read from the primary for the rest of the request
+        self.user_pk = None
+        self.wrote = False
+
+
+_state = contextvars.ContextVar('replica_routing', default=None)
+_forced_primary = contextvars.ContextVar('replica_forced_primary', default=False)
+
+
+def begin_request(pinned):
+    state = RoutingState(pinned)
+    return state, _state.set(state)
+
+
+def end_request(token):
+    _state.reset(token)
+
+
+@contextmanager
+def primary():
+    """Reads inside the block go to the primary."""
+    token = _forced_primary.set(True)
+    try:
+        yield
+    finally:
+        _forced_primary.reset(token)
+
+
+def _pin_key(user_pk):
+    return PIN_CACHE_KEY.format(user_pk)
+
+
+def _pin_cache():
+    return caches[getattr(settings, 'REPLICA_PIN_CACHE', 'default')]
+
+
+def remember_write(user_pk):
+    _pin_cache().set(_pin_key(user_pk), True, getattr(settings, 'REPLICA_STICKY_SECONDS', 30))
+
+
+def note_user(user_pk):
+    """Called by authentication: pins the request to the primary if this user wrote recently."""
+    state = _state.get()
+    if state is not None and getattr(settings, 'DATABASE_REPLICAS', ()):
+        state.user_pk = user_pk
+        if not state.pinned and _pin_cache().get(_pin_key(user_pk)):
+            state.pinned = True
+
+
+async def anote_user(user_pk):
+    state = _state.get()
+    if state is not None and getattr(settings, 'DATABASE_REPLICAS', ()):
+        state.user_pk = user_pk
+        if not state.pinned and await _pin_cache().aget(_pin_key(user_pk)):
+            state.pinned = True
+
+
+def replication_lag(connection):
+    """Seconds the database behind `connection` trails the primary; None if replication is not running."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            try:
+                cursor.execute('SHOW REPLICA STATUS')
+            except DatabaseError:
+                cursor.execute('SHOW SLAVE STATUS')  # before MySQL 8.0.22
+            row = cursor.fetchone()
+            if row is None:
+                return 0.0  # not a replica at all, e.g. a second primary in local testing
+            status = dict(zip([column[0] for column in cursor.description], row))
+            lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+            return None if lag is None else float(lag)
+        cursor.execute(f'SELECT copied_at FROM {HEARTBEAT_TABLE}')
+        row = cursor.fetchone()
+        return None if row is None else max(time.time() - row[0], 0.0)
+
+
+def copy_sqlite_replica(alias, source=DEFAULT_DB_ALIAS):
+    """Stands in for replication locally: snapshots the SQLite primary into the replica's file."""
+    copied_at = time.time()
+    primary_connection = connections[source]
+    primary_connection.ensure_connection()
+    connections[alias].close()
+    target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+    try:
+        primary_connection.connection.backup(target)
+        target.execute(f'CREATE TABLE IF NOT EXISTS {HEARTBEAT_TABLE} (copied_at REAL NOT NULL)')
+        target.execute(f'DELETE FROM {HEARTBEAT_TABLE}')
+        target.execute(f'INSERT INTO {HEARTBEAT_TABLE} VALUES (?)', [copied_at])
+        target.commit()
+    finally:
+        target.close()
+
+
+class ReplicaHealth:
+    """Caches, per process, whether each replica is reachable and within REPLICA_MAX_LAG."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._status = {}  # alias -> (checked_at, usable)
+
+    def usable(self, alias):
+        interval = getattr(settings, 'REPLICA_CHECK_INTERVAL', 5)
+        checked_at, usable = self._status.get(alias, (None, False))
+        if checked_at is not None and time.monotonic() - checked_at < interval:
+            return usable
+        usable = self._check(alias)
+        self._set(alias, usable)
+        return usable
+
+    def mark_down(self, alias, error):
+        logger.warning("Replica %s is unavailable, reading from the primary: %s", alias, error)
+        self._set(alias, False)
+
+    def reset(self):
+        with self._lock:
+            self._status.clear()
+
+    def _set(self, alias, usable):
+        with self._lock:
+            self._status[alias] = (time.monotonic(), usable)
+
+    def _check(self, alias):
+        max_lag = getattr(settings, 'REPLICA_MAX_LAG', 5)
+        try:
+            lag = replication_lag(connections[alias])
+        except Exception as exc:
+            logger.warning("Replica %s is unavailable, reading from the primary: %s", alias, exc)
+            return False
+        if lag is None:
+            logger.warning("Replica %s is not replicating, reading from the primary", alias)
+            return False
+        if lag > max_lag:
+            logger.warning("Replica %s is %.1fs behind (max %ss), reading from the primary", alias, lag, max_lag)
+            return False
+        return True
+
+
+replica_health = ReplicaHealth()
+
+
+def read_alias():
+    replicas = getattr(settings, 'DATABASE_REPLICAS', ())
+    state = _state.get()
+    if (not replicas or state is None or state.pinned or _forced_primary.get()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+        return DEFAULT_DB_ALIAS
+    candidates = [alias for alias in replicas if replica_health.usable(alias)]
+    random.shuffle(candidates)
+    for alias in candidates:
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError as exc:
+            replica_health.mark_down(alias, exc)
+            continue
+        return alias
+    return DEFAULT_DB_ALIAS
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        databases = {DEFAULT_DB_ALIAS, *getattr(settings, 'DATABASE_REPLICAS', ())}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
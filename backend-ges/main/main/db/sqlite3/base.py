@@ -0,0 +1,10 @@
+"""SQLite backend with per-process connection pooling (see main.db.pool), for local runs and tests."""
+from django.db.backends.sqlite3 import base
+
+from main.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    def can_pool(self):
+        # Django never closes an in-memory database: it would lose its contents.
+        return not self.is_in_memory_db()
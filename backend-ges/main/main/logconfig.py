@@ -0,0 +1,97 @@
+"""
+Logging helpers referenced from LOGGING in main.settings.
+
+QueueListenerHandler is what loggers attach to. Emitting a record only merges
+its message and puts it on an in-memory queue. A listener thread does the
+formatting (JSON, tracebacks) and the file and console I/O, so a request
+never waits on the disk. The target handlers are ordinary dictConfig
+handlers, referenced as 'cfg://handlers.<name>' (the same shape Python 3.12's
+own QueueHandler config uses).
+"""
+import atexit
+import json
+import logging
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# LogRecord attributes that are not caller-supplied `extra=` fields.
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, source location, any `extra=` fields and the traceback."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc_info'] = record.exc_text
+        if record.stack_info:
+            entry['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class QueueListenerHandler(QueueHandler):
+    """
+    Hands records to a listener thread that feeds `handlers`. The queue is bounded
+    (`queue_size`). When it is full, records are dropped and counted in `dropped`
+    rather than blocking the caller.
+    """
+
+    def __init__(self, handlers, queue_size=10000, respect_handler_level=True):
+        # Index rather than iterate: dictConfig only resolves 'cfg://' entries on item access.
+        targets = [handlers[i] for i in range(len(handlers))]
+        for target in targets:
+            if not isinstance(target, logging.Handler):
+                # dictConfig builds handlers in name order, so targets must sort before this one.
+                raise TypeError(f'{target!r} is not a configured handler')
+        super().__init__(queue.Queue(queue_size))
+        self.dropped = 0
+        self.listener = QueueListener(self.queue, *targets, respect_handler_level=respect_handler_level)
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def prepare(self, record):
+        # Merge the message now, since args may change after the call returns. Leave
+        # formatting, including tracebacks, to the listener thread.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self):
+        """Flushes queued records and stops the listener; safe to call twice."""
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def close(self):
+        self.stop()
+        super().close()
+
+
+def parse_levels(spec):
+    """Turns 'django.db.backends=WARNING,grades=DEBUG' into a LOGGING 'loggers' dict."""
+    loggers = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, level = item.partition('=')
+        loggers[name.strip()] = {'level': level.strip().upper()}
+    return loggers
@@ -0,0 +1,136 @@
+"""
+Serving MEDIA_ROOT files outside DEBUG.
+
+The best setup is for the front server to serve MEDIA_URL straight from
+MEDIA_ROOT, so Django never sees those requests. When requests do reach
+`serve_media`, it answers them cheaply:
+
+* Content-addressed paths (MEDIA_IMMUTABLE_PATTERNS, e.g. avatar renditions)
+  are sent with `Cache-Control: public, max-age=<1 year>, immutable`. Other
+  files get MEDIA_CACHE_MAX_AGE. Every file gets an ETag and Last-Modified,
+  and conditional requests are answered with 304.
+* With MEDIA_SENDFILE = 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache
+  mod_xsendfile, lighttpd), the response carries only headers. The front
+  server then streams the file and handles Range requests itself, so the
+  worker is free as soon as the headers are written. For nginx:
+
+      location /protected-media/ { internal; alias /srv/app/media/; }
+
+* Otherwise the file is streamed from here with single-range support
+  (`Range: bytes=...`, honouring If-Range). Full responses go through
+  FileResponse, so WSGI servers with a file wrapper use sendfile().
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _is_immutable(path):
+    return any(re.match(pattern, path) for pattern in getattr(settings, 'MEDIA_IMMUTABLE_PATTERNS', ()))
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single satisfiable byte range; None to ignore the header; raises ValueError if unsatisfiable."""
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if match is None:
+        return None  # malformed or multi-range: serve the whole file, as RFC 9110 allows
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def _content_type(fullpath):
+    return mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _file_response(request, fullpath, stat, etag):
+    size = stat.st_size
+    header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if header and (if_range is None or if_range == etag):
+        try:
+            byte_range = parse_range(header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        if byte_range is not None:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _read_range(fullpath, start, end - start + 1), status=206, content_type=_content_type(fullpath))
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(end - start + 1)
+            return response
+    return FileResponse(open(fullpath, 'rb'))
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(fullpath)
+    except (OSError, SuspiciousFileOperation):
+        raise Http404("File not found")
+    if not os.path.isfile(fullpath):
+        raise Http404("File not found")
+
+    etag = _etag(stat)
+    # 304 for If-None-Match / If-Modified-Since hits, 412 for failed If-Match.
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        offload = getattr(settings, 'MEDIA_SENDFILE', '')
+        if offload == 'x-accel-redirect':
+            response = HttpResponse(content_type=_content_type(fullpath))
+            response['X-Accel-Redirect'] = quote(settings.MEDIA_ACCEL_REDIRECT_PREFIX + path)
+        elif offload == 'x-sendfile':
+            response = HttpResponse(content_type=_content_type(fullpath))
+            response['X-Sendfile'] = fullpath
+        else:
+            response = _file_response(request, fullpath, stat, etag)
+            response['Accept-Ranges'] = 'bytes'
+        response['Last-Modified'] = http_date(stat.st_mtime)
+
+    response['ETag'] = etag
+    if _is_immutable(path):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=getattr(settings, 'MEDIA_CACHE_MAX_AGE', 3600))
+    return response
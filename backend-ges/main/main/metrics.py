@@ -0,0 +1,183 @@
+"""
+Per-route request metrics and their Prometheus text exposition.
+
+RequestMetricsMiddleware (main.middleware) observes every request into the
+histograms below: latency, DB query count and time, serializer time, and
+response size, labelled by the matched URL route (not the raw path, so ids do not
+explode the label space). Recording a sample is a bisect plus a few additions
+under a lock.
+
+Values are per process. With several workers, scrape each one or aggregate on
+the Prometheus side; a restarted worker starts from zero, which Prometheus'
+rate() handles as a counter reset.
+"""
+import contextvars
+import hmac
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> [per-bucket counts (+Inf last), sum]
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0]
+            series[0][index] += 1
+            series[1] += value
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = [(labels, counts[:], total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in sorted(series):
+            base = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels))
+            prefix = base + ',' if base else ''
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _format_number(bound)
+                lines.append(f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{base}}} {_format_number(total)}')
+            lines.append(f'{self.name}_count{{{base}}} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def histogram(self, name, documentation, labelnames, buckets):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def expose(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        for metric in self.metrics:
+            metric.clear()
+
+
+REGISTRY = Registry()
+ROUTE_LABELS = ('method', 'route')
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Time to produce the response.', ROUTE_LABELS + ('status',), LATENCY_BUCKETS)
+DB_QUERIES = REGISTRY.histogram(
+    'http_request_db_queries', 'Database queries run by the request.', ROUTE_LABELS, QUERY_COUNT_BUCKETS)
+DB_TIME = REGISTRY.histogram(
+    'http_request_db_seconds', 'Time spent in database queries.', ROUTE_LABELS, LATENCY_BUCKETS)
+SERIALIZER_TIME = REGISTRY.histogram(
+    'http_request_serializer_seconds', 'Time spent building serializer output.', ROUTE_LABELS, LATENCY_BUCKETS)
+RESPONSE_SIZE = REGISTRY.histogram(
+    'http_response_size_bytes', 'Size of non-streaming response bodies.', ROUTE_LABELS, SIZE_BUCKETS)
+
+
+class RequestStats:
+    """What one request spent; filled in by the DB execute wrapper and the serializer hook."""
+    __slots__ = ('queries', 'db_seconds', 'serializer_seconds', 'in_serializer', 'sql', 'capture_sql')
+
+    def __init__(self, capture_sql=False):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.in_serializer = False
+        self.sql = []
+        self.capture_sql = capture_sql
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_seconds += elapsed
+            if self.capture_sql and len(self.sql) < getattr(settings, 'SLOW_REQUEST_MAX_QUERIES', 100):
+                self.sql.append((elapsed, sql))
+
+
+current_stats = contextvars.ContextVar('request_stats', default=None)
+_instrumented = False
+
+
+def instrument_serializers():
+    """
+    Times DRF's `serializer.data` for the current request. Only the outermost
+    access is timed; nested serializers run inside it and are not counted twice.
+    """
+    global _instrumented
+    if _instrumented:
+        return
+    from rest_framework.serializers import BaseSerializer
+
+    render = BaseSerializer.data.fget
+
+    def timed_data(self):
+        stats = current_stats.get()
+        if stats is None or stats.in_serializer:
+            return render(self)
+        stats.in_serializer = True
+        started = time.perf_counter()
+        try:
+            return render(self)
+        finally:
+            stats.serializer_seconds += time.perf_counter() - started
+            stats.in_serializer = False
+
+    BaseSerializer.data = property(timed_data)
+    _instrumented = True
+
+
+def _allowed(request):
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token:
+        return hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}')
+    return request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', ('127.0.0.1', '::1'))
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. With METRICS_TOKEN set, scrapers must send
+    `Authorization: Bearer <token>`; otherwise only METRICS_ALLOWED_IPS may scrape.
+    Behind a reverse proxy every request arrives from the proxy's address, so
+    either set METRICS_TOKEN or block /metrics at the proxy.
+    """
+    if not _allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(REGISTRY.expose(), content_type=CONTENT_TYPE)
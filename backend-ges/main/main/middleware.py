@@ -0,0 +1,136 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+from .db import replicas
+from .metrics import (
+    DB_QUERIES, DB_TIME, REQUEST_LATENCY, RESPONSE_SIZE, SERIALIZER_TIME, RequestStats, current_stats,
+    instrument_serializers,
+)
+
+slow_logger = logging.getLogger('main.slow_requests')
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RequestMetricsMiddleware:
+    """
+    Records latency, DB query count/time, serializer time and response size per
+    route (see main.metrics), and logs requests slower than
+    SLOW_REQUEST_THRESHOLD_MS together with their SQL when that is set.
+
+    Goes first in MIDDLEWARE so the latency covers the whole stack. Works in both
+    sync and async mode, so it adds no thread hop in front of async views. DB
+    figures are only recorded for requests served synchronously: async ORM
+    queries run on executor threads, outside this request's connection wrapper.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        instrument_serializers()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = RequestStats(capture_sql=self._slow_threshold() is not None)
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(stats.execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        self._record(request, response, stats, time.perf_counter() - started, with_db=True)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        self._record(request, response, stats, time.perf_counter() - started, with_db=False)
+        return response
+
+    def _slow_threshold(self):
+        return getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', None)
+
+    def _record(self, request, response, stats, elapsed, with_db):
+        match = request.resolver_match
+        labels = (request.method, match.route if match is not None else '<unmatched>')
+        REQUEST_LATENCY.observe(labels + (str(response.status_code),), elapsed)
+        SERIALIZER_TIME.observe(labels, stats.serializer_seconds)
+        if with_db:
+            DB_QUERIES.observe(labels, stats.queries)
+            DB_TIME.observe(labels, stats.db_seconds)
+        if not response.streaming:
+            RESPONSE_SIZE.observe(labels, len(response.content))
+
+        threshold = self._slow_threshold()
+        if threshold is not None and elapsed * 1000 >= threshold:
+            slow_logger.warning(
+                "Slow request %s %s: %.1f ms, status %s, %d queries in %.1f ms, serializers %.1f ms%s",
+                request.method, request.get_full_path(), elapsed * 1000, response.status_code,
+                stats.queries, stats.db_seconds * 1000, stats.serializer_seconds * 1000,
+                ''.join(f'\n  [{seconds * 1000:.1f} ms] {sql}' for seconds, sql in stats.sql),
+            )
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Marks each request for `main.db.replicas.ReplicaRouter`: GET, HEAD and OPTIONS
+    requests may read from a replica, others read from the primary. After a
+    request that wrote, the user is pinned to the primary for
+    REPLICA_STICKY_SECONDS so their next reads see the write.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state, token = replicas.begin_request(pinned=request.method not in SAFE_METHODS)
+        try:
+            return self.get_response(request)
+        finally:
+            replicas.end_request(token)
+            self._remember(request, state)
+
+    async def __acall__(self, request):
+        state, token = replicas.begin_request(pinned=request.method not in SAFE_METHODS)
+        try:
+            return await self.get_response(request)
+        finally:
+            replicas.end_request(token)
+            self._remember(request, state)
+
+    def _remember(self, request, state):
+        if not state.wrote or not getattr(settings, 'DATABASE_REPLICAS', ()):
+            return
+        user_pk = state.user_pk
+        if user_pk is None:
+            # DRF copies the authenticated user onto the Django request; only
+            # token users are identified before reading, see replicas.note_user.
+            user = request.__dict__.get('user')
+            user_pk = getattr(user, 'pk', None) if getattr(user, 'is_authenticated', False) else None
+        if user_pk is not None:
+            replicas.remember_write(user_pk)
@@ -6,6 +6,9 @@ from pathlib import Path
 from datetime import timedelta
 import os
 
+from main.db.pool import connection_settings
+from main.logconfig import parse_levels
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = 'django-insecure-q9l$y(9+53&ng5vkr-+*^v80*x)&@z@cqgv+w^mgazrl&c(0()'
@@ -28,10 +31,14 @@ INSTALLED_APPS = [
     'students',
     'teachers',
     'programs',
+    'grades',
+    'jobs',
 
 ]
 
 MIDDLEWARE = [
+    'main.middleware.RequestMetricsMiddleware',
+    'main.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -44,7 +51,7 @@ MIDDLEWARE = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
     ),
 }
 
@@ -76,6 +83,10 @@ CORS_ALLOW_HEADERS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Seconds ClaimsJWTAuthentication reuses a user's claims (role, is_active, ...)
+# from the default cache before reading the row again.
+AUTH_USER_CACHE_TTL = 30
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=10),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -99,22 +110,128 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'main.wsgi.application'
 
-DATABASES = {
+# Both caches default to per-process memory. For several worker processes point
+# them at a shared backend, e.g. CATALOG_CACHE_BACKEND=
+# django.core.cache.backends.filebased.FileBasedCache with a directory in
+# CATALOG_CACHE_LOCATION, so writes in one worker invalidate the others. The
+# default cache (DEFAULT_CACHE_BACKEND / DEFAULT_CACHE_LOCATION) holds the
+# "my term" aggregates, the user claims read by ClaimsJWTAuthentication and the
+# read-your-writes replica pins.
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'backend-ges',
-        'USER': 'root',
-        'PASSWORD': '',
-        'HOST': 'localhost',
-        'PORT': '3306',
-        'OPTIONS': {
-            'init_command': "SET sql_mode='STRICT_TRANS_TABLES'"
+        'BACKEND': os.environ.get('DEFAULT_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DEFAULT_CACHE_LOCATION', ''),
+    },
+    'catalog': {
+        'BACKEND': os.environ.get('CATALOG_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CATALOG_CACHE_LOCATION', 'catalog'),
+        'TIMEOUT': 300,
+    },
+}
+
+# In-memory schedule index (programs.conflicts): rebuilt after this many seconds
+# to pick up other workers' writes. Free-slot queries search between
+# TIMETABLE_DAY_START and TIMETABLE_DAY_END.
+SCHEDULE_INDEX_TTL = 300
+TIMETABLE_DAY_START = '07:00'
+TIMETABLE_DAY_END = '21:00'
+
+# In-memory search index (programs.search) behind /api/programs/search/: kept
+# current by this process's signals, rebuilt after this many seconds to pick up
+# other workers' writes.
+SEARCH_INDEX_TTL = 900
+
+# Database. DB_ENGINE=sqlite swaps MySQL for a local SQLite file (DB_NAME,
+# default db.sqlite3) for development and tests without a MySQL server.
+# DB_CONNECTIONS picks how each worker process manages connections (main.db.pool):
+#   pool         requests check a connection out of a pool of at most DB_POOL_SIZE
+#                and return it when they finish; pooled connections are pinged
+#                after DB_POOL_PING_AFTER idle seconds and replaced after
+#                DB_POOL_RECYCLE seconds, and a request waits DB_POOL_TIMEOUT
+#                seconds for a free one before failing;
+#   persistent   each thread keeps its own connection for DB_CONN_MAX_AGE seconds,
+#                health-checked before reuse (CONN_HEALTH_CHECKS);
+#   per-request  connect and disconnect around every request (Django's default).
+# `manage.py bench_connections` compares the three.
+DB_ENGINE = os.environ.get('DB_ENGINE', 'mysql')
+DB_CONNECTIONS = os.environ.get('DB_CONNECTIONS', 'pool')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+DB_POOL = {
+    'MAX_SIZE': int(os.environ.get('DB_POOL_SIZE', 10)),
+    'TIMEOUT': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    'RECYCLE': int(os.environ.get('DB_POOL_RECYCLE', 3600)),
+    'PING_AFTER': int(os.environ.get('DB_POOL_PING_AFTER', 30)),
+}
+
+if DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'main.db.sqlite3',
+            'NAME': os.environ.get('DB_NAME', str(BASE_DIR / 'db.sqlite3')),
         }
     }
-}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'main.db.mysql',
+            'NAME': os.environ.get('DB_NAME', 'backend-ges'),
+            'USER': os.environ.get('DB_USER', 'root'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '3306'),
+            'OPTIONS': {
+                'init_command': "SET sql_mode='STRICT_TRANS_TABLES'"
+            }
+        }
+    }
+DATABASES['default'].update(connection_settings(DB_CONNECTIONS, DB_CONN_MAX_AGE, DB_POOL))
+
+# Read replicas (main.db.replicas). DB_REPLICAS lists replica hosts (host or
+# host:port) or, with DB_ENGINE=sqlite, database files; they become the aliases
+# replica1, replica2, ... Reads of GET/HEAD/OPTIONS requests go to a replica that
+# is up and at most REPLICA_MAX_LAG seconds behind (checked every
+# REPLICA_CHECK_INTERVAL seconds), everything else to the primary, and a user
+# who wrote reads from the primary for REPLICA_STICKY_SECONDS afterwards. That
+# pin is kept in the REPLICA_PIN_CACHE alias, which must be shared by all
+# workers (see CACHES) or a user's next request may land on one that never saw
+# the write. Locally, `manage.py sync_sqlite_replicas` copies a SQLite primary to its
+# replicas, standing in for replication.
+DATABASE_REPLICAS = []
+for n, location in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1):
+    replica = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    if DB_ENGINE == 'sqlite':
+        replica['NAME'] = location
+    else:
+        host, _, port = location.partition(':')
+        replica.update(HOST=host, PORT=port or replica['PORT'])
+    DATABASES[f'replica{n}'] = replica
+    DATABASE_REPLICAS.append(f'replica{n}')
+
+DATABASE_ROUTERS = ['main.db.replicas.ReplicaRouter']
+REPLICA_MAX_LAG = 5
+REPLICA_CHECK_INTERVAL = 5
+REPLICA_STICKY_SECONDS = 30
+REPLICA_PIN_CACHE = os.environ.get('REPLICA_PIN_CACHE', 'default')
 
 AUTH_USER_MODEL = 'users.User'
 
+# PBKDF2 work factor; changing it rehashes each password on its next login.
+PASSWORD_HASH_ITERATIONS = 1_000_000
+
+PASSWORD_HASHERS = [
+    'users.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Hashing pool per process: concurrent hashes (default: CPU count) and how many
+# more logins may wait before new ones get a 503.
+LOGIN_HASH_WORKERS = None
+LOGIN_HASH_QUEUE_LIMIT = 64
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -130,29 +247,105 @@ USE_TZ = True
 MEDIA_URL = '/media/'  # URL to access media files
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Media serving (main.media). Set MEDIA_SERVE=False when the front server serves
+# MEDIA_URL from MEDIA_ROOT itself. Otherwise MEDIA_SENDFILE='x-accel-redirect'
+# (nginx, internal location at MEDIA_ACCEL_REDIRECT_PREFIX) or 'x-sendfile'
+# (Apache/lighttpd) leaves the transfer to the front server; left empty, Django
+# streams the file. Paths matching MEDIA_IMMUTABLE_PATTERNS are content-addressed
+# and cached for a year; other files for MEDIA_CACHE_MAX_AGE seconds.
+MEDIA_SERVE = os.environ.get('MEDIA_SERVE', 'true').lower() in ('1', 'true', 'yes')
+MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE', '')
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+MEDIA_IMMUTABLE_PATTERNS = [r'^avatars/[0-9a-f]{2}/[0-9a-f]{64}/']
+MEDIA_CACHE_MAX_AGE = 60 * 60
+
+# Avatar uploads are re-encoded into square renditions of these pixel sizes, one
+# file per format, stored content-addressed under MEDIA_ROOT/avatars/ (see
+# users.avatars). API responses return the AVATAR_THUMBNAIL_SIZE JPEG as
+# `avatar`; uploads larger than AVATAR_MAX_PIXELS are rejected before decoding.
+AVATAR_SIZES = (64, 128, 256)
+AVATAR_FORMATS = ('webp', 'jpg')
+AVATAR_THUMBNAIL_SIZE = 128
+AVATAR_MAX_PIXELS = 25_000_000
+
 STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Relative weight of each grading period in a subject's final grade.
+GRADING_PERIOD_WEIGHTS = {'prelim': 1, 'midterm': 1, 'finals': 1}
+
+# Request metrics, served in Prometheus text format at /metrics to the listed
+# addresses, or, when METRICS_TOKEN is set, to requests bearing that token. Behind
+# a reverse proxy REMOTE_ADDR is the proxy's own (often loopback) address, so set
+# METRICS_TOKEN or block /metrics at the proxy. Set SLOW_REQUEST_THRESHOLD_MS to
+# log slower requests (logger 'main.slow_requests') with up to
+# SLOW_REQUEST_MAX_QUERIES of their SQL.
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+SLOW_REQUEST_THRESHOLD_MS = None
+SLOW_REQUEST_MAX_QUERIES = 100
+
+# Background jobs. The database backend queues rows for `manage.py run_jobs`
+# workers; 'jobs.backends.ImmediateBackend' runs jobs inline (no worker needed).
+# Failed attempts are retried after JOBS_RETRY_DELAY seconds, doubling each time;
+# a running job whose lock is older than JOBS_LOCK_TIMEOUT is treated as orphaned.
+JOBS_BACKEND = os.environ.get('JOBS_BACKEND', 'jobs.backends.DatabaseBackend')
+JOBS_FILE_ROOT = BASE_DIR / 'job_files'
+JOBS_POLL_INTERVAL = 2
+JOBS_RETRY_DELAY = 30
+JOBS_LOCK_TIMEOUT = 15 * 60
+
+# Transcripts and report cards (students.records) are stored content-addressed
+# under RECORDS_ROOT, outside MEDIA_ROOT. Rendering a whole program uses
+# RECORDS_BATCH_WORKERS processes (None: one per CPU).
+RECORDS_ROOT = BASE_DIR / 'records'
+RECORDS_BATCH_WORKERS = None
+
+# Logging. Loggers hand records to the 'queue' handler, which only enqueues them;
+# a listener thread (main.logconfig) formats them and writes JSON lines to
+# LOG_FILE plus plain text to the console, so requests never block on log I/O.
+# The file rotates at LOG_MAX_BYTES, keeping LOG_BACKUP_COUNT old files (swap in
+# logging.handlers.TimedRotatingFileHandler for daily files). LOG_LEVEL sets the
+# root level; LOG_LEVELS overrides single loggers, e.g.
+# LOG_LEVELS="django.db.backends=DEBUG,jobs.runner=WARNING".
+LOG_FILE = os.environ.get('LOG_FILE', str(BASE_DIR / 'app.log'))
+LOG_MAX_BYTES = 20 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'main.logconfig.JsonFormatter',
+        },
+        'console': {
+            'format': '%(asctime)s %(levelname)s %(name)s: %(message)s',
+        },
+    },
     'handlers': {
-        'file': {
-            'level': 'DEBUG',
-            'class': 'logging.FileHandler',
-            'filename': BASE_DIR / 'debug.log',
+        'json_file': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': LOG_FILE,
+            'maxBytes': LOG_MAX_BYTES,
+            'backupCount': LOG_BACKUP_COUNT,
+            'encoding': 'utf-8',
+            'formatter': 'json',
         },
         'console': {
-            'level': 'DEBUG',
             'class': 'logging.StreamHandler',
+            'formatter': 'console',
         },
-    },
-    'loggers': {
-        '': {
-            'handlers': ['file', 'console'],
-            'level': 'DEBUG',
-            'propagate': True,
+        'queue': {
+            '()': 'main.logconfig.QueueListenerHandler',
+            'handlers': ['cfg://handlers.json_file', 'cfg://handlers.console'],
+            'queue_size': 10000,
         },
     },
-}
\ No newline at end of file
+    'root': {
+        'handlers': ['queue'],
+        'level': os.environ.get('LOG_LEVEL', 'INFO').upper(),
+    },
+    'loggers': parse_levels(os.environ.get('LOG_LEVELS', '')),
+}
@@ -0,0 +1,309 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError, connections
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from programs.models import Program
+from users.models import User
+from users.tokens import ClaimsRefreshToken
+from .db.pool import connection_settings, get_pool, reset_pools
+from .db.replicas import PIN_CACHE_KEY, copy_sqlite_replica, replica_health
+from .logconfig import JsonFormatter, QueueListenerHandler, parse_levels
+from .metrics import REGISTRY
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        REGISTRY.clear()
+        self.teacher = User.objects.create_user(
+            email='teacher@example.com', password='pass12345', username='teacher',
+            first_name='T', last_name='Eacher', role='teacher'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        self.program = Program.objects.create(code='BSCS', name='Computer Science')
+
+    def test_metrics_are_labelled_by_route(self):
+        self.client.get(f'/api/programs/programs/{self.program.pk}/')
+        body = self.client.get('/metrics').content.decode()
+        route = 'method="GET",route="api/programs/programs/<int:pk>/"'
+        self.assertIn(f'http_request_duration_seconds_count{{{route},status="200"}} 1', body)
+        self.assertIn(f'http_request_db_queries_count{{{route}}} 1', body)
+        self.assertIn(f'http_request_serializer_seconds_count{{{route}}} 1', body)
+        self.assertIn(f'http_response_size_bytes_bucket{{{route},le="256"}} 1', body)
+
+    def test_metrics_endpoint_is_restricted(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.9').status_code, 403)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_metrics_token_replaces_the_address_check(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        response = self.client.get('/metrics', REMOTE_ADDR='10.0.0.9', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_slow_request_log_includes_sql(self):
+        with self.assertLogs('main.slow_requests', 'WARNING') as logs:
+            self.client.get('/api/programs/programs/')
+        self.assertIn('Slow request GET /api/programs/programs/', logs.output[0])
+        self.assertIn('FROM "programs_program"', logs.output[0])
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+class LoggingPipelineTests(SimpleTestCase):
+    def setUp(self):
+        self.target = ListHandler()
+        self.target.setFormatter(JsonFormatter())
+        self.logger = logging.getLogger('main.tests.pipeline')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+
+    def tearDown(self):
+        self.logger.handlers.clear()
+        self.logger.propagate = True
+
+    def test_records_are_written_as_json_by_the_listener(self):
+        handler = QueueListenerHandler([self.target])
+        self.logger.addHandler(handler)
+        args = ['first']
+        self.logger.info("got %s", args, extra={'user_id': 7})
+        args.append('second')  # mutated after the call: the message must not change
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            self.logger.exception("failed")
+        handler.close()
+
+        info, error = (json.loads(line) for line in self.target.lines)
+        self.assertEqual((info['level'], info['message'], info['user_id']), ('INFO', "got ['first']", 7))
+        self.assertEqual(error['logger'], 'main.tests.pipeline')
+        self.assertIn('ZeroDivisionError', error['exc_info'])
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = QueueListenerHandler([self.target], queue_size=1)
+        handler.listener.stop()  # nothing drains the queue
+        self.logger.addHandler(handler)
+        for _ in range(3):
+            self.logger.info("x")
+        self.assertEqual(handler.dropped, 2)
+
+    def test_parse_levels(self):
+        self.assertEqual(parse_levels('django.db.backends=warning, users=DEBUG,'),
+                         {'django.db.backends': {'level': 'WARNING'}, 'users': {'level': 'DEBUG'}})
+
+
+class MediaServingTests(SimpleTestCase):
+    digest = 'ab' * 32
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.path = f'avatars/ab/{self.digest}/64.jpg'
+        os.makedirs(os.path.dirname(os.path.join(self.media, self.path)))
+        with open(os.path.join(self.media, self.path), 'wb') as f:
+            f.write(b'0123456789')
+
+    def test_content_addressed_file_is_immutable_and_revalidates(self):
+        response = self.client.get(f'/media/{self.path}')
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        again = self.client.get(f'/media/{self.path}', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_range_requests(self):
+        response = self.client.get(f'/media/{self.path}', HTTP_RANGE='bytes=2-4')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-4/10')
+        self.assertEqual(b''.join(response.streaming_content), b'234')
+        self.assertEqual(b''.join(self.client.get(f'/media/{self.path}', HTTP_RANGE='bytes=-3').streaming_content), b'789')
+        self.assertEqual(self.client.get(f'/media/{self.path}', HTTP_RANGE='bytes=20-').status_code, 416)
+        stale = self.client.get(f'/media/{self.path}', HTTP_RANGE='bytes=2-4', HTTP_IF_RANGE='"old"')
+        self.assertEqual(stale.status_code, 200)
+
+    @override_settings(MEDIA_SENDFILE='x-accel-redirect')
+    def test_transfer_is_offloaded_to_front_server(self):
+        response = self.client.get(f'/media/{self.path}')
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.path}')
+        self.assertEqual(response.content, b'')
+
+    def test_paths_outside_media_root_are_not_served(self):
+        self.assertEqual(self.client.get('/media/avatars/%2E%2E/%2E%2E/manage.py').status_code, 404)
+        self.assertEqual(self.client.get('/media/avatars/').status_code, 404)
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.addCleanup(reset_pools)
+        self.database = {'ENGINE': 'main.db.sqlite3', 'NAME': os.path.join(directory, 'pool.sqlite3')}
+
+    def connection(self, **pool):
+        handler = ConnectionHandler({
+            'default': {'ENGINE': 'django.db.backends.dummy'},
+            'pooled': {**self.database, **connection_settings('pool', pool={'TIMEOUT': 0.05, **pool})},
+        })
+        return handler['pooled']
+
+    def test_connections_are_reused_across_requests(self):
+        conn = self.connection()
+        conn.ensure_connection()
+        raw = conn.connection
+        conn.close_if_unusable_or_obsolete()  # end of request: back to the pool
+        conn.ensure_connection()
+        self.assertIs(conn.connection, raw)
+        conn.close()
+        self.assertEqual(get_pool(conn.settings_dict, 'pooled').stats()['opened'], 1)
+
+    def test_pool_is_bounded(self):
+        first, second = self.connection(MAX_SIZE=1), self.connection(MAX_SIZE=1)
+        first.ensure_connection()
+        with self.assertRaises(OperationalError):
+            second.ensure_connection()
+        first.close()
+        second.ensure_connection()
+        second.close()
+        self.assertEqual(get_pool(first.settings_dict, 'pooled').stats()['timeouts'], 1)
+
+    def test_dead_idle_connection_is_replaced(self):
+        conn = self.connection(PING_AFTER=0)
+        conn.ensure_connection()
+        raw = conn.connection
+        conn.close()
+        raw.close()  # e.g. the server dropped it while idle
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertIsNot(conn.connection, raw)
+        conn.close()
+        self.assertEqual(get_pool(conn.settings_dict, 'pooled').stats()['discarded'], 1)
+
+    def test_open_transaction_is_rolled_back_on_return(self):
+        conn = self.connection()
+        with conn.cursor() as cursor:
+            cursor.execute('CREATE TABLE t (n integer)')
+        conn.set_autocommit(False)
+        with conn.cursor() as cursor:
+            cursor.execute('INSERT INTO t VALUES (1)')
+        conn.close()
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM t')
+            self.assertEqual(cursor.fetchone(), (0,))
+        conn.close()
+
+    def test_modes(self):
+        self.assertEqual(connection_settings('per-request'), {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'POOL': False})
+        persistent = connection_settings('persistent', 300)
+        self.assertEqual((persistent['CONN_MAX_AGE'], persistent['CONN_HEALTH_CHECKS']), (300, True))
+        self.assertEqual(connection_settings('pool', pool={'MAX_SIZE': 4})['POOL']['MAX_SIZE'], 4)
+        with self.assertRaises(ImproperlyConfigured):
+            connection_settings('always')
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """A second SQLite file stands in for the replica; copy_sqlite_replica plays replication."""
+    databases = '__all__'  # resolved in setUpClass, once replica1 exists
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.replica_path = os.path.join(cls.directory, 'replica.sqlite3')
+        connections.settings['replica1'] = {**connections.settings['default'], 'NAME': cls.replica_path}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica1'].close()
+        del connections['replica1']
+        del connections.settings['replica1']
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        caches['default'].clear()
+        replica_health.reset()
+        self.addCleanup(replica_health.reset)
+        override = override_settings(DATABASE_REPLICAS=['replica1'])
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.program = Program.objects.create(code='BSCS', name='Computer Science')
+        self.teacher = self.user('teacher@example.com', role='teacher')
+        self.other_teacher = self.user('other@example.com', role='teacher')
+        copy_sqlite_replica('replica1')
+        # Written after the copy: only the primary has this student.
+        self.student = self.user('student@example.com', role='student', student_id='2024-0001', program=self.program)
+
+    def user(self, email, **fields):
+        return User.objects.create_user(email=email, password='pass12345', username=email.split('@')[0],
+                                        first_name='First', last_name='Last', **fields)
+
+    def request(self, method, url, user, **kwargs):
+        token = ClaimsRefreshToken.for_user(user).access_token
+        return getattr(self.client, method)(url, HTTP_AUTHORIZATION=f'Bearer {token}',
+                                            content_type='application/json', **kwargs)
+
+    def class_list(self, user):
+        response = self.request('get', f'/api/students/programs/{self.program.pk}/students/', user)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_safe_requests_read_from_the_replica(self):
+        self.assertEqual(self.class_list(self.teacher), [])
+        copy_sqlite_replica('replica1')
+        self.assertEqual(len(self.class_list(self.teacher)), 1)
+
+    def test_writer_reads_own_writes_from_the_primary(self):
+        response = self.request('put', '/api/users/me/', self.teacher, data=json.dumps({'last_name': 'Updated'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.request('get', '/api/users/me/', self.teacher).json()['last_name'], 'Updated')
+        self.assertEqual(len(self.class_list(self.teacher)), 1)
+        self.assertEqual(self.class_list(self.other_teacher), [])  # not pinned: still the replica
+
+    def test_pin_is_seen_by_other_workers_through_a_shared_cache(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        shared = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+        with self.settings(CACHES={**settings.CACHES, 'default': shared}):
+            response = self.request('put', '/api/users/me/', self.teacher, data=json.dumps({'last_name': 'Updated'}))
+            self.assertEqual(response.status_code, 200)
+            other_worker = caches.create_connection('default')
+            self.assertTrue(other_worker.get(PIN_CACHE_KEY.format(self.teacher.pk)))
+            del caches['default']  # the next request opens a fresh connection, as another process would
+            self.assertEqual(len(self.class_list(self.teacher)), 1)
+
+    def test_lagging_replica_is_skipped(self):
+        with connections['replica1'].cursor() as cursor:
+            cursor.execute('UPDATE replica_heartbeat SET copied_at = copied_at - 60')
+        with self.assertLogs('main.db.replicas', 'WARNING'):
+            self.assertEqual(len(self.class_list(self.teacher)), 1)
+
+    def test_unreachable_replica_is_skipped(self):
+        replica = connections['replica1']
+        replica.close()
+        replica.settings_dict['NAME'] = os.path.join(self.directory, 'missing', 'replica.sqlite3')
+        self.addCleanup(replica.settings_dict.__setitem__, 'NAME', self.replica_path)
+        self.addCleanup(replica.close)
+        with self.assertLogs('main.db.replicas', 'WARNING'):
+            self.assertEqual(len(self.class_list(self.teacher)), 1)
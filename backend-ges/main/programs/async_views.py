@@ -0,0 +1,160 @@
+# programs/async_views.py
+"""
+Async versions of the read-heavy catalog endpoints, routed by `main.asgi_urls`
+when the project is served through `main.asgi`.
+
+They answer the same URLs with the same bodies as the DRF views, but authenticate
+from the token claims and read through Django's async ORM and cache API, so one
+event loop keeps serving other requests while a read waits on the database.
+Anything that is not a plain GET (writes, OPTIONS, and `cursor`/`page_size`
+pages) is handed to the DRF view unchanged.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.shortcuts import aget_object_or_404
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from users.authentication import ClaimsJWTAuthentication
+from .cache import acached_entry, etag_matches
+from .models import Program, Subject, Schedule
+from .pagination import KeysetPagination
+from .serializers import ProgramSerializer, SubjectSerializer, ScheduleSerializer
+from .views import (
+    IsTeacherOrAdmin, ProgramListView, ProgramDetailView, SubjectListView, SubjectDetailView,
+    ScheduleListView, ScheduleDetailView,
+)
+
+
+def json_response(data, status=200):
+    # Same renderer as the DRF views, so both paths return byte-identical bodies.
+    return HttpResponse(JSONRenderer().render(data), content_type='application/json', status=status)
+
+
+def _paginated(request):
+    return KeysetPagination.cursor_query_param in request.GET or KeysetPagination.page_size_query_param in request.GET
+
+
+async def _authorize(request, permission_class):
+    """Sets request.user from the bearer token; returns an error response or None."""
+    authenticator = ClaimsJWTAuthentication()
+    try:
+        result = await authenticator.aauthenticate(request)
+    except AuthenticationFailed as exc:
+        response = json_response(exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}, 401)
+        response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+        return response
+    if result is None:
+        response = json_response({"detail": "Authentication credentials were not provided."}, 401)
+        response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+        return response
+    request.user, request.auth = result
+    if not permission_class().has_permission(request, None):
+        return json_response({"detail": "You do not have permission to perform this action."}, 403)
+    return None
+
+
+def async_read_view(permission_class, fallback):
+    """
+    Turns an async GET handler into a view. The handler runs after authentication and
+    the permission check; every other request goes to `fallback` (the DRF view).
+    """
+    fallback = sync_to_async(fallback)
+
+    def decorator(handler):
+        @wraps(handler)
+        async def view(request, *args, **kwargs):
+            if request.method != 'GET' or _paginated(request):
+                return await fallback(request, *args, **kwargs)
+            denied = await _authorize(request, permission_class)
+            if denied is not None:
+                return denied
+            try:
+                return await handler(request, *args, **kwargs)
+            except Http404 as exc:
+                return json_response({"detail": str(exc) or "Not found."}, 404)
+        return csrf_exempt(view)
+    return decorator
+
+
+def serializer_context(request):
+    return {'request': Request(request)}
+
+
+def _load_related(queryset, serializer_class, context, related_fields):
+    # Same rule as RelatedLoadingMixin: join only what the (possibly trimmed) serializer renders.
+    rendered = serializer_class(context=context).fields
+    paths = [path for field, path in (related_fields or {}).items() if field in rendered]
+    return queryset.select_related(*paths) if paths else queryset
+
+
+async def serialize_list(request, queryset, serializer_class, related_fields=None):
+    """Async twin of ListAPIView.list() for unpaginated reads."""
+    context = serializer_context(request)
+    queryset = _load_related(queryset, serializer_class, context, related_fields)
+    return serializer_class([obj async for obj in queryset], many=True, context=context).data
+
+
+async def serialize_one(request, queryset, serializer_class, pk, related_fields=None):
+    """Async twin of RetrieveAPIView.retrieve(); raises Http404 like get_object()."""
+    context = serializer_context(request)
+    queryset = _load_related(queryset, serializer_class, context, related_fields)
+    return serializer_class(await aget_object_or_404(queryset, pk=pk), context=context).data
+
+
+async def cached_catalog_response(request, render):
+    """Async twin of CachedCatalogMixin: ETag, 304 and the shared catalog cache."""
+    etag, data = await acached_entry(request, render)
+    response = HttpResponse(status=304) if etag_matches(request, etag) else json_response(data)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@async_read_view(IsTeacherOrAdmin, ProgramListView.as_view())
+async def program_list(request):
+    return await cached_catalog_response(
+        request, lambda: serialize_list(request, Program.objects.all(), ProgramSerializer)
+    )
+
+
+@async_read_view(IsTeacherOrAdmin, ProgramDetailView.as_view())
+async def program_detail(request, pk):
+    return await cached_catalog_response(
+        request, lambda: serialize_one(request, Program.objects.all(), ProgramSerializer, pk)
+    )
+
+
+@async_read_view(IsTeacherOrAdmin, SubjectListView.as_view())
+async def subject_list(request):
+    return await cached_catalog_response(
+        request, lambda: serialize_list(request, Subject.objects.all(), SubjectSerializer, SubjectListView.related_fields)
+    )
+
+
+@async_read_view(IsTeacherOrAdmin, SubjectDetailView.as_view())
+async def subject_detail(request, pk):
+    return await cached_catalog_response(
+        request,
+        lambda: serialize_one(request, Subject.objects.all(), SubjectSerializer, pk, SubjectDetailView.related_fields),
+    )
+
+
+@async_read_view(IsTeacherOrAdmin, ScheduleListView.as_view())
+async def schedule_list(request):
+    queryset = Schedule.objects.all()
+    subject_id = request.GET.get('subject_id')
+    if subject_id:
+        queryset = queryset.filter(subject_id=subject_id)
+    return await cached_catalog_response(request, lambda: serialize_list(request, queryset, ScheduleSerializer))
+
+
+@async_read_view(IsTeacherOrAdmin, ScheduleDetailView.as_view())
+async def schedule_detail(request, pk):
+    return await cached_catalog_response(
+        request, lambda: serialize_one(request, Schedule.objects.all(), ScheduleSerializer, pk)
+    )
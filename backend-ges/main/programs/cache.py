@@ -0,0 +1,117 @@
+# programs/cache.py
+"""
+Read-through cache for catalog (program, subject, schedule) GET responses.
+
+Keys carry a catalog version number, and any Program/Subject/Schedule write bumps
+it (see `programs.signals`), so stale entries are never read again and simply age
+out. Entries hold the serialized data plus its ETag so a matching
+`If-None-Match` is answered with 304 without touching the database.
+
+The cache alias is `catalog`. With the default local-memory backend the version
+counter is per process, so another worker's writes are only seen once entries
+expire (CACHES['catalog']['TIMEOUT']); point the alias at a shared backend
+(file-based, memcached, redis) to invalidate across processes.
+"""
+import hashlib
+import json
+
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework import status
+from rest_framework.response import Response
+
+from main.db.replicas import primary
+
+CATALOG_CACHE_ALIAS = 'catalog'
+VERSION_KEY = 'catalog:version'
+
+
+def _cache():
+    return caches[CATALOG_CACHE_ALIAS]
+
+
+def catalog_version():
+    cache = _cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+async def acatalog_version():
+    cache = _cache()
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, 1, timeout=None)
+        version = await cache.aget(VERSION_KEY, 1)
+    return version
+
+
+def bump_catalog_version():
+    cache = _cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, timeout=None)
+
+
+def compute_etag(data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True).encode()
+    return '"%s"' % hashlib.md5(payload).hexdigest()
+
+
+def etag_matches(request, etag):
+    return etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]
+
+
+async def acached_entry(request, render):
+    """
+    Async read-through for the async views: returns the cached `(etag, data)` for
+    the request URL, awaiting `render()` for the data on a miss. Entries are shared
+    with CachedCatalogMixin, since both key on the catalog version and the URL.
+    """
+    cache = _cache()
+    key = f"catalog:v{await acatalog_version()}:{request.build_absolute_uri()}"
+    entry = await cache.aget(key)
+    if entry is None:
+        with primary():  # a lagging replica must not be cached under the current version
+            data = await render()
+        entry = (compute_etag(data), data)
+        await cache.aset(key, entry)
+    return entry
+
+
+class CachedCatalogMixin:
+    """
+    Serves list/retrieve from the catalog cache. Runs after authentication and
+    permission checks, so a cached response is never shown to a caller the view
+    would have refused.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(request, lambda: super(CachedCatalogMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(request, lambda: super(CachedCatalogMixin, self).retrieve(request, *args, **kwargs))
+
+    def _cached_response(self, request, render):
+        cache = _cache()
+        key = f"catalog:v{catalog_version()}:{request.build_absolute_uri()}"
+        entry = cache.get(key)
+        if entry is None:
+            with primary():  # a lagging replica must not be cached under the current version
+                response = render()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            entry = (compute_etag(response.data), response.data)
+            cache.set(key, entry)
+        etag, data = entry
+
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
@@ -0,0 +1,366 @@
+# programs/conflicts.py
+"""
+In-memory interval index used to detect schedule conflicts.
+
+Every schedule slot is filed under one bucket per resource it occupies: its room,
+each teacher assigned to its subject and each student enrolled in its subject,
+split by day. A bucket keeps its intervals sorted by start time, so an overlap
+query is two binary searches plus the handful of intervals that actually fall in
+the window, instead of a table scan.
+
+The same buckets are the materialized weekly timetables: a person's or room's
+week is the sorted contents of its five day buckets, and free rooms and free
+slots are the gaps between them (see `programs.timetables`).
+
+The index lives in the process that built it. Signals in `programs.signals` keep
+it in step with writes made by this process once they commit; writes made by
+other workers are picked up when the index is rebuilt after `SCHEDULE_INDEX_TTL`
+seconds. It can therefore lag, so it answers reads only: writes are checked
+against the database by `slot_conflicts`, under `schedule_writes()`.
+"""
+import threading
+import time as _time
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+from main.db.replicas import primary
+
+ROOM, TEACHER, STUDENT = 'room', 'teacher', 'student'
+SCHEDULE_LOCK_NAME = 'programs.schedule_writes'
+SCHEDULE_LOCK_TIMEOUT = 10  # seconds
+DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday')
+_END = float('inf')
+
+
+def minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def room_key(room):
+    return room.strip().casefold()
+
+
+class _Bucket:
+    __slots__ = ('items', 'max_length')
+
+    def __init__(self):
+        self.items = []  # (start, end, schedule_id), sorted
+        self.max_length = 0
+
+    def add(self, start, end, schedule_id):
+        insort(self.items, (start, end, schedule_id))
+        # Never shrunk on removal: a stale maximum only widens the search window.
+        self.max_length = max(self.max_length, end - start)
+
+    def remove(self, start, end, schedule_id):
+        entry = (start, end, schedule_id)
+        i = bisect_left(self.items, entry)
+        if i < len(self.items) and self.items[i] == entry:
+            del self.items[i]
+
+    def overlapping(self, start, end, exclude=None):
+        # Anything overlapping [start, end) starts after start - max_length and before end.
+        lo = bisect_right(self.items, (start - self.max_length, _END))
+        hi = bisect_left(self.items, (end,))
+        return [sid for s, e, sid in self.items[lo:hi] if e > start and sid != exclude]
+
+
+class ScheduleIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._buckets = defaultdict(_Bucket)  # (kind, key, day) -> _Bucket
+        self._slots = {}  # schedule_id -> (subject_id, day, start, end, room)
+        self._schedules_by_subject = defaultdict(set)
+        self._people = {TEACHER: defaultdict(set), STUDENT: defaultdict(set)}  # kind -> subject_id -> ids
+        self._subjects = {}  # subject_id -> (course_code, title), for rendering timetables
+        self._rooms = {}  # room_key -> room name as first written; kept until the next rebuild
+        self.built_at = None
+
+    @classmethod
+    def build(cls):
+        from programs.models import Schedule, Subject
+        from students.models import Student
+        from teachers.models import Teacher
+
+        index = cls()
+        with index._lock, primary():  # cached for SCHEDULE_INDEX_TTL, so never read from a lagging replica
+            people = [
+                (TEACHER, Teacher.assigned_subjects.through.objects.values_list('teacher_id', 'subject_id')),
+                (STUDENT, Student.enrolled_subjects.through.objects.values_list('student_id', 'subject_id')),
+            ]
+            for kind, rows in people:
+                for person_id, subject_id in rows.iterator(chunk_size=5000):
+                    index._people[kind][subject_id].add(person_id)
+            for subject_id, course_code, title in Subject.objects.values_list('id', 'course_code', 'title').iterator(chunk_size=5000):
+                index._subjects[subject_id] = (course_code, title)
+            rows = Schedule.objects.values_list('id', 'subject_id', 'day', 'start_time', 'end_time', 'room')
+            for schedule_id, subject_id, day, start, end, room in rows.iterator(chunk_size=5000):
+                index._add_slot(schedule_id, subject_id, day, minutes(start), minutes(end), room)
+            index.built_at = _time.monotonic()
+        return index
+
+    def _keys(self, subject_id, room):
+        yield ROOM, room_key(room)
+        for kind in (TEACHER, STUDENT):
+            for person_id in self._people[kind].get(subject_id, ()):
+                yield kind, person_id
+
+    def _add_slot(self, schedule_id, subject_id, day, start, end, room):
+        self._slots[schedule_id] = (subject_id, day, start, end, room)
+        self._schedules_by_subject[subject_id].add(schedule_id)
+        self._rooms.setdefault(room_key(room), room.strip())
+        for kind, key in self._keys(subject_id, room):
+            self._buckets[kind, key, day].add(start, end, schedule_id)
+
+    def _remove_slot(self, schedule_id):
+        slot = self._slots.pop(schedule_id, None)
+        if slot is None:
+            return
+        subject_id, day, start, end, room = slot
+        self._schedules_by_subject[subject_id].discard(schedule_id)
+        for kind, key in self._keys(subject_id, room):
+            bucket = self._buckets.get((kind, key, day))
+            if bucket is not None:
+                bucket.remove(start, end, schedule_id)
+
+    # Incremental maintenance -------------------------------------------------
+
+    def save_schedule(self, schedule):
+        with self._lock:
+            self._remove_slot(schedule.pk)
+            self._add_slot(
+                schedule.pk, schedule.subject_id, schedule.day,
+                minutes(schedule.start_time), minutes(schedule.end_time), schedule.room
+            )
+
+    def delete_schedule(self, schedule_id):
+        with self._lock:
+            self._remove_slot(schedule_id)
+
+    def save_subject(self, subject):
+        with self._lock:
+            self._subjects[subject.pk] = (subject.course_code, subject.title)
+
+    def delete_subject(self, subject_id):
+        with self._lock:
+            self._subjects.pop(subject_id, None)
+
+    def link(self, kind, person_id, subject_id):
+        """Files every slot of `subject_id` under `person_id` (a teacher assignment or enrollment)."""
+        with self._lock:
+            if person_id in self._people[kind][subject_id]:
+                return
+            self._people[kind][subject_id].add(person_id)
+            for schedule_id in self._schedules_by_subject.get(subject_id, ()):
+                _, day, start, end, _ = self._slots[schedule_id]
+                self._buckets[kind, person_id, day].add(start, end, schedule_id)
+
+    def unlink(self, kind, person_id, subject_id):
+        with self._lock:
+            if person_id not in self._people[kind].get(subject_id, ()):
+                return
+            self._people[kind][subject_id].discard(person_id)
+            for schedule_id in self._schedules_by_subject.get(subject_id, ()):
+                _, day, start, end, _ = self._slots[schedule_id]
+                bucket = self._buckets.get((kind, person_id, day))
+                if bucket is not None:
+                    bucket.remove(start, end, schedule_id)
+
+    # Queries -----------------------------------------------------------------
+
+    def conflicts_for_slot(self, subject_id, day, start_time, end_time, room, exclude=None):
+        """Returns (kind, key, schedule_id) for every booking that would clash with the proposed slot."""
+        start, end = minutes(start_time), minutes(end_time)
+        found = []
+        with self._lock:
+            for kind, key in self._keys(subject_id, room):
+                bucket = self._buckets.get((kind, key, day))
+                if bucket is not None:
+                    found.extend((kind, key, sid) for sid in bucket.overlapping(start, end, exclude))
+        return found
+
+    def conflicts_for_enrollment(self, kind, person_id, subject_id):
+        """Returns the schedule ids already held by `person_id` that clash with any slot of `subject_id`."""
+        found = []
+        with self._lock:
+            own = self._schedules_by_subject.get(subject_id, set())
+            for schedule_id in own:
+                _, day, start, end, _ = self._slots[schedule_id]
+                bucket = self._buckets.get((kind, person_id, day))
+                if bucket is not None:
+                    found.extend(sid for sid in bucket.overlapping(start, end) if sid not in own)
+        return found
+
+    def slots_for_subject(self, subject_id):
+        with self._lock:
+            return [self._slots[sid][1:4] for sid in self._schedules_by_subject.get(subject_id, ())]
+
+    def timetable(self, kind, key):
+        """{day: [(start, end, schedule_id, subject_id, room)]} sorted by start; a read of five buckets."""
+        if kind == ROOM:
+            key = room_key(key)
+        week = {}
+        with self._lock:
+            for day in DAYS:
+                bucket = self._buckets.get((kind, key, day))
+                if bucket is not None and bucket.items:
+                    week[day] = [(start, end, sid, self._slots[sid][0], self._slots[sid][4]) for start, end, sid in bucket.items]
+        return week
+
+    def subject_names(self, subject_ids):
+        with self._lock:
+            return {sid: self._subjects[sid] for sid in subject_ids if sid in self._subjects}
+
+    def busy(self, resources, day):
+        """Merged busy intervals [(start, end)] on `day` across `resources` ((kind, key) pairs)."""
+        intervals = []
+        with self._lock:
+            for kind, key in resources:
+                bucket = self._buckets.get((kind, room_key(key) if kind == ROOM else key, day))
+                if bucket is not None:
+                    intervals.extend((start, end) for start, end, _ in bucket.items)
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return [tuple(interval) for interval in merged]
+
+    def free_slots(self, resources, day, window_start, window_end, min_length=1):
+        """Gaps of at least `min_length` minutes in [window_start, window_end) when every resource is free."""
+        gaps, cursor = [], window_start
+        for start, end in self.busy(resources, day):
+            if start >= window_end:
+                break
+            if start - cursor >= min_length:
+                gaps.append((cursor, start))
+            cursor = max(cursor, end)
+        if window_end - cursor >= min_length:
+            gaps.append((cursor, window_end))
+        return gaps
+
+    def free_rooms(self, day, start, end):
+        """Names of known rooms with no booking overlapping [start, end) on `day`."""
+        with self._lock:
+            return sorted(
+                name for key, name in self._rooms.items()
+                if not (bucket := self._buckets.get((ROOM, key, day))) or not bucket.overlapping(start, end)
+            )
+
+    def all_conflicts(self, kinds=(ROOM, TEACHER, STUDENT), schedule_ids=None):
+        """
+        Sweeps every bucket once and yields (kind, key, day, first_id, second_id) for each
+        overlapping pair. `schedule_ids` restricts the report to pairs touching those schedules.
+        """
+        with self._lock:
+            buckets = [(k, b.items[:]) for k, b in self._buckets.items() if k[0] in kinds and len(b.items) > 1]
+        for (kind, key, day), items in buckets:
+            active = []  # (end, schedule_id) of intervals still open at the sweep position
+            for start, end, schedule_id in items:
+                active = [(e, sid) for e, sid in active if e > start]
+                for _, other in active:
+                    if schedule_ids is None or schedule_id in schedule_ids or other in schedule_ids:
+                        yield kind, key, day, other, schedule_id
+                active.append((end, schedule_id))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def schedule_index():
+    """Returns the process-wide index, building it on first use and after it expires."""
+    global _index
+    ttl = getattr(settings, 'SCHEDULE_INDEX_TTL', 300)
+    index = _index
+    if index is None or _time.monotonic() - index.built_at > ttl:
+        with _index_lock:
+            if _index is None or _time.monotonic() - _index.built_at > ttl:
+                _index = ScheduleIndex.build()
+            index = _index
+    return index
+
+
+def loaded_index():
+    """Returns the index only if this process has already built it; signals use this to skip cold processes."""
+    return _index
+
+
+def reset_schedule_index():
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def slot_conflicts(subject_id, day, start_time, end_time, room, exclude=None):
+    """
+    Returns (kind, key, schedule_id) for every booking that would clash with the
+    proposed slot, like `ScheduleIndex.conflicts_for_slot` but read from the
+    primary database, so it also sees what other workers wrote. At most three
+    queries: the slots overlapping the window on that day, then the teachers and
+    students those slots share with `subject_id`.
+    """
+    from programs.models import Schedule
+    from students.models import Student
+    from teachers.models import Teacher
+
+    key = room_key(room)
+    found = []
+    by_subject = defaultdict(list)
+    with primary():
+        overlapping = Schedule.objects.filter(day=day, start_time__lt=end_time, end_time__gt=start_time).exclude(pk=exclude)
+        for schedule_id, other_subject, other_room in overlapping.values_list('id', 'subject_id', 'room'):
+            if room_key(other_room) == key:
+                found.append((ROOM, key, schedule_id))
+            by_subject[other_subject].append(schedule_id)
+        if not by_subject:
+            return found
+        people = [
+            (TEACHER, Teacher.assigned_subjects.through, 'teacher_id'),
+            (STUDENT, Student.enrolled_subjects.through, 'student_id'),
+        ]
+        for kind, through, person_field in people:
+            shared = through.objects.filter(**{
+                f'{person_field}__in': through.objects.filter(subject_id=subject_id).values(person_field),
+                'subject_id__in': list(by_subject),
+            }).values_list(person_field, 'subject_id')
+            for person_id, other_subject in shared:
+                found.extend((kind, person_id, schedule_id) for schedule_id in by_subject[other_subject])
+    return found
+
+
+@contextmanager
+def schedule_writes():
+    """
+    A transaction on the primary in which schedule and enrollment writes run one
+    at a time across all workers, so a `slot_conflicts` check and the save it
+    guards cannot interleave with another writer's. MySQL takes a named lock
+    (GET_LOCK) until the transaction has committed, PostgreSQL a transaction
+    advisory lock, and SQLite its database write lock, taken up front.
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    if connection.vendor == 'mysql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT GET_LOCK(%s, %s)', [SCHEDULE_LOCK_NAME, SCHEDULE_LOCK_TIMEOUT])
+            if cursor.fetchone()[0] != 1:
+                raise OperationalError("Timed out waiting for other schedule writes.")
+        try:
+            with transaction.atomic():
+                yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT RELEASE_LOCK(%s)', [SCHEDULE_LOCK_NAME])
+        return
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', [SCHEDULE_LOCK_NAME])
+            elif connection.vendor == 'sqlite':
+                # A write statement, even one that matches no row, takes the write lock.
+                cursor.execute('UPDATE programs_schedule SET id = id WHERE 0')
+        yield
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:07
+
+from django.db import migrations, models
+from django.db.models import Count
+
+# Double bookings listed in the error; the rest are counted.
+REPORTED_DUPLICATES = 50
+
+
+def check_double_booked_rooms(apps, schema_editor):
+    """Fails with the schedules to fix, instead of the IntegrityError the unique constraint would raise."""
+    Schedule = apps.get_model('programs', 'Schedule')
+    slots = list(
+        Schedule.objects.values('room', 'day', 'start_time').annotate(schedules=Count('id'))
+        .filter(schedules__gt=1).order_by('room', 'day', 'start_time')
+        .values_list('room', 'day', 'start_time')
+    )
+    if not slots:
+        return
+    lines = []
+    for room, day, start_time in slots[:REPORTED_DUPLICATES]:
+        ids = Schedule.objects.filter(room=room, day=day, start_time=start_time).order_by('id').values_list('id', flat=True)
+        lines.append(f"  {room}, {day} {start_time:%H:%M}: schedules {', '.join(map(str, ids))}")
+    if len(slots) > REPORTED_DUPLICATES:
+        lines.append(f"  ... and {len(slots) - REPORTED_DUPLICATES} more")
+    raise RuntimeError(
+        f"Cannot add schedule_room_slot_unique: {len(slots)} room slot(s) are booked more than once. "
+        "Move or delete the extra schedules, then migrate again.\n" + '\n'.join(lines)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0003_remove_program_created_at_remove_schedule_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['subject', 'day', 'start_time'], name='schedule_subject_day_idx'),
+        ),
+        migrations.RunPython(check_double_booked_rooms, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='schedule',
+            constraint=models.UniqueConstraint(fields=('room', 'day', 'start_time'), name='schedule_room_slot_unique'),
+        ),
+    ]
@@ -32,5 +32,19 @@ class Schedule(models.Model):
     end_time = models.TimeField()
     room = models.CharField(max_length=100)
 
+    class Meta:
+        indexes = [
+            # ScheduleListView: filter by subject, ordered by day and time.
+            models.Index(fields=['subject', 'day', 'start_time'], name='schedule_subject_day_idx'),
+            # slot_conflicts: the slots of one day overlapping a time window.
+            models.Index(fields=['day', 'start_time', 'end_time'], name='schedule_day_time_idx'),
+        ]
+        constraints = [
+            # Also serves room availability lookups as an index on (room, day, start_time).
+            # Exact match only: 'R101' and 'r101' pass it, and are caught as the same
+            # room by slot_conflicts (programs.conflicts.room_key) when a schedule is saved.
+            models.UniqueConstraint(fields=['room', 'day', 'start_time'], name='schedule_room_slot_unique'),
+        ]
+
     def __str__(self):
         return f"{self.subject.title} - {self.day} {self.start_time}-{self.end_time}"
\ No newline at end of file
@@ -0,0 +1,23 @@
+# programs/pagination.py
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination on the primary key.
+
+    Each page is fetched with `WHERE id > <cursor> ORDER BY id LIMIT n`, so the
+    cost of a page does not grow with how deep into the table the client is.
+    Pagination is opt-in: clients that send neither `cursor` nor `page_size`
+    keep receiving a plain list, which is what the existing frontend expects.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = 'id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
@@ -0,0 +1,377 @@
+# programs/search.py
+"""
+In-memory search index over students, teachers, subjects and programs.
+
+Every document (a student or teacher account, a subject, a program) is broken
+into terms: the words of names and titles, and whole identifiers (emails,
+student IDs, course and program codes, also with their punctuation removed,
+so '2024-0001' is found by '20240001'). Each term has a posting tuple, and
+words and identifiers each have a sorted term list, so a prefix is a binary
+search plus a short scan (capped per list, so thousands of emails starting
+with 'ma' cannot crowd out the name 'Mark'). Name and title words are also
+filed under their letter pairs, which finds words within one or two typos of a
+query prefix ('snatos' -> Santos) without scanning the vocabulary;
+identifiers are matched by prefix only.
+
+A query matches documents containing every query token. Exact terms rank above
+prefixes, prefixes above typo matches, then programs, subjects, teachers and
+students in that order, then by label.
+
+The index lives in the process that built it, like the schedule index
+(programs.conflicts): signals in `programs.signals` apply this process's
+writes, and the index is rebuilt after SEARCH_INDEX_TTL seconds to pick up
+other workers' writes and bulk inserts.
+"""
+import re
+import threading
+import time as _time
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from heapq import merge, nsmallest
+
+from django.conf import settings
+
+from main.db.replicas import primary
+
+PROGRAM, SUBJECT, TEACHER, STUDENT = 'program', 'subject', 'teacher', 'student'
+KINDS = (PROGRAM, SUBJECT, TEACHER, STUDENT)
+KIND_ORDER = {kind: n for n, kind in enumerate(KINDS)}
+PEOPLE = (STUDENT, TEACHER)
+EXACT, PREFIX, FUZZY = 3, 2, 1
+MIN_QUERY_LENGTH = 2
+FUZZY_MIN_LENGTH = 4  # shorter tokens have too many neighbours to be worth guessing
+MAX_TOKENS = 5
+MAX_EXPANSIONS = 300  # terms a prefix may expand to, per sorted list
+SORT_CANDIDATES = 2000  # multi-word matches sorted outright; more are walked in result order
+WORD_RE = re.compile(r'[^\W_]+')
+PUNCTUATION = '.,;:!?"\'()[]{}'
+
+
+def normalize(text):
+    """Case- and accent-insensitive form: 'Peña' -> 'pena'."""
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in text if not unicodedata.combining(char)).casefold()
+
+
+def compact(text):
+    return ''.join(WORD_RE.findall(text))
+
+
+def bigrams(word):
+    padded = '^' + word
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+def prefix_distance(query, word, limit):
+    """
+    Edit distance, counting adjacent transpositions, from `query` to the closest
+    prefix of `word`; anything above `limit` is reported as limit + 1.
+    """
+    word = word[:len(query) + limit]
+    before, previous = None, list(range(len(word) + 1))
+    for i in range(1, len(query) + 1):
+        current = [i] + [0] * len(word)
+        for j in range(1, len(word) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (query[i - 1] != word[j - 1]))
+            if i > 1 and j > 1 and query[i - 1] == word[j - 2] and query[i - 2] == word[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous)
+
+
+def _words(*values):
+    return {word for value in values if value for word in WORD_RE.findall(normalize(value))}
+
+
+def _identifiers(*values):
+    terms = set()
+    for value in values:
+        if value:
+            value = normalize(value).strip()
+            terms.add(value)
+            if compact(value):
+                terms.add(compact(value))
+    return terms
+
+
+def _full_name(first, middle, last):
+    return ' '.join(part for part in (first, middle, last) if part)
+
+
+def user_document(pk, role, first_name, middle_name, last_name, email, student_id):
+    """(key, label, detail, words, identifiers) for a student or teacher account; None for other roles."""
+    if role not in PEOPLE:
+        return None
+    identifiers = _identifiers(email, student_id if role == STUDENT else None)
+    detail = (student_id or email) if role == STUDENT else email
+    return (role, pk), _full_name(first_name, middle_name, last_name), detail, _words(first_name, middle_name, last_name), identifiers
+
+
+def subject_document(pk, course_code, title):
+    return (SUBJECT, pk), title, course_code, _words(title), _identifiers(course_code)
+
+
+def program_document(pk, code, name):
+    return (PROGRAM, pk), name, code, _words(name), _identifiers(code)
+
+
+class SearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._documents = {}  # (kind, pk) -> (label, detail, tuple of terms, casefolded label)
+        self._postings = {}  # term -> tuple of (kind, pk), in result order (see _rank)
+        self._word_terms = []  # sorted name/title words
+        self._identifier_terms = []  # sorted emails, student IDs and codes
+        self._grams = defaultdict(set)  # letter pair -> name/title words containing it
+        self.built_at = None
+
+    @classmethod
+    def build(cls):
+        from programs.models import Program, Subject
+        from users.models import User
+
+        sources = [
+            (user_document, User.objects.filter(role__in=PEOPLE).values_list(
+                'pk', 'role', 'first_name', 'middle_name', 'last_name', 'email', 'student_id')),
+            (subject_document, Subject.objects.values_list('pk', 'course_code', 'title')),
+            (program_document, Program.objects.values_list('pk', 'code', 'name')),
+        ]
+        with primary():
+            return cls.from_documents(
+                make_document(*row) for make_document, rows in sources for row in rows.iterator(chunk_size=5000)
+            )
+
+    @classmethod
+    def from_documents(cls, documents):
+        """Bulk load, much faster than repeated save(): postings and term lists are sorted once at the end."""
+        index = cls()
+        postings = defaultdict(list)
+        word_terms, identifier_terms = set(), set()
+        with index._lock:
+            for key, label, detail, words, identifiers in documents:
+                terms = words | identifiers
+                index._documents[key] = (label, detail, tuple(terms), label.casefold())
+                for term in terms:
+                    postings[term].append(key)
+                word_terms |= words
+                identifier_terms |= identifiers
+            for word in word_terms:
+                for gram in bigrams(word):
+                    index._grams[gram].add(word)
+            index._postings = {term: tuple(sorted(keys, key=index._rank)) for term, keys in postings.items()}
+            index._word_terms = sorted(word_terms)
+            index._identifier_terms = sorted(identifier_terms)
+            index.built_at = _time.monotonic()
+        return index
+
+    def __len__(self):
+        return len(self._documents)
+
+    def _rank(self, key):
+        """Order among equally good matches: programs, subjects, teachers, students, each by label."""
+        return KIND_ORDER[key[0]], self._documents[key][3], key[1]
+
+    # Incremental updates, called from programs.signals.
+
+    def save(self, document):
+        """Adds or replaces a document built by user_document / subject_document / program_document."""
+        key, label, detail, words, identifiers = document
+        terms = words | identifiers
+        with self._lock:
+            self._remove(key)
+            self._documents[key] = (label, detail, tuple(terms), label.casefold())
+            rank = self._rank(key)
+            for term in terms:
+                keys = self._postings.get(term, ())
+                position = bisect_left(keys, rank, key=self._rank)
+                self._postings[term] = keys[:position] + (key,) + keys[position:]
+            for group, sorted_terms in ((words, self._word_terms), (identifiers, self._identifier_terms)):
+                for term in group:
+                    position = bisect_left(sorted_terms, term)
+                    if position == len(sorted_terms) or sorted_terms[position] != term:
+                        sorted_terms.insert(position, term)
+            for word in words:
+                for gram in bigrams(word):
+                    self._grams[gram].add(word)
+
+    def delete(self, kind, pk):
+        with self._lock:
+            self._remove((kind, pk))
+
+    def save_user(self, user):
+        with self._lock:
+            for kind in PEOPLE:  # the role may have changed
+                self._remove((kind, user.pk))
+            document = user_document(user.pk, user.role, user.first_name, user.middle_name, user.last_name,
+                                     user.email, user.student_id)
+            if document is not None:
+                self.save(document)
+
+    def _remove(self, key):
+        entry = self._documents.get(key)
+        if entry is None:
+            return
+        rank = self._rank(key)
+        for term in entry[2]:
+            keys = self._postings[term]
+            position = bisect_left(keys, rank, key=self._rank)
+            keys = keys[:position] + keys[position + 1:]
+            if keys:
+                self._postings[term] = keys
+                continue
+            del self._postings[term]
+            for sorted_terms in (self._word_terms, self._identifier_terms):
+                position = bisect_left(sorted_terms, term)
+                if position < len(sorted_terms) and sorted_terms[position] == term:
+                    del sorted_terms[position]
+            for gram in bigrams(term):
+                words = self._grams.get(gram)
+                if words is not None:
+                    words.discard(term)
+                    if not words:
+                        del self._grams[gram]
+        del self._documents[key]
+
+    # Queries.
+
+    def search(self, query, kinds=KINDS, limit=10):
+        """[{'kind', 'id', 'label', 'detail'}] of the best `limit` documents matching every token of `query`."""
+        tokens = [token for token in (normalize(part).strip(PUNCTUATION) for part in query.split()) if token]
+        if sum(len(token) for token in tokens) < MIN_QUERY_LENGTH:
+            return []
+        with self._lock:
+            tiers = [self._tiers(token, limit) for token in tokens[:MAX_TOKENS]]
+            if not all(tiers):
+                return []
+            if len(tiers) == 1:
+                best = self._first(tiers[0], kinds, limit)
+            else:
+                best = self._best(tiers, kinds, limit)
+            return [
+                {'kind': kind, 'id': pk, 'label': self._documents[kind, pk][0], 'detail': self._documents[kind, pk][1]}
+                for kind, pk in best
+            ]
+
+    def _first(self, tiers, kinds, limit):
+        """The first `limit` matches of a single token: tier by tier, each already in result order."""
+        best, seen = [], set()
+        for _, terms in tiers:
+            for _, key in merge(*(self._ranked(self._postings[term]) for term in terms)):
+                if key not in seen and key[0] in kinds:
+                    seen.add(key)
+                    best.append(key)
+                    if len(best) == limit:
+                        return best
+        return best
+
+    def _walk(self, tiers, kinds, limit, best_score, score):
+        """
+        Merges the postings of one token's `tiers` in result order, scoring each document
+        by `score(key)` (0 drops it) and stopping at the `limit`th one with `best_score`.
+        """
+        found = defaultdict(list)
+        seen = set()
+        for _, key in merge(*(self._ranked(self._postings[term]) for _, terms in tiers for term in terms)):
+            if key in seen or key[0] not in kinds:
+                continue
+            seen.add(key)
+            key_score = score(key)
+            if not key_score:
+                continue
+            found[key_score].append(key)
+            if key_score == best_score and len(found[key_score]) >= limit:
+                break
+        return [key for key_score in sorted(found, reverse=True) for key in found[key_score]][:limit]
+
+    def _ranked(self, keys):
+        for key in keys:
+            yield self._rank(key), key
+
+    def _best(self, tiers, kinds, limit):
+        """Best `limit` documents matching every token, scored by how well each token matched."""
+        matches = [
+            [(quality, set().union(*(self._postings[term] for term in terms))) for quality, terms in token_tiers]
+            for token_tiers in tiers
+        ]
+        matched = sorted((set().union(*(keys for _, keys in token_matches)) for token_matches in matches), key=len)
+        candidates = matched[0].intersection(*matched[1:])
+
+        def score(key):
+            if key not in candidates:
+                return 0
+            return sum(next(quality for quality, keys in token_matches if key in keys) for token_matches in matches)
+
+        if len(candidates) <= SORT_CANDIDATES:
+            return nsmallest(limit, (key for key in candidates if key[0] in kinds), key=lambda key: (-score(key), self._rank(key)))
+        # Too many to sort: walk the most selective token's postings in result order instead.
+        driver = min(tiers, key=lambda token_tiers: sum(len(self._postings[term]) for _, terms in token_tiers for term in terms))
+        return self._walk(driver, kinds, limit, sum(token_tiers[0][0] for token_tiers in tiers), score)
+
+    def _tiers(self, token, limit):
+        """
+        [(quality, terms)], best quality first, for the terms equal to, starting
+        with, or a typo away from `token`. Typos are only looked for when the token has
+        fewer than `limit` exact and prefix matches: 'maria' never needs 'mario'.
+        """
+        exact, prefixed = [], []
+        for sorted_terms in (self._word_terms, self._identifier_terms):
+            for form in {token, compact(token)} - {''}:
+                start = bisect_left(sorted_terms, form)
+                for term in sorted_terms[start:start + MAX_EXPANSIONS]:
+                    if not term.startswith(form):
+                        break
+                    (exact if term == form else prefixed).append(term)
+        tiers = [(EXACT, exact), (PREFIX, prefixed)]
+        if len(token) >= FUZZY_MIN_LENGTH and sum(len(self._postings[term]) for term in exact + prefixed) < limit:
+            tiers.append((FUZZY, self._near_words(token)))
+        return [(quality, list(dict.fromkeys(terms))) for quality, terms in tiers if terms]
+
+    def _near_words(self, token):
+        """Name and title words whose start is within one typo of `token` (two for tokens of 8+ characters)."""
+        limit = 1 if len(token) < 8 else 2
+        grams = bigrams(token)
+        # A typo breaks at most three of the token's letter pairs (a swap of two letters), so
+        # closer words share the rest.
+        shared = Counter(word for gram in grams for word in self._grams.get(gram, ()))
+        threshold = max(len(grams) - 3 * limit, 1)
+        near = {}  # only the first len(token) + limit characters matter, and many words share them
+        words = []
+        for word, count in shared.items():
+            if count >= threshold and not word.startswith(token):
+                start = word[:len(token) + limit]
+                if start not in near:
+                    near[start] = prefix_distance(token, start, limit) <= limit
+                if near[start]:
+                    words.append(word)
+        return words
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def search_index():
+    """Returns the process-wide index, building it on first use and after it expires."""
+    global _index
+    ttl = getattr(settings, 'SEARCH_INDEX_TTL', 900)
+    index = _index
+    if index is None or _time.monotonic() - index.built_at > ttl:
+        with _index_lock:
+            if _index is None or _time.monotonic() - _index.built_at > ttl:
+                _index = SearchIndex.build()
+            index = _index
+    return index
+
+
+def loaded_search_index():
+    """Returns the index only if this process has already built it; signals use this to skip cold processes."""
+    return _index
+
+
+def reset_search_index():
+    global _index
+    with _index_lock:
+        _index = None
@@ -1,8 +1,28 @@
 # programs/serializers.py
 from rest_framework import serializers
 from .models import Program, Subject, Schedule
+from .conflicts import schedule_writes, slot_conflicts
 
-class ProgramSerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    """
+    Lets GET requests trim the response with `?fields=id,code,name`.
+    Unknown names are ignored; write requests always get the full serializer.
+    """
+    fields_query_param = 'fields'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        requested = request.query_params.get(self.fields_query_param)
+        if not requested:
+            return
+        keep = {name.strip() for name in requested.split(',') if name.strip()}
+        for name in set(self.fields) - keep:
+            self.fields.pop(name)
+
+class ProgramSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Program
         fields = ['id', 'code', 'name', 'department', 'description']
@@ -12,7 +32,7 @@ class ProgramSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Program code must be unique.")
         return value
 
-class SubjectSerializer(serializers.ModelSerializer):
+class SubjectSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     program = ProgramSerializer(read_only=True)  # Include nested program data
     program_id = serializers.PrimaryKeyRelatedField(
         queryset=Program.objects.all(), source='program', write_only=True
@@ -32,7 +52,7 @@ class SubjectSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Credits must be a positive integer.")
         return value
 
-class ScheduleSerializer(serializers.ModelSerializer):
+class ScheduleSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     subject_id = serializers.PrimaryKeyRelatedField(
         queryset=Subject.objects.all(), source='subject', write_only=True
     )
@@ -42,6 +62,40 @@ class ScheduleSerializer(serializers.ModelSerializer):
         fields = ['id', 'subject_id', 'day', 'start_time', 'end_time', 'room']
     
     def validate(self, data):
-        if data['start_time'] >= data['end_time']:
+        slot = {
+            field: data.get(field, getattr(self.instance, field, None))
+            for field in ('subject', 'day', 'start_time', 'end_time', 'room')
+        }
+        if slot['start_time'] >= slot['end_time']:
             raise serializers.ValidationError("End time must be after start time.")
-        return data
\ No newline at end of file
+
+        return data
+
+    def _check_conflicts(self, data):
+        slot = {
+            field: data.get(field, getattr(self.instance, field, None))
+            for field in ('subject', 'day', 'start_time', 'end_time', 'room')
+        }
+        # Checked against the database, not the schedule index, which can lag other workers' writes.
+        conflicts = slot_conflicts(
+            slot['subject'].pk, slot['day'], slot['start_time'], slot['end_time'], slot['room'],
+            exclude=self.instance.pk if self.instance else None
+        )
+        if conflicts:
+            messages = sorted({
+                f"{kind.capitalize()} {key} is already booked by schedule {schedule_id}."
+                for kind, key, schedule_id in conflicts
+            })
+            raise serializers.ValidationError(messages)
+
+    # The check runs with the save, under the schedule write lock, so two
+    # concurrent requests cannot both pass it and book the same slot.
+    def create(self, validated_data):
+        with schedule_writes():
+            self._check_conflicts(validated_data)
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with schedule_writes():
+            self._check_conflicts(validated_data)
+            return super().update(instance, validated_data)
\ No newline at end of file
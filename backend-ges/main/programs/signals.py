@@ -0,0 +1,129 @@
+# programs/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from students.models import Student
+from teachers.models import Teacher
+from users.models import User
+from .models import Program, Subject, Schedule
+from .conflicts import STUDENT, TEACHER, loaded_index, reset_schedule_index
+from .cache import bump_catalog_version
+from . import search
+
+
+@receiver(post_save, sender=Program)
+@receiver(post_save, sender=Subject)
+@receiver(post_save, sender=Schedule)
+@receiver(post_delete, sender=Program)
+@receiver(post_delete, sender=Subject)
+@receiver(post_delete, sender=Schedule)
+def invalidate_catalog_cache(sender, **kwargs):
+    # After commit: bumped earlier, a concurrent read could cache the old rows under the new version.
+    transaction.on_commit(bump_catalog_version)
+
+
+def _when_committed(update, loaded=loaded_index):
+    """
+    Applies `update(index)` to the index `loaded()` returns once the surrounding
+    transaction commits, so a rolled back write never reaches the index. Cold
+    processes have no index to update.
+    """
+    def apply():
+        index = loaded()
+        if index is not None:
+            update(index)
+
+    if loaded() is not None:
+        transaction.on_commit(apply)
+
+
+@receiver(post_save, sender=Schedule)
+def index_saved_schedule(sender, instance, **kwargs):
+    _when_committed(lambda index: index.save_schedule(instance))
+
+
+@receiver(post_save, sender=Subject)
+def index_saved_subject(sender, instance, **kwargs):
+    _when_committed(lambda index: index.save_subject(instance))
+
+
+@receiver(post_delete, sender=Subject)
+def unindex_deleted_subject(sender, instance, **kwargs):
+    pk = instance.pk
+    _when_committed(lambda index: index.delete_subject(pk))
+
+
+@receiver(post_delete, sender=Schedule)
+def unindex_deleted_schedule(sender, instance, **kwargs):
+    pk = instance.pk
+    _when_committed(lambda index: index.delete_schedule(pk))
+
+
+def _sync_links(kind, instance, action, reverse, pk_set):
+    if action == 'post_clear':
+        # The cleared ids are no longer known here; let the next caller rebuild.
+        _when_committed(lambda index: reset_schedule_index())
+        return
+    if action not in ('post_add', 'post_remove'):
+        return
+    links = [(pk, instance.pk) if reverse else (instance.pk, pk) for pk in pk_set]
+
+    def update(index):
+        apply = index.link if action == 'post_add' else index.unlink
+        for person_id, subject_id in links:
+            apply(kind, person_id, subject_id)
+
+    _when_committed(update)
+
+
+@receiver(m2m_changed, sender=Student.enrolled_subjects.through)
+def index_enrollment(sender, instance, action, reverse, pk_set, **kwargs):
+    _sync_links(STUDENT, instance, action, reverse, pk_set)
+
+
+@receiver(m2m_changed, sender=Teacher.assigned_subjects.through)
+def index_assignment(sender, instance, action, reverse, pk_set, **kwargs):
+    _sync_links(TEACHER, instance, action, reverse, pk_set)
+
+
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Teacher)
+def drop_deleted_person(sender, instance, **kwargs):
+    # Cascaded through-row deletes do not send m2m_changed.
+    _when_committed(lambda index: reset_schedule_index())
+
+
+@receiver(post_save, sender=User)
+def search_index_saved_user(sender, instance, **kwargs):
+    _when_committed(lambda index: index.save_user(instance), search.loaded_search_index)
+
+
+@receiver(post_delete, sender=User)
+def search_unindex_deleted_user(sender, instance, **kwargs):
+    pk = instance.pk
+
+    def update(index):
+        for kind in search.PEOPLE:
+            index.delete(kind, pk)
+
+    _when_committed(update, search.loaded_search_index)
+
+
+@receiver(post_save, sender=Subject)
+def search_index_saved_subject(sender, instance, **kwargs):
+    document = search.subject_document(instance.pk, instance.course_code, instance.title)
+    _when_committed(lambda index: index.save(document), search.loaded_search_index)
+
+
+@receiver(post_save, sender=Program)
+def search_index_saved_program(sender, instance, **kwargs):
+    document = search.program_document(instance.pk, instance.code, instance.name)
+    _when_committed(lambda index: index.save(document), search.loaded_search_index)
+
+
+@receiver(post_delete, sender=Subject)
+@receiver(post_delete, sender=Program)
+def search_unindex_deleted(sender, instance, **kwargs):
+    kind, pk = search.SUBJECT if sender is Subject else search.PROGRAM, instance.pk
+    _when_committed(lambda index: index.delete(kind, pk), search.loaded_search_index)
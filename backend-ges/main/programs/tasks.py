@@ -0,0 +1,12 @@
+# programs/tasks.py
+from jobs.registry import task
+from .exports import export_chunks
+from .views import ScheduleExportView, schedule_rows
+
+
+@task('programs.export_schedules')
+def export_schedules(job):
+    output = job.payload.get('output', 'csv')
+    rows = schedule_rows(job.payload.get('subject_id'))
+    job.save_output(f'schedules.{output}', export_chunks(rows, ScheduleExportView.columns, output, progress=job.set_progress))
+    return {"file": job.output_file.name}
@@ -1,3 +1,401 @@
-from django.test import TestCase
+from datetime import time
 
-# Create your tests here.
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from users.models import User
+from users.tokens import ClaimsRefreshToken
+from .cache import catalog_version
+from .conflicts import reset_schedule_index
+from .models import Program, Subject, Schedule
+from .search import reset_search_index
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url)
+    assert response.status_code == 200, response.content
+    return len(ctx.captured_queries)
+
+
+class ProgramListPaginationTests(TestCase):
+    def setUp(self):
+        caches['catalog'].clear()
+        self.teacher = User.objects.create_user(
+            email='teacher@example.com', password='pass12345', username='teacher',
+            first_name='T', last_name='Eacher', role='teacher'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        Program.objects.bulk_create(
+            Program(code=f'P{i:03}', name=f'Program {i}') for i in range(7)
+        )
+
+    def test_unpaginated_by_default(self):
+        response = self.client.get('/api/programs/programs/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 7)
+
+    def test_cursor_pages_cover_all_rows(self):
+        seen = []
+        url = '/api/programs/programs/?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, sorted(Program.objects.values_list('id', flat=True)))
+
+    def test_sparse_fieldset(self):
+        response = self.client.get('/api/programs/programs/?fields=id,code')
+        self.assertEqual(set(response.data[0]), {'id', 'code'})
+
+
+class CatalogQueryCountTests(TestCase):
+    """Query counts on /api/programs/* must not grow with the number of rows returned."""
+
+    def setUp(self):
+        caches['catalog'].clear()
+        self.teacher = User.objects.create_user(
+            email='teacher@example.com', password='pass12345', username='teacher',
+            first_name='T', last_name='Eacher', role='teacher'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        self.batch = 0
+
+    def add_rows(self, count):
+        self.batch += 1
+        with self.captureOnCommitCallbacks(execute=True):  # the catalog version is bumped on commit
+            for i in range(count):
+                program = Program.objects.create(code=f'B{self.batch}P{i}', name=f'Program {i}')
+                subject = Subject.objects.create(
+                    program=program, course_code=f'B{self.batch}S{i}', title=f'Subject {i}', credits=3
+                )
+                Schedule.objects.create(
+                    subject=subject, day='Monday', start_time=time(8), end_time=time(9), room=f'B{self.batch}R{i}'
+                )
+
+    def assert_flat(self, url):
+        self.add_rows(1)
+        small = count_queries(self.client, url)
+        self.add_rows(10)
+        large = count_queries(self.client, url)
+        self.assertEqual(small, large, f'{url} issued {small} queries for 1 row and {large} for 11')
+
+    def test_program_list(self):
+        self.assert_flat('/api/programs/programs/')
+
+    def test_subject_list(self):
+        self.assert_flat('/api/programs/subjects/')
+
+    def test_subject_list_paginated(self):
+        self.assert_flat('/api/programs/subjects/?page_size=100')
+
+    def test_schedule_list(self):
+        self.assert_flat('/api/programs/schedules/')
+
+    def test_subject_detail(self):
+        self.add_rows(1)
+        subject = Subject.objects.first()
+        self.assertEqual(count_queries(self.client, f'/api/programs/subjects/{subject.pk}/'), 1)
+
+
+class ScheduleConflictTests(TestCase):
+    def setUp(self):
+        reset_schedule_index()
+        caches['catalog'].clear()
+        self.teacher = User.objects.create_user(
+            email='teacher@example.com', password='pass12345', username='teacher',
+            first_name='T', last_name='Eacher', role='teacher'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        program = Program.objects.create(code='BSCS', name='Computer Science')
+        self.math = Subject.objects.create(program=program, course_code='MATH1', title='Math', credits=3)
+        self.art = Subject.objects.create(program=program, course_code='ART1', title='Art', credits=2)
+        self.booked = Schedule.objects.create(
+            subject=self.math, day='Monday', start_time=time(8), end_time=time(10), room='R101'
+        )
+
+    def post_schedule(self, subject, start, end, room):
+        return self.client.post('/api/programs/schedules/', {
+            'subject_id': subject.pk, 'day': 'Monday', 'start_time': start, 'end_time': end, 'room': room
+        }, format='json')
+
+    def test_room_double_booking_rejected(self):
+        response = self.post_schedule(self.art, '09:00', '11:00', 'r101 ')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Room r101 is already booked', str(response.data))
+
+    def test_adjacent_slot_allowed(self):
+        response = self.post_schedule(self.art, '10:00', '11:00', 'R101')
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def test_student_overlap_rejected_after_enrollment(self):
+        self.post_schedule(self.art, '09:00', '10:00', 'R202')
+        self.client.get('/api/programs/schedules/conflicts/')  # builds the index
+        student = User.objects.create_user(
+            email='s1@example.com', password='pass12345', username='s1', first_name='Stu',
+            last_name='Dent', role='student', student_id='S1'
+        ).student_profile
+        with self.captureOnCommitCallbacks(execute=True):
+            student.enrolled_subjects.add(self.math, self.art)
+        response = self.client.get('/api/programs/schedules/conflicts/?kind=student')
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['conflicts'][0]['key'], student.pk)
+
+    def test_moving_schedule_updates_index(self):
+        response = self.client.put(f'/api/programs/schedules/{self.booked.pk}/', {
+            'subject_id': self.math.pk, 'day': 'Tuesday', 'start_time': '08:00', 'end_time': '10:00', 'room': 'R101'
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        response = self.post_schedule(self.art, '08:00', '10:00', 'R101')
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def test_writes_are_checked_against_the_database(self):
+        self.client.get('/api/programs/schedules/conflicts/')  # builds the index
+        # As if another worker booked the room: this process's index never hears of it.
+        Schedule.objects.bulk_create([
+            Schedule(subject=self.art, day='Tuesday', start_time=time(8), end_time=time(9), room='R303'),
+        ])
+        response = self.client.post('/api/programs/schedules/', {
+            'subject_id': self.math.pk, 'day': 'Tuesday', 'start_time': '08:30', 'end_time': '09:30', 'room': 'R303'
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Room r303 is already booked', str(response.data))
+
+    def test_rolled_back_save_leaves_index_untouched(self):
+        self.client.get('/api/programs/schedules/conflicts/')  # builds the index
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Schedule.objects.create(subject=self.art, day='Monday', start_time=time(9), end_time=time(11), room='R101')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(self.client.get('/api/programs/schedules/conflicts/').data['count'], 0)
+
+
+class TimetableTests(TestCase):
+    def setUp(self):
+        reset_schedule_index()
+        self.teacher = User.objects.create_user(
+            email='teacher@example.com', password='pass12345', username='teacher',
+            first_name='T', last_name='Eacher', role='teacher'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        program = Program.objects.create(code='BSCS', name='Computer Science')
+        self.math = Subject.objects.create(program=program, course_code='MATH1', title='Math', credits=3)
+        self.art = Subject.objects.create(program=program, course_code='ART1', title='Art', credits=2)
+        Schedule.objects.create(subject=self.math, day='Monday', start_time=time(8), end_time=time(10), room='R101')
+        Schedule.objects.create(subject=self.art, day='Monday', start_time=time(13), end_time=time(14), room='R202')
+        self.student_user = User.objects.create_user(
+            email='s1@example.com', password='pass12345', username='s1', role='student', student_id='S1')
+        self.student = self.student_user.student_profile
+        self.student.enrolled_subjects.add(self.math)
+
+    def test_timetable_is_kept_current_without_queries(self):
+        url = f'/api/programs/timetables/student/{self.student.pk}/'
+        self.client.get(url)  # builds the index
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.enrolled_subjects.add(self.art)
+            self.art.title = 'Fine Art'
+            self.art.save()
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get(url).data
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(data['days']['Monday'][1][:2], ['13:00', '14:00'])
+        self.assertEqual(data['subjects'][str(self.art.pk)]['title'], 'Fine Art')
+        room = self.client.get('/api/programs/timetables/room/r101/').data
+        self.assertEqual([row[4] for row in room['days']['Monday']], ['R101'])
+
+    def test_students_only_see_their_own_timetable(self):
+        self.client.force_authenticate(self.student_user)
+        self.assertEqual(self.client.get('/api/programs/timetables/me/').data['key'], self.student.pk)
+        other = User.objects.create_user(email='s2@example.com', password='pass12345', username='s2', role='student', student_id='S2')
+        response = self.client.get(f'/api/programs/timetables/student/{other.student_profile.pk}/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_free_rooms_and_slots(self):
+        rooms = self.client.get('/api/programs/rooms/free/?day=Monday&start=09:00&end=10:00').data['rooms']
+        self.assertEqual(rooms, ['R202'])
+        response = self.client.get(f'/api/programs/timetables/free-slots/?student={self.student.pk}&room=R202&day=Monday&duration=120')
+        self.assertEqual(response.data['slots'], [
+            {'day': 'Monday', 'start': '10:00', 'end': '13:00'}, {'day': 'Monday', 'start': '14:00', 'end': '21:00'},
+        ])
+        self.assertEqual(self.client.get('/api/programs/rooms/free/?day=Monday&start=9&end=10').status_code, 400)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        reset_search_index()
+        self.addCleanup(reset_search_index)
+        self.teacher = User.objects.create_user(
+            email='teacher@example.com', password='pass12345', username='teacher',
+            first_name='Grace', last_name='Navarro', role='teacher'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        self.program = Program.objects.create(code='BSCS', name='Computer Science')
+        self.subject = Subject.objects.create(program=self.program, course_code='CS-101', title='Intro to Computing', credits=3)
+        self.student = User.objects.create_user(
+            email='maria.santos@example.com', password='pass12345', username='msantos', role='student',
+            first_name='María', last_name='Santos', student_id='2024-0001')
+
+    def search(self, query, **params):
+        response = self.client.get('/api/programs/search/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [(row['kind'], row['id']) for row in response.data['results']]
+
+    def test_prefixes_typos_and_identifiers(self):
+        student = ('student', self.student.pk)
+        self.assertEqual(self.search('mar'), [student])
+        self.assertEqual(self.search('maria san'), [student])
+        self.assertEqual(self.search('snatos'), [student])
+        self.assertEqual(self.search('20240001'), [student])
+        self.assertEqual(self.search('maria.santos@'), [student])
+        self.assertEqual(self.search('comp'), [('program', self.program.pk), ('subject', self.subject.pk)])
+        self.assertEqual(self.search('cs101'), [('subject', self.subject.pk)])
+        self.assertEqual(self.search('comp', kind='subject'), [('subject', self.subject.pk)])
+        self.assertEqual(self.search('comp', kind='subject, program'), [('program', self.program.pk), ('subject', self.subject.pk)])
+        self.assertEqual(self.search('m'), [])
+
+    def test_index_follows_writes_without_queries(self):
+        self.search('santos')  # builds the index
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.last_name = 'Reyes'
+            self.student.save()
+            self.subject.delete()
+            Program.objects.create(code='BSIT', name='Information Technology')
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.search('santos'), [])
+            self.assertEqual(self.search('reyes'), [('student', self.student.pk)])
+            self.assertEqual(self.search('intro'), [])
+            self.assertEqual([kind for kind, _ in self.search('information')], ['program'])
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_rolled_back_rename_is_not_indexed(self):
+        self.search('santos')  # builds the index
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.student.last_name = 'Reyes'
+                    self.student.save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(self.search('reyes'), [])
+        self.assertEqual(self.search('santos'), [('student', self.student.pk)])
+
+    def test_students_cannot_search(self):
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.client.get('/api/programs/search/?q=grace').status_code, 403)
+        self.client.force_authenticate(self.teacher)
+        self.assertEqual(self.client.get('/api/programs/search/?q=grace&kind=room').status_code, 400)
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        caches['catalog'].clear()
+        self.teacher = User.objects.create_user(
+            email='teacher@example.com', password='pass12345', username='teacher',
+            first_name='T', last_name='Eacher', role='teacher'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        self.program = Program.objects.create(code='BSCS', name='Computer Science')
+
+    def test_repeat_read_is_served_from_cache(self):
+        url = '/api/programs/programs/'
+        self.client.get(url)
+        self.assertEqual(count_queries(self.client, url), 0)
+
+    def test_if_none_match_returns_304(self):
+        url = f'/api/programs/programs/{self.program.pk}/'
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_write_invalidates(self):
+        url = '/api/programs/programs/'
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Program.objects.create(code='BSIT', name='Information Technology')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 2)
+
+    def test_version_is_bumped_only_once_the_write_commits(self):
+        version = catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Program.objects.create(code='BSIT', name='Information Technology')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            with transaction.atomic():
+                Program.objects.create(code='BSIS', name='Information Systems')
+            self.assertEqual(catalog_version(), version)  # not committed yet
+        self.assertEqual(catalog_version(), version + 1)
+
+    def test_permission_still_checked(self):
+        student = User.objects.create_user(
+            email='s@example.com', password='pass12345', username='stud',
+            first_name='S', last_name='Tudent', role='student'
+        )
+        self.client.get('/api/programs/programs/')
+        self.client.force_authenticate(student)
+        self.assertEqual(self.client.get('/api/programs/programs/').status_code, 403)
+
+
+@override_settings(ROOT_URLCONF='main.asgi_urls')
+class AsyncCatalogTests(TestCase):
+    """The ASGI URLconf serves catalog reads from async views with the DRF views' responses."""
+
+    def setUp(self):
+        caches['catalog'].clear()
+        caches['default'].clear()
+        self.teacher = User.objects.create_user(
+            email='teacher@example.com', password='pass12345', username='teacher',
+            first_name='T', last_name='Eacher', role='teacher'
+        )
+        self.auth = f'Bearer {ClaimsRefreshToken.for_user(self.teacher).access_token}'
+        program = Program.objects.create(code='BSCS', name='Computer Science')
+        Subject.objects.create(program=program, course_code='CS101', title='Intro', credits=3)
+
+    async def test_matches_sync_response(self):
+        async_response = await self.async_client.get('/api/programs/subjects/?fields=id,program', headers={'Authorization': self.auth})
+        caches['catalog'].clear()
+        with self.settings(ROOT_URLCONF='main.urls'):
+            sync_response = await self.async_client.get('/api/programs/subjects/?fields=id,program', headers={'Authorization': self.auth})
+        self.assertEqual(async_response.status_code, 200)
+        self.assertEqual(async_response.content, sync_response.content)
+        self.assertEqual(async_response['ETag'], sync_response['ETag'])
+
+    async def test_etag_and_missing_rows(self):
+        etag = (await self.async_client.get('/api/programs/programs/', headers={'Authorization': self.auth}))['ETag']
+        response = await self.async_client.get('/api/programs/programs/', headers={'Authorization': self.auth, 'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        response = await self.async_client.get('/api/programs/programs/999/', headers={'Authorization': self.auth})
+        self.assertEqual(response.status_code, 404)
+
+    async def test_authentication_and_permission(self):
+        self.assertEqual((await self.async_client.get('/api/programs/programs/')).status_code, 401)
+        student = await User.objects.acreate(email='s@example.com', username='stud', role='student', student_id='S1')
+        token = ClaimsRefreshToken.for_user(student).access_token
+        response = await self.async_client.get('/api/programs/programs/', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_writes_and_pages_fall_back_to_drf_views(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=self.auth)
+        response = client.post('/api/programs/programs/', {'code': 'BSIT', 'name': 'IT'}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        response = client.get('/api/programs/programs/?page_size=1')
+        self.assertEqual(len(response.json()['results']), 1)
@@ -0,0 +1,69 @@
+# programs/timetables.py
+"""
+Weekly timetables and free-time queries, read from the schedule index.
+
+The index (programs.conflicts) already keeps every booking filed per student,
+teacher and room, per day, sorted by start time, and signals keep it current
+as schedules, subjects, enrollments and assignments change. A timetable is
+therefore a read of five buckets, not a query. It is rendered as a compact grid
+document: each day is a list of rows in the order given by `columns`, and
+subject names are listed once under `subjects`.
+"""
+from django.conf import settings
+
+from .conflicts import DAYS, ROOM, STUDENT, TEACHER, schedule_index
+
+KINDS = (STUDENT, TEACHER, ROOM)
+COLUMNS = ['start', 'end', 'schedule_id', 'subject_id', 'room']
+
+
+def hhmm(value):
+    return f'{value // 60:02d}:{value % 60:02d}'
+
+
+def parse_hhmm(value):
+    """'07:30' -> 450; raises ValueError for anything else."""
+    hours, sep, mins = value.partition(':')
+    total = int(hours) * 60 + int(mins)
+    if not sep or not 0 <= int(mins) < 60 or not 0 <= total <= 24 * 60:
+        raise ValueError(value)
+    return total
+
+
+def day_window():
+    return (parse_hhmm(getattr(settings, 'TIMETABLE_DAY_START', '07:00')),
+            parse_hhmm(getattr(settings, 'TIMETABLE_DAY_END', '21:00')))
+
+
+def timetable_document(kind, key):
+    index = schedule_index()
+    week = index.timetable(kind, key)
+    names = index.subject_names({row[3] for rows in week.values() for row in rows})
+    return {
+        'resource': kind,
+        'key': key,
+        'columns': COLUMNS,
+        'days': {
+            day: [[hhmm(start), hhmm(end), schedule_id, subject_id, room] for start, end, schedule_id, subject_id, room in rows]
+            for day, rows in week.items()
+        },
+        'subjects': {
+            str(subject_id): {'course_code': course_code, 'title': title}
+            for subject_id, (course_code, title) in sorted(names.items())
+        },
+    }
+
+
+def free_slots(resources, days=DAYS, min_length=1):
+    """[{'day', 'start', 'end'}] for every gap inside the teaching day when all `resources` are free."""
+    index = schedule_index()
+    window_start, window_end = day_window()
+    return [
+        {'day': day, 'start': hhmm(start), 'end': hhmm(end)}
+        for day in days
+        for start, end in index.free_slots(resources, day, window_start, window_end, min_length)
+    ]
+
+
+def free_rooms(day, start, end):
+    return schedule_index().free_rooms(day, start, end)
@@ -1,6 +1,10 @@
 # programs/urls.py
 from django.urls import path
-from .views import ProgramListView, ProgramDetailView, SubjectListView, SubjectDetailView, ScheduleListView, ScheduleDetailView
+from .views import (
+    ProgramListView, ProgramDetailView, SubjectListView, SubjectDetailView, ScheduleListView, ScheduleDetailView,
+    ScheduleConflictListView, ScheduleExportView,
+    TimetableView, MyTimetableView, FreeRoomListView, FreeSlotListView, SearchView,
+)
 
 urlpatterns = [
     path('programs/', ProgramListView.as_view(), name='program-list'),
@@ -9,4 +13,11 @@ urlpatterns = [
     path('subjects/<int:pk>/', SubjectDetailView.as_view(), name='subject-detail'),
     path('schedules/', ScheduleListView.as_view(), name='schedule-list'),
     path('schedules/<int:pk>/', ScheduleDetailView.as_view(), name='schedule-detail'),
+    path('schedules/conflicts/', ScheduleConflictListView.as_view(), name='schedule-conflicts'),
+    path('schedules/export/', ScheduleExportView.as_view(), name='schedule-export'),
+    path('timetables/me/', MyTimetableView.as_view(), name='my-timetable'),
+    path('timetables/free-slots/', FreeSlotListView.as_view(), name='free-slots'),
+    path('timetables/<str:kind>/<str:key>/', TimetableView.as_view(), name='timetable'),
+    path('rooms/free/', FreeRoomListView.as_view(), name='free-rooms'),
+    path('search/', SearchView.as_view(), name='search'),
 ]
\ No newline at end of file
@@ -1,9 +1,22 @@
 # programs/views.py
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.exceptions import APIException
 from .models import Program, Subject, Schedule
 from .serializers import ProgramSerializer, SubjectSerializer, ScheduleSerializer
+from .pagination import KeysetPagination
+from .conflicts import DAYS, ROOM, TEACHER, STUDENT, schedule_index
+from .exports import keyset_rows, requested_format, streaming_export
+from .cache import CachedCatalogMixin
+from .timetables import KINDS, free_rooms, free_slots, parse_hhmm, timetable_document
+from . import search
+from jobs.registry import enqueue
+from jobs.views import wants_background, job_accepted
 from django.core.exceptions import ValidationError
+from django.http import Http404
+from students.models import Student
+from teachers.models import Teacher
 
 class IsTeacherOrAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
@@ -11,20 +24,40 @@ class IsTeacherOrAdmin(permissions.BasePermission):
             return False
         return request.user.role in ['teacher', 'admin'] or request.user.is_superuser
 
-class ProgramListView(generics.ListCreateAPIView):
+class RelatedLoadingMixin:
+    """
+    Joins the foreign keys the serializer is going to render, so a list of N rows
+    costs one query instead of N+1. `related_fields` maps a serializer field name
+    to the `select_related` path that backs it; fields dropped via `?fields=` are
+    not joined.
+    """
+    related_fields = {}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        rendered = self.get_serializer().fields
+        paths = [path for field, path in self.related_fields.items() if field in rendered]
+        if paths:
+            queryset = queryset.select_related(*paths)
+        return queryset
+
+class ProgramListView(CachedCatalogMixin, generics.ListCreateAPIView):
     queryset = Program.objects.all()
     serializer_class = ProgramSerializer
     permission_classes = [IsTeacherOrAdmin]
+    pagination_class = KeysetPagination
 
     def create(self, request, *args, **kwargs):
         try:
             return super().create(request, *args, **kwargs)
         except ValidationError as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except (APIException, Http404):
+            raise
         except Exception as e:
             return Response({"detail": f"Server error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class ProgramDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProgramDetailView(CachedCatalogMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Program.objects.all()
     serializer_class = ProgramSerializer
     permission_classes = [IsTeacherOrAdmin]
@@ -34,25 +67,32 @@ class ProgramDetailView(generics.RetrieveUpdateDestroyAPIView):
             return super().update(request, *args, **kwargs)
         except ValidationError as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except (APIException, Http404):
+            raise
         except Exception as e:
             return Response({"detail": f"Server error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class SubjectListView(generics.ListCreateAPIView):
+class SubjectListView(CachedCatalogMixin, RelatedLoadingMixin, generics.ListCreateAPIView):
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
+    related_fields = {'program': 'program'}
     permission_classes = [IsTeacherOrAdmin]
+    pagination_class = KeysetPagination
 
     def create(self, request, *args, **kwargs):
         try:
             return super().create(request, *args, **kwargs)
         except ValidationError as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except (APIException, Http404):
+            raise
         except Exception as e:
             return Response({"detail": f"Server error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class SubjectDetailView(generics.RetrieveUpdateDestroyAPIView):
+class SubjectDetailView(CachedCatalogMixin, RelatedLoadingMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
+    related_fields = {'program': 'program'}
     permission_classes = [IsTeacherOrAdmin]
 
     def update(self, request, *args, **kwargs):
@@ -60,29 +100,35 @@ class SubjectDetailView(generics.RetrieveUpdateDestroyAPIView):
             return super().update(request, *args, **kwargs)
         except ValidationError as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except (APIException, Http404):
+            raise
         except Exception as e:
             return Response({"detail": f"Server error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class ScheduleListView(generics.ListCreateAPIView):
+class ScheduleListView(CachedCatalogMixin, generics.ListCreateAPIView):
     queryset = Schedule.objects.all()
     serializer_class = ScheduleSerializer
     permission_classes = [IsTeacherOrAdmin]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
+        queryset = super().get_queryset()
         subject_id = self.request.query_params.get('subject_id')
         if subject_id:
-            return Schedule.objects.filter(subject_id=subject_id)
-        return Schedule.objects.all()
+            return queryset.filter(subject_id=subject_id)
+        return queryset
 
     def create(self, request, *args, **kwargs):
         try:
             return super().create(request, *args, **kwargs)
         except ValidationError as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except (APIException, Http404):
+            raise
         except Exception as e:
             return Response({"detail": f"Server error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class ScheduleDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ScheduleDetailView(CachedCatalogMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Schedule.objects.all()
     serializer_class = ScheduleSerializer
     permission_classes = [IsTeacherOrAdmin]
@@ -92,5 +138,148 @@ class ScheduleDetailView(generics.RetrieveUpdateDestroyAPIView):
             return super().update(request, *args, **kwargs)
         except ValidationError as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except (APIException, Http404):
+            raise
         except Exception as e:
-            return Response({"detail": f"Server error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response({"detail": f"Server error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class ScheduleConflictListView(APIView):
+    """
+    Reports every overlapping pair of schedules that share a room, teacher or student.
+    `?kind=room,teacher` limits the resources checked and `?program_id=` limits the
+    report to schedules of that program's subjects.
+    """
+    permission_classes = [IsTeacherOrAdmin]
+
+    def get(self, request):
+        kinds = tuple(k for k in request.query_params.get('kind', '').split(',') if k) or (ROOM, TEACHER, STUDENT)
+        schedule_ids = None
+        program_id = request.query_params.get('program_id')
+        if program_id:
+            schedule_ids = set(Schedule.objects.filter(subject__program_id=program_id).values_list('id', flat=True))
+
+        conflicts = [
+            {"resource": kind, "key": key, "day": day, "schedules": [first, second]}
+            for kind, key, day, first, second in schedule_index().all_conflicts(kinds, schedule_ids)
+        ]
+        return Response({"count": len(conflicts), "conflicts": conflicts})
+
+class ScheduleExportView(APIView):
+    """Streams all schedules (or `?subject_id=` ones) as CSV or JSON (`?output=`), or queues it with `?background=1`."""
+    permission_classes = [IsTeacherOrAdmin]
+    columns = [
+        ('id', 'id'), ('subject__course_code', 'course_code'), ('subject__title', 'subject'),
+        ('day', 'day'), ('start_time', 'start_time'), ('end_time', 'end_time'), ('room', 'room'),
+    ]
+
+    def get(self, request):
+        output = requested_format(request)
+        if output is None:
+            return Response({"detail": "Unsupported output format."}, status=status.HTTP_400_BAD_REQUEST)
+        subject_id = request.query_params.get('subject_id')
+        if wants_background(request):
+            job = enqueue('programs.export_schedules', {'subject_id': subject_id, 'output': output}, user=request.user)
+            return job_accepted(request, job)
+        return streaming_export(schedule_rows(subject_id), self.columns, output, 'schedules')
+
+
+def schedule_rows(subject_id=None):
+    queryset = Schedule.objects.values(*[key for key, _ in ScheduleExportView.columns])
+    if subject_id:
+        queryset = queryset.filter(subject_id=subject_id)
+    return keyset_rows(queryset)
+
+class TimetableView(APIView):
+    """
+    `timetables/<student|teacher|room>/<key>/`: the weekly grid of a student or
+    teacher (by profile id) or a room (by name). Students may only read their own
+    timetable and room timetables.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, kind, key):
+        if kind not in KINDS:
+            raise Http404("Unknown timetable kind")
+        if kind != ROOM:
+            try:
+                key = int(key)
+            except ValueError:
+                raise Http404("Timetable not found")
+        if not IsTeacherOrAdmin().has_permission(request, self):
+            own = Student.objects.filter(user_id=request.user.pk).values_list('pk', flat=True).first()
+            if kind == TEACHER or (kind == STUDENT and key != own):
+                return Response({"detail": "You can only view your own timetable."}, status=status.HTTP_403_FORBIDDEN)
+        return Response(timetable_document(kind, key))
+
+class MyTimetableView(APIView):
+    """The caller's own weekly grid, as a student or as a teacher."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        profiles = {STUDENT: Student, TEACHER: Teacher}
+        model = profiles.get(request.user.role)
+        key = model.objects.filter(user_id=request.user.pk).values_list('pk', flat=True).first() if model else None
+        if key is None:
+            return Response({"detail": "Only students and teachers have a timetable."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(timetable_document(request.user.role, key))
+
+class FreeRoomListView(APIView):
+    """`?day=Monday&start=08:00&end=09:30`: rooms with no booking in that window."""
+    permission_classes = [IsTeacherOrAdmin]
+
+    def get(self, request):
+        day = request.query_params.get('day')
+        try:
+            start = parse_hhmm(request.query_params.get('start', ''))
+            end = parse_hhmm(request.query_params.get('end', ''))
+        except ValueError:
+            return Response({"detail": "start and end must be given as HH:MM."}, status=status.HTTP_400_BAD_REQUEST)
+        if day not in DAYS or start >= end:
+            return Response({"detail": "A weekday and a start before the end are required."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"day": day, "start": request.query_params['start'], "end": request.query_params['end'],
+                         "rooms": free_rooms(day, start, end)})
+
+class FreeSlotListView(APIView):
+    """
+    Times when every listed resource is free, e.g.
+    `?student=4,9&teacher=2&room=R101&duration=90&day=Monday` (`day` optional).
+    """
+    permission_classes = [IsTeacherOrAdmin]
+
+    def get(self, request):
+        try:
+            resources = [
+                (kind, key if kind == ROOM else int(key))
+                for kind in KINDS
+                for key in request.query_params.get(kind, '').split(',') if key.strip()
+            ]
+            duration = int(request.query_params.get('duration', 1))
+        except ValueError:
+            return Response({"detail": "student, teacher and duration must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+        if not resources:
+            return Response({"detail": "Give at least one student, teacher or room."}, status=status.HTTP_400_BAD_REQUEST)
+        day = request.query_params.get('day')
+        if day is not None and day not in DAYS:
+            return Response({"detail": "Unknown day."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"slots": free_slots(resources, (day,) if day else DAYS, max(duration, 1))})
+
+class SearchView(APIView):
+    """
+    Autocomplete over students, teachers, subjects and programs, e.g.
+    `?q=dela cruz&kind=student,teacher&limit=10`. Matches names, titles, emails,
+    student IDs and codes by prefix, with one typo tolerated (see programs.search).
+    """
+    permission_classes = [IsTeacherOrAdmin]
+    max_limit = 50
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        kinds = [kind.strip() for kind in request.query_params.get('kind', '').split(',') if kind.strip()] or list(search.KINDS)
+        if set(kinds) - set(search.KINDS):
+            return Response({"detail": f"kind must be among: {', '.join(search.KINDS)}."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            return Response({"detail": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(max(limit, 1), self.max_limit)
+        return Response({"query": query, "results": search.search_index().search(query, kinds, limit)})
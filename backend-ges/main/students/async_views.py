@@ -0,0 +1,15 @@
+# students/async_views.py
+from django.http import Http404
+from programs.async_views import async_read_view, json_response, serialize_list
+from programs.models import Program
+from .models import Student
+from .serializers import ProgramStudentSerializer
+from .views import IsTeacherOrAdmin, StudentsByProgramListView
+
+
+@async_read_view(IsTeacherOrAdmin, StudentsByProgramListView.as_view())
+async def students_by_program(request, program_id):
+    if not await Program.objects.filter(id=program_id).aexists():
+        raise Http404("Program does not exist")
+    queryset = Student.objects.filter(user__program_id=program_id).select_related('user')
+    return json_response(await serialize_list(request, queryset, ProgramStudentSerializer))
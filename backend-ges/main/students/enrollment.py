@@ -0,0 +1,125 @@
+# students/enrollment.py
+from collections import defaultdict
+
+from django.db import transaction
+
+from main.db.replicas import primary
+from programs.conflicts import STUDENT, loaded_index, schedule_writes
+from programs.models import Schedule, Subject
+from .models import Student
+from .term import invalidate_terms
+
+# Keeps each IN (...) list well below the bind-parameter limits of MySQL and SQLite.
+LOOKUP_CHUNK_SIZE = 1000
+INSERT_BATCH_SIZE = 1000
+
+Enrollment = Student.enrolled_subjects.through
+
+
+def _chunks(values, size=LOOKUP_CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _overlapping_subject(slots, taken):
+    """Returns the subject in `taken` (day -> [(start, end, subject_id)]) that clashes with `slots`, if any."""
+    for day, start, end in slots:
+        for other_start, other_end, other_subject in taken.get(day, ()):
+            if start < other_end and other_start < end:
+                return other_subject
+    return None
+
+
+def _slots_by_subject(subject_ids):
+    """subject_id -> [(day, start, end)], read from the database."""
+    slots = defaultdict(list)
+    for chunk in _chunks(subject_ids):
+        for subject_id, day, start, end in Schedule.objects.filter(subject_id__in=chunk).values_list(
+                'subject_id', 'day', 'start_time', 'end_time'):
+            slots[subject_id].append((day, start, end))
+    return slots
+
+
+def bulk_enroll(pairs):
+    """
+    Enrolls (student_id, subject_id) pairs, where student_id is the student's `User.student_id`
+    and subject_id is the `Subject` primary key.
+
+    Every check runs as a fixed number of set-based queries regardless of how many
+    pairs are submitted: students, subjects, current enrollments and the schedules
+    of both the requested and the already enrolled subjects are each loaded in
+    chunks. The checks read the database rather than the schedule index, which can
+    lag other workers' writes, and run under `schedule_writes()` with the inserts,
+    so a concurrent enrollment or schedule change cannot slip in between. Returns `(created, errors)`; when `errors` is non-empty nothing is written.
+    """
+    errors = []
+    student_codes = {student_id for student_id, _ in pairs}
+    subject_ids = {subject_id for _, subject_id in pairs}
+
+    with schedule_writes(), primary():
+        student_pks = {}
+        for chunk in _chunks(student_codes):
+            student_pks.update(Student.objects.filter(user__student_id__in=chunk).values_list('user__student_id', 'id'))
+        known_subjects = set()
+        for chunk in _chunks(subject_ids):
+            known_subjects.update(Subject.objects.filter(id__in=chunk).values_list('id', flat=True))
+
+        current = defaultdict(set)
+        for chunk in _chunks(student_pks.values()):
+            rows = Enrollment.objects.filter(student_id__in=chunk).values_list('student_id', 'subject_id')
+            for student_pk, subject_id in rows:
+                current[student_pk].add(subject_id)
+
+        slots = _slots_by_subject(known_subjects | {pk for enrolled in current.values() for pk in enrolled})
+        taken = defaultdict(lambda: defaultdict(list))  # student pk -> day -> slots already enrolled
+        for student_pk, enrolled in current.items():
+            for subject_id in enrolled:
+                for day, start, end in slots[subject_id]:
+                    taken[student_pk][day].append((start, end, subject_id))
+        added = defaultdict(lambda: defaultdict(list))  # student pk -> day -> slots enrolled by this request
+
+        rows = []
+        seen = set()
+        for position, (student_id, subject_id) in enumerate(pairs):
+            student_pk = student_pks.get(student_id)
+            error = None
+            if student_pk is None:
+                error = "Student does not exist."
+            elif subject_id not in known_subjects:
+                error = "Subject does not exist."
+            elif (student_pk, subject_id) in seen:
+                error = "Duplicate pair in request."
+            elif subject_id in current[student_pk]:
+                error = "Student is already enrolled in this subject."
+            elif _overlapping_subject(slots[subject_id], taken[student_pk]) is not None:
+                error = "Schedule overlaps with a subject the student is already enrolled in."
+            else:
+                clash = _overlapping_subject(slots[subject_id], added[student_pk])
+                if clash is not None:
+                    error = f"Schedule overlaps with subject {clash} in this request."
+
+            if error:
+                errors.append({'index': position, 'student_id': student_id, 'subject_id': subject_id, 'error': error})
+                continue
+            seen.add((student_pk, subject_id))
+            for day, start, end in slots[subject_id]:
+                added[student_pk][day].append((start, end, subject_id))
+            rows.append(Enrollment(student_id=student_pk, subject_id=subject_id))
+
+        if errors:
+            return 0, errors
+
+        # ignore_conflicts covers a pair enrolled through the single-student endpoints after our read.
+        Enrollment.objects.bulk_create(rows, batch_size=INSERT_BATCH_SIZE, ignore_conflicts=True)
+        # bulk_create does not send m2m_changed, so the index and term cache are told directly, once committed.
+        transaction.on_commit(lambda: _link_enrollments(rows))
+    return len(rows), errors
+
+
+def _link_enrollments(rows):
+    index = loaded_index()
+    if index is not None:
+        for row in rows:
+            index.link(STUDENT, row.student_id, row.subject_id)
+    invalidate_terms(row.student_id for row in rows)
@@ -0,0 +1,148 @@
+"""
+Links every Student row to its users.User identity, matching on email
+regardless of case.
+
+Runs in keyset batches of BATCH_SIZE rows, each in its own short transaction, so
+it can run against a live table: every batch costs a handful of IN (...) queries
+and bulk writes, never one query per row. Students with no matching user get a
+User row (unusable password) created from their profile columns, and users gain
+the student_id/program they were missing.
+
+A legacy student ID that already belongs to another user cannot be copied, as
+student IDs are unique per user. Those students are still linked, and every
+such collision is printed at the end so the IDs can be reassigned by hand.
+"""
+from django.contrib.auth.hashers import make_password
+from django.db import migrations, transaction
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+BATCH_SIZE = 1000
+COPIED_FIELDS = ('first_name', 'middle_name', 'last_name', 'contact_number', 'gender', 'address')
+
+
+def owners(User, student_ids):
+    """student_id -> email of the user holding it."""
+    return dict(User.objects.filter(student_id__in=student_ids).values_list('student_id', 'email'))
+
+
+def users_by_email(User, emails):
+    """Lowercased email -> user. Matched case-insensitively whatever the column's collation."""
+    keys = {email.lower() for email in emails}
+    rows = User.objects.annotate(email_key=Lower('email')).filter(email_key__in=keys).order_by('-id')
+    return {user.email.lower(): user for user in rows}  # the oldest account wins a case-only tie
+
+
+def free_usernames(User, people, fallback):
+    """
+    person pk -> username: their own if free, else `fallback(person)`, else that
+    with the first free numeric suffix. Compared case-insensitively, against
+    existing users and the rest of the batch.
+    """
+    candidates = {name.lower() for person in people for name in (person.username, fallback(person)) if name}
+    taken = set(User.objects.annotate(username_key=Lower('username')).filter(username_key__in=candidates)
+                .values_list('username_key', flat=True))
+    names = {}
+    for person in people:
+        name = next((name for name in (person.username, fallback(person)) if name and name.lower() not in taken), None)
+        suffix = 2
+        while name is None:
+            # Rare enough for a query per attempt.
+            name = f'{fallback(person)}-{suffix}'
+            if name.lower() in taken or User.objects.filter(username__iexact=name).exists():
+                name, suffix = None, suffix + 1
+        taken.add(name.lower())
+        names[person.pk] = name
+    return names
+
+
+def link_batch(User, Student, students):
+    """Links `students` and returns the (student email, student ID, owner email) collisions."""
+    collisions = []
+    users = users_by_email(User, [s.email for s in students])
+
+    missing = [s for s in students if s.email.lower() not in users]
+    if missing:
+        usernames = free_usernames(User, missing, lambda s: f'student-{s.student_id}')
+        # Colliding IDs are left off here and reported by the loop below.
+        taken_ids = set(owners(User, [s.student_id for s in missing]))
+        User.objects.bulk_create([
+            User(
+                email=s.email,
+                username=usernames[s.pk],
+                student_id=None if s.student_id in taken_ids else s.student_id,
+                role='student',
+                program_id=s.program_id,
+                password=make_password(None),
+                **{field: getattr(s, field) for field in COPIED_FIELDS},
+            )
+            for s in missing
+        ])
+        users.update(users_by_email(User, [s.email for s in missing]))
+
+    taken_ids = owners(User, [s.student_id for s in students])
+    changed = []
+    for student in students:
+        user = users[student.email.lower()]
+        dirty = False
+        if not user.student_id and student.student_id:
+            if student.student_id not in taken_ids:
+                user.student_id = student.student_id
+                taken_ids[student.student_id] = user.email
+                dirty = True
+            elif taken_ids[student.student_id] != user.email:
+                collisions.append((student.email, student.student_id, taken_ids[student.student_id]))
+        if user.program_id is None and student.program_id is not None:
+            user.program_id = student.program_id
+            dirty = True
+        if dirty:
+            changed.append(user)
+        student.user_id = user.id
+    User.objects.bulk_update(changed, ['student_id', 'program'])
+    Student.objects.bulk_update(students, ['user'])
+    return collisions
+
+
+def check_case_duplicates(Student):
+    """Two legacy rows whose emails differ only in case would both match one user."""
+    duplicates = list(
+        Student.objects.annotate(email_key=Lower('email')).values('email_key').annotate(rows=Count('id'))
+        .filter(rows__gt=1).order_by('email_key').values_list('email_key', flat=True)
+    )
+    if duplicates:
+        raise RuntimeError(
+            f"{len(duplicates)} email(s) are used by more than one student row, differing only in case; "
+            "merge or fix them, then migrate again:\n" + '\n'.join(f"  {email}" for email in duplicates[:50])
+        )
+
+
+def link_students(apps, schema_editor):
+    Student = apps.get_model('students', 'Student')
+    User = apps.get_model('users', 'User')
+    check_case_duplicates(Student)
+    collisions = []
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            batch = list(Student.objects.filter(id__gt=last_id, user__isnull=True).order_by('id')[:BATCH_SIZE])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            collisions.extend(link_batch(User, Student, batch))
+    if collisions:
+        print(f"\n  {len(collisions)} legacy student ID(s) already belonged to another user and were not copied:")
+        for email, student_id, owner in collisions:
+            print(f"    {email}: {student_id} (held by {owner})")
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('students', '0002_student_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_students, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+"""
+Drops the identity columns duplicated from users.User and gives every student
+user a profile row, in keyset batches.
+"""
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models, transaction
+
+BATCH_SIZE = 1000
+
+
+def create_missing_profiles(apps, schema_editor):
+    Student = apps.get_model('students', 'Student')
+    User = apps.get_model('users', 'User')
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                User.objects.filter(role='student', id__gt=last_id, student_profile__isnull=True)
+                .order_by('id').values_list('id', flat=True)[:BATCH_SIZE]
+            )
+            if not ids:
+                return
+            last_id = ids[-1]
+            Student.objects.bulk_create([Student(user_id=user_id) for user_id in ids])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0003_link_students_to_users'),
+    ]
+
+    operations = [
+        migrations.RemoveField(model_name='student', name='student_id'),
+        migrations.RemoveField(model_name='student', name='first_name'),
+        migrations.RemoveField(model_name='student', name='middle_name'),
+        migrations.RemoveField(model_name='student', name='last_name'),
+        migrations.RemoveField(model_name='student', name='email'),
+        migrations.RemoveField(model_name='student', name='contact_number'),
+        migrations.RemoveField(model_name='student', name='username'),
+        migrations.RemoveField(model_name='student', name='gender'),
+        migrations.RemoveField(model_name='student', name='address'),
+        migrations.RemoveField(model_name='student', name='program'),
+        migrations.RunPython(create_missing_profiles, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='student',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='student_profile', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
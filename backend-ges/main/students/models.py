@@ -1,19 +1,15 @@
 # students/models.py
+from django.conf import settings
 from django.db import models
 
 class Student(models.Model):
-    student_id = models.CharField(max_length=15, unique=True)
-    first_name = models.CharField(max_length=30)
-    middle_name = models.CharField(max_length=30, blank=True, null=True)
-    last_name = models.CharField(max_length=30)
-    email = models.EmailField(unique=True)
-    contact_number = models.CharField(max_length=20, blank=True, null=True)
-    username = models.CharField(max_length=150, unique=True)
-    gender = models.CharField(max_length=10, choices=[('Male', 'Male'), ('Female', 'Female')])
-    address = models.TextField(blank=True)
-    program = models.ForeignKey('programs.Program', on_delete=models.SET_NULL, null=True, related_name='students')
+    """
+    Student profile. Identity (names, email, student_id, program) lives on the
+    linked users.User row; this model only holds what is specific to students.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='student_profile')
     enrolled_subjects = models.ManyToManyField('programs.Subject', related_name='enrolled_students')
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.student_id} - {self.first_name} {self.middle_name or ''} {self.last_name}"
\ No newline at end of file
+        return f"{self.user.student_id} - {self.user.first_name} {self.user.middle_name or ''} {self.user.last_name}"
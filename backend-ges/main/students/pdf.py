@@ -0,0 +1,59 @@
+# students/pdf.py
+"""
+A minimal PDF writer for documents made of text lines and rules, such as
+transcripts. Records need nothing more than the standard Helvetica faces, which
+every PDF viewer has built in, so no font is embedded and no PDF library is
+required. Text is encoded as WinAnsi (cp1252); other characters print as '?'.
+The output carries no timestamps: the same calls always produce the same bytes.
+"""
+import zlib
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4, in points
+FONTS = (b'Helvetica', b'Helvetica-Bold')
+
+
+def _string(text):
+    data = str(text).encode('cp1252', errors='replace')
+    return b'(' + data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+class PDFDocument:
+    def __init__(self):
+        self.pages = []
+        self.new_page()
+
+    def new_page(self):
+        self.pages.append([])
+
+    def text(self, x, y, text, size=10, bold=False):
+        """Draws `text` with its baseline starting at (x, y), measured from the bottom left."""
+        self.pages[-1].append(b'BT /F%d %d Tf %.2f %.2f Td %s Tj ET' % (2 if bold else 1, size, x, y, _string(text)))
+
+    def rule(self, x1, x2, y, width=0.5):
+        self.pages[-1].append(b'%.2f w %.2f %.2f m %.2f %.2f l S' % (width, x1, y, x2, y))
+
+    def render(self):
+        objects = [b'', b'']  # the catalog and page tree, filled in once the pages are numbered
+        for font in FONTS:
+            objects.append(b'<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>' % font)
+        resources = b'<< /Font << /F1 3 0 R /F2 4 0 R >> >>'
+        kids = []
+        for operations in self.pages:
+            stream = zlib.compress(b'\n'.join(operations))
+            objects.append(b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(stream), stream))
+            objects.append(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources %s /Contents %d 0 R >>'
+                           % (PAGE_WIDTH, PAGE_HEIGHT, resources, len(objects)))
+            kids.append(b'%d 0 R' % len(objects))
+        objects[0] = b'<< /Type /Catalog /Pages 2 0 R >>'
+        objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (b' '.join(kids), len(kids))
+
+        out = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(out))
+            out += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+        xref = len(out)
+        out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+        out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+        out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+        return bytes(out)
@@ -0,0 +1,284 @@
+# students/records.py
+"""
+Transcripts and report cards, as HTML or PDF.
+
+`record_data` gathers what a record shows (the student, their program, their
+enrolled subjects with credits, per-period grades and final grades) in the same
+five queries for one student or a whole program, 500 students at a time.
+Rendering is a pure function of that data and needs no database, so batch mode
+renders in worker processes.
+
+Rendered files are content-addressed. A record is stored under the SHA-256 of
+its data, kind and format plus RECORD_LAYOUT_VERSION, at
+RECORDS_ROOT/<kind>/<2 hex>/<sha256>.<format>. RECORDS_ROOT is outside
+MEDIA_ROOT because records are private. An unchanged record costs the queries
+and a hash, then is served from storage. A change to grades, credits,
+enrollment or the student's details gives a new hash, and so a new file.
+Bump RECORD_LAYOUT_VERSION when the layout changes.
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Sum
+from django.template.loader import render_to_string
+
+from grades.models import FinalGrade, GradeEntry, PERIOD_CHOICES
+from main.db.replicas import primary
+from programs.models import Subject
+from .models import Student
+from .pdf import PAGE_HEIGHT, PAGE_WIDTH, PDFDocument
+
+TRANSCRIPT, REPORT_CARD = 'transcript', 'report_card'
+KINDS = {TRANSCRIPT: 'Transcript of Records', REPORT_CARD: 'Report Card'}
+FORMATS = {'pdf': 'application/pdf', 'html': 'text/html; charset=utf-8'}
+RECORD_LAYOUT_VERSION = 1
+CHUNK_SIZE = 500
+TWO_PLACES = Decimal('0.01')
+
+
+class RecordStorage(FileSystemStorage):
+    """Rendered records live under RECORDS_ROOT, outside MEDIA_ROOT, so they are only reachable through the API."""
+
+    @property
+    def base_location(self):
+        return str(settings.RECORDS_ROOT)
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+
+def record_data(students):
+    """Yields (student pk, data) for a Student queryset, in student ID order."""
+    pks = list(students.order_by('user__student_id', 'pk').values_list('pk', flat=True))
+    with primary():  # stored under a hash of this data, so never read from a lagging replica
+        for start in range(0, len(pks), CHUNK_SIZE):
+            yield from _chunk_data(pks[start:start + CHUNK_SIZE])
+
+
+def _chunk_data(pks):
+    students = Student.objects.select_related('user__program').in_bulk(pks)
+    enrollments = Student.enrolled_subjects.through.objects.filter(student_id__in=pks).values_list('student_id', 'subject_id')
+    subject_ids = {}
+    for student_id, subject_id in enrollments:
+        subject_ids.setdefault(student_id, []).append(subject_id)
+    subjects = Subject.objects.in_bulk({pk for ids in subject_ids.values() for pk in ids})
+    # Each period's grade is the component-weighted mean of its entries.
+    periods = (
+        GradeEntry.objects.filter(student_id__in=pks)
+        .values('student_id', 'component__subject_id', 'period')
+        .annotate(weighted=Sum(F('component__weight') * F('score')), total=Sum('component__weight'))
+        .order_by()
+        .values_list('student_id', 'component__subject_id', 'period', 'weighted', 'total')
+    )
+    period_grades = {}
+    for student_id, subject_id, period, weighted, total in periods:
+        if total:
+            score = (Decimal(weighted) / Decimal(total)).quantize(TWO_PLACES)
+            period_grades.setdefault((student_id, subject_id), {})[period] = score
+    finals = {
+        (student_id, subject_id): score
+        for student_id, subject_id, score in FinalGrade.objects.filter(student_id__in=pks).values_list('student_id', 'subject_id', 'score')
+    }
+
+    for pk in pks:
+        student = students[pk]
+        user = student.user
+        rows = []
+        graded_credits, weighted = 0, Decimal(0)
+        for subject in sorted((subjects[subject_id] for subject_id in subject_ids.get(pk, [])), key=lambda s: s.course_code):
+            final = finals.get((pk, subject.pk))
+            if final is not None:
+                graded_credits += subject.credits
+                weighted += final * subject.credits
+            rows.append({
+                'course_code': subject.course_code,
+                'title': subject.title,
+                'credits': subject.credits,
+                'periods': period_grades.get((pk, subject.pk), {}),
+                'final_grade': final,
+            })
+        yield pk, {
+            'student': {
+                'student_id': user.student_id,
+                'name': _full_name(user),
+                'email': user.email,
+            },
+            'program': {'code': user.program.code, 'name': user.program.name} if user.program else None,
+            'subjects': rows,
+            'total_credits': sum(row['credits'] for row in rows),
+            'graded_credits': graded_credits,
+            'gpa': (weighted / graded_credits).quantize(TWO_PLACES) if graded_credits else None,
+        }
+
+
+def _full_name(user):
+    given = ' '.join(part for part in (user.first_name, user.middle_name) if part)
+    return ', '.join(part for part in (user.last_name, given) if part)
+
+
+def record_digest(data, kind, output):
+    payload = json.dumps([RECORD_LAYOUT_VERSION, kind, output, data], cls=DjangoJSONEncoder, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def record_path(kind, digest, output):
+    return f'{kind}/{digest[:2]}/{digest}.{output}'
+
+
+def _grade(value):
+    return '' if value is None else str(value)
+
+
+def record_table(data, kind):
+    """(headings, rows of strings) shared by the HTML and PDF layouts."""
+    headings = ['Code', 'Title', 'Credits']
+    if kind == REPORT_CARD:
+        headings += [label for _, label in PERIOD_CHOICES]
+    headings.append('Final')
+    rows = []
+    for subject in data['subjects']:
+        row = [subject['course_code'], subject['title'], str(subject['credits'])]
+        if kind == REPORT_CARD:
+            row += [_grade(subject['periods'].get(period)) for period, _ in PERIOD_CHOICES]
+        row.append(_grade(subject['final_grade']))
+        rows.append(row)
+    return headings, rows
+
+
+def _summary(data):
+    return [
+        ('Total credits', str(data['total_credits'])),
+        ('Graded credits', str(data['graded_credits'])),
+        ('GPA', _grade(data['gpa'])),
+    ]
+
+
+def render_html(data, kind):
+    headings, rows = record_table(data, kind)
+    return render_to_string('students/record.html', {
+        'title': KINDS[kind], 'record': data, 'headings': headings, 'rows': rows, 'summary': _summary(data),
+    }).encode()
+
+
+def render_pdf(data, kind):
+    headings, rows = record_table(data, kind)
+    margin, line = 50, 16
+    # Column x positions: the title gets whatever the grade columns leave.
+    grade_columns = len(headings) - 2
+    xs = [margin, margin + 80] + [PAGE_WIDTH - margin - 55 * (grade_columns - n) for n in range(grade_columns)]
+    title_chars = int((xs[2] - xs[1]) / 5.2)
+    pdf = PDFDocument()
+
+    def header():
+        y = PAGE_HEIGHT - margin
+        pdf.text(margin, y, KINDS[kind], size=16, bold=True)
+        y -= 24
+        student = data['student']
+        pdf.text(margin, y, f"{student['name']}  ({student['student_id'] or student['email']})", size=11)
+        if data['program']:
+            y -= line
+            pdf.text(margin, y, f"{data['program']['code']} - {data['program']['name']}", size=11)
+        y -= line * 2
+        for x, heading in zip(xs, headings):
+            pdf.text(x, y, heading, bold=True)
+        pdf.rule(margin, PAGE_WIDTH - margin, y - 5)
+        return y - line - 4
+
+    y = header()
+    for row in rows:
+        if y < margin + line * 4:
+            pdf.new_page()
+            y = header()
+        row = [row[0], row[1] if len(row[1]) <= title_chars else row[1][:title_chars - 1] + '...', *row[2:]]
+        for x, value in zip(xs, row):
+            pdf.text(x, y, value)
+        y -= line
+    pdf.rule(margin, PAGE_WIDTH - margin, y + line - 6)
+    for label, value in _summary(data):
+        y -= line
+        pdf.text(margin, y, label, bold=True)
+        pdf.text(xs[-1], y, value)
+    return pdf.render()
+
+
+RENDERERS = {'html': render_html, 'pdf': render_pdf}
+
+
+def render_record(data, kind, output):
+    return RENDERERS[output](data, kind)
+
+
+def store_record(storage, path, content):
+    name = storage.save(path, ContentFile(content))
+    if name != path:
+        # Another process stored the same record first; the copies are identical.
+        storage.delete(name)
+
+
+def student_record(student_pk, kind, output):
+    """(digest, path) of the stored record, rendering it first if its data changed; raises Student.DoesNotExist."""
+    found = list(record_data(Student.objects.filter(pk=student_pk)))
+    if not found:
+        raise Student.DoesNotExist(f"No student {student_pk}.")
+    data = found[0][1]
+    digest = record_digest(data, kind, output)
+    path = record_path(kind, digest, output)
+    storage = RecordStorage()
+    if not storage.exists(path):
+        store_record(storage, path, render_record(data, kind, output))
+    return digest, path
+
+
+def _render_job(args):
+    path, data, kind, output = args
+    return path, render_record(data, kind, output)
+
+
+def _init_worker():
+    # Forked workers inherit a configured Django; spawned ones need it for the templates.
+    from django.apps import apps
+    if not apps.ready:
+        import django
+        django.setup()
+
+
+def render_program_records(program_id, kind, output, workers=None, progress=None):
+    """
+    Renders the records of every student in a program that are not stored yet,
+    across `workers` processes (RECORDS_BATCH_WORKERS, default one per CPU; 1
+    renders in this process). Returns counts of students, rendered and already stored.
+    """
+    workers = workers or getattr(settings, 'RECORDS_BATCH_WORKERS', None) or os.cpu_count() or 1
+    storage = RecordStorage()
+    pending, total = [], 0
+    for _, data in record_data(Student.objects.filter(user__program_id=program_id)):
+        total += 1
+        path = record_path(kind, record_digest(data, kind, output), output)
+        if not storage.exists(path):
+            pending.append((path, data, kind, output))
+    if progress:
+        progress(total - len(pending), total)
+
+    def save(results):
+        for done, (path, content) in enumerate(results, start=total - len(pending) + 1):
+            store_record(storage, path, content)
+            if progress and done % 50 == 0:
+                progress(done, total)
+
+    if workers == 1 or len(pending) < 2:
+        save(map(_render_job, pending))
+    else:
+        # Workers only render; the parent does all storage writes.
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)), initializer=_init_worker) as pool:
+            save(pool.map(_render_job, pending, chunksize=max(1, len(pending) // (workers * 4))))
+    if progress:
+        progress(total, total)
+    return {"students": total, "rendered": len(pending), "stored": total - len(pending)}
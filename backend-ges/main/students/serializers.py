@@ -1,8 +1,10 @@
 # students/serializers.py
 from rest_framework import serializers
 from users.models import User
+from programs.serializers import SparseFieldsetMixin
+from .models import Student
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     middle_name = serializers.CharField(required=False, allow_blank=True)
     student_id = serializers.CharField(required=False, allow_blank=True)
     address = serializers.CharField(required=False, allow_blank=True)
@@ -13,6 +15,24 @@ class StudentSerializer(serializers.ModelSerializer):
         fields = ["id", "first_name", "middle_name", "last_name", "email", "username", "role", "student_id", "address", "contact_number"]
         read_only_fields = ["id"]
 
+class ProgramStudentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    # Identity comes from the linked user; the list view joins it with select_related.
+    student_id = serializers.CharField(source='user.student_id', read_only=True)
+    first_name = serializers.CharField(source='user.first_name', read_only=True)
+    middle_name = serializers.CharField(source='user.middle_name', read_only=True)
+    last_name = serializers.CharField(source='user.last_name', read_only=True)
+    email = serializers.EmailField(source='user.email', read_only=True)
+    username = serializers.CharField(source='user.username', read_only=True)
+    gender = serializers.CharField(source='user.gender', read_only=True)
+    address = serializers.CharField(source='user.address', read_only=True)
+    contact_number = serializers.CharField(source='user.contact_number', read_only=True)
+    program_id = serializers.IntegerField(source='user.program_id', read_only=True)
+
+    class Meta:
+        model = Student
+        fields = ["id", "student_id", "first_name", "middle_name", "last_name", "email", "username", "gender", "address", "contact_number", "program_id"]
+        read_only_fields = fields
+
 class StudentRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, style={'input_type': 'password'})
 
@@ -41,4 +61,11 @@ class StudentRegistrationSerializer(serializers.ModelSerializer):
             address=validated_data.get('address', ''),
             contact_number=validated_data.get('contact_number', '')
         )
-        return user
\ No newline at end of file
+        return user
+
+class EnrollmentPairSerializer(serializers.Serializer):
+    student_id = serializers.CharField(max_length=15)
+    subject_id = serializers.IntegerField(min_value=1)
+
+class BulkEnrollmentSerializer(serializers.Serializer):
+    enrollments = EnrollmentPairSerializer(many=True, allow_empty=False, max_length=20000)
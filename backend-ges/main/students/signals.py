@@ -0,0 +1,36 @@
+# students/signals.py
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from .models import Student
+from .term import invalidate_term_users, invalidate_terms
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_student_profile(sender, instance, created, raw=False, **kwargs):
+    """Every new student account gets its profile row; identity stays on the user."""
+    if created and not raw and instance.role == 'student':
+        Student.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def drop_cached_term_for_user(sender, instance, raw=False, **kwargs):
+    if not raw and instance.role == 'student':
+        invalidate_term_users([instance.pk])
+
+
+@receiver(post_delete, sender=Student)
+def drop_cached_term_for_student(sender, instance, **kwargs):
+    invalidate_term_users([instance.user_id])
+
+
+@receiver(m2m_changed, sender=Student.enrolled_subjects.through)
+def drop_cached_terms_on_enrollment(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_term_users([instance.user_id])
+    elif action in ('post_add', 'post_remove'):
+        invalidate_terms(pk_set)
+    elif action == 'pre_clear':
+        # The enrolled students are unknown once the rows are gone.
+        invalidate_terms(instance.enrolled_students.values_list('pk', flat=True))
@@ -0,0 +1,36 @@
+# students/tasks.py
+from programs.exports import export_chunks, keyset_rows
+from jobs.registry import PermanentJobError, task
+from .enrollment import bulk_enroll
+from .models import Student
+from .records import render_program_records
+from .views import StudentsByProgramExportView, class_list_filename
+
+
+@task('students.bulk_enroll')
+def enroll(job):
+    pairs = [(student_id, subject_id) for student_id, subject_id in job.payload['pairs']]
+    job.set_progress(0, len(pairs))
+    created, errors = bulk_enroll(pairs)
+    if errors:
+        # Nothing was written; retrying the same pairs would fail the same way.
+        raise PermanentJobError(f"{len(errors)} enrollment(s) rejected.", result={"enrolled": 0, "errors": errors})
+    job.set_progress(len(pairs))
+    return {"enrolled": created, "errors": []}
+
+
+@task('students.export_by_program')
+def export_class_list(job):
+    program_id, output = job.payload['program_id'], job.payload.get('output', 'csv')
+    columns = StudentsByProgramExportView.columns
+    queryset = Student.objects.filter(user__program_id=program_id).values(*[key for key, _ in columns])
+    chunks = export_chunks(keyset_rows(queryset), columns, output, progress=job.set_progress)
+    job.save_output(f'{class_list_filename(program_id)}.{output}', chunks)
+    return {"file": job.output_file.name}
+
+
+@task('students.render_records')
+def render_records(job):
+    # Safe to retry: records already stored are skipped.
+    return render_program_records(job.payload['program_id'], job.payload['kind'], job.payload['output'],
+                                  progress=job.set_progress)
@@ -0,0 +1,117 @@
+# students/term.py
+"""
+The "my term" aggregate: a student's profile, program, enrolled subjects with
+their schedules, grade entries and final grades, in one response.
+
+`build_term` always runs the same five queries, however many subjects or
+grades there are. Results are cached per account in the default cache under
+`term:<user pk>`, so a hit needs no query at all. Entries are dropped by
+`invalidate_terms` / `invalidate_term_users` whenever the student's account,
+enrollments, grade entries, final grades or the grade components of their
+subjects change (signals in students and grades, plus the bulk paths that
+bypass signals). Catalog edits (programs, subjects, schedules) are caught by
+storing the catalog version with the entry.
+
+Invalidation only reaches the cache it runs against, so with several worker
+processes the default cache must be shared (DEFAULT_CACHE_BACKEND in settings);
+with the per-process default another worker keeps serving its old entry.
+"""
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Prefetch
+
+from grades.models import FinalGrade, GradeEntry
+from main.db.replicas import primary
+from programs.cache import catalog_version, compute_etag
+from programs.models import Schedule, Subject
+from programs.serializers import ProgramSerializer, ScheduleSerializer
+from users.serializers import UserSerializer
+from .models import Student
+
+TERM_CACHE_KEY = 'term:{}'
+
+
+def term_cache_key(user_pk):
+    return TERM_CACHE_KEY.format(user_pk)
+
+
+def invalidate_term_users(user_pks):
+    """
+    Drops the cached terms once the current transaction commits (at once outside
+    one). Dropped before the commit, a concurrent `cached_term` could rebuild
+    from the old rows and cache them again.
+    """
+    keys = [term_cache_key(pk) for pk in set(user_pks)]
+    if keys:
+        transaction.on_commit(lambda: caches['default'].delete_many(keys))
+
+
+def invalidate_terms(student_pks):
+    """Same, by Student pk (a query per 1000 students to map them to accounts, run at once)."""
+    student_pks = list(set(student_pks))
+    for start in range(0, len(student_pks), 1000):
+        chunk = student_pks[start:start + 1000]
+        invalidate_term_users(Student.objects.filter(pk__in=chunk).values_list('user_id', flat=True))
+
+
+def build_term(student, context=None):
+    """`student` must come with `user__program` loaded (one query, see `cached_term`)."""
+    user = student.user
+    subjects = (
+        Subject.objects.filter(enrolled_students=student)
+        .prefetch_related(Prefetch('schedules', queryset=Schedule.objects.order_by('day', 'start_time')))
+        .order_by('course_code')
+    )
+    entries = GradeEntry.objects.filter(student=student).select_related('component').order_by('component__name', 'period')
+    finals = dict(FinalGrade.objects.filter(student=student).values_list('subject_id', 'score'))
+
+    grades_by_subject = {}
+    for entry in entries:
+        grades_by_subject.setdefault(entry.component.subject_id, []).append({
+            'component_id': entry.component_id,
+            'component': entry.component.name,
+            'weight': entry.component.weight,
+            'period': entry.period,
+            'score': entry.score,
+        })
+
+    subject_rows = []
+    graded_credits, weighted = 0, Decimal(0)
+    for subject in subjects:
+        final = finals.get(subject.pk)
+        if final is not None:
+            graded_credits += subject.credits
+            weighted += final * subject.credits
+        subject_rows.append({
+            'id': subject.pk,
+            'course_code': subject.course_code,
+            'title': subject.title,
+            'credits': subject.credits,
+            'schedules': ScheduleSerializer(subject.schedules.all(), many=True).data,
+            'grades': grades_by_subject.get(subject.pk, []),
+            'final_grade': final,
+        })
+
+    return {
+        'profile': UserSerializer(user, context=context or {}).data,
+        'program': ProgramSerializer(user.program).data if user.program else None,
+        'subjects': subject_rows,
+        'total_credits': sum(row['credits'] for row in subject_rows),
+        'gpa': (weighted / graded_credits).quantize(Decimal('0.01')) if graded_credits else None,
+    }
+
+
+def cached_term(user_pk, context=None):
+    """Returns `(etag, data)` for the student account `user_pk`; raises Student.DoesNotExist."""
+    cache = caches['default']
+    version = catalog_version()
+    entry = cache.get(term_cache_key(user_pk))
+    if entry is None or entry[0] != version:
+        with primary():  # cached until the next write, so never built from a lagging replica
+            student = Student.objects.select_related('user__program').get(user_id=user_pk)
+            data = build_term(student, context)
+        entry = (version, compute_etag(data), data)
+        cache.set(term_cache_key(user_pk), entry)
+    return entry[1], entry[2]
@@ -1,3 +1,330 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import time
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from grades.engine import compute_final_grades
+from grades.models import GradeComponent, GradeEntry
+from programs.conflicts import reset_schedule_index, schedule_index
+from programs.models import Program, Subject, Schedule
+from users.models import User
+from users.passwords import LoginCapacityError
+from users.tokens import ClaimsRefreshToken
+from .enrollment import Enrollment
+from .models import Student
+from .records import RecordStorage, render_program_records
+from .term import term_cache_key
+
+
+class StudentsByProgramQueryCountTests(TestCase):
+    """Query counts on /api/students/* must not grow with the number of rows returned."""
+
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            email='teacher@example.com', password='pass12345', username='teacher',
+            first_name='T', last_name='Eacher', role='teacher'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        self.program = Program.objects.create(code='BSCS', name='Computer Science')
+        self.subject = Subject.objects.create(program=self.program, course_code='CS101', title='Intro', credits=3)
+        self.created = 0
+
+    def add_students(self, count):
+        for _ in range(count):
+            self.created += 1
+            student = User.objects.create_user(
+                email=f's{self.created}@example.com', password='pass12345', username=f's{self.created}',
+                first_name='Stu', last_name='Dent', role='student',
+                student_id=f'S{self.created:05}', program=self.program
+            ).student_profile
+            student.enrolled_subjects.add(self.subject)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(ctx.captured_queries)
+
+    def test_students_by_program(self):
+        url = f'/api/students/programs/{self.program.pk}/students/'
+        self.add_students(1)
+        small = self.count_queries(url)
+        self.add_students(10)
+        self.assertEqual(small, self.count_queries(url))
+
+    def test_missing_program_is_404(self):
+        response = self.client.get('/api/students/programs/999/students/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_async_view_matches_sync_view(self):
+        self.add_students(3)
+        url = f'/api/students/programs/{self.program.pk}/students/'
+        token = ClaimsRefreshToken.for_user(self.teacher).access_token
+        with self.settings(ROOT_URLCONF='main.asgi_urls'):
+            response = async_to_sync(self.async_client.get)(url, headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), self.client.get(url).json())
+
+
+class BulkEnrollmentTests(TestCase):
+    url = '/api/students/enrollments/bulk/'
+
+    def setUp(self):
+        reset_schedule_index()
+        self.teacher = User.objects.create_user(
+            email='teacher@example.com', password='pass12345', username='teacher',
+            first_name='T', last_name='Eacher', role='teacher'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+        program = Program.objects.create(code='BSCS', name='Computer Science')
+        self.math = Subject.objects.create(program=program, course_code='MATH1', title='Math', credits=3)
+        self.physics = Subject.objects.create(program=program, course_code='PHYS1', title='Physics', credits=3)
+        self.art = Subject.objects.create(program=program, course_code='ART1', title='Art', credits=2)
+        Schedule.objects.create(subject=self.math, day='Monday', start_time=time(8), end_time=time(10), room='A')
+        Schedule.objects.create(subject=self.physics, day='Monday', start_time=time(9), end_time=time(11), room='B')
+        Schedule.objects.create(subject=self.art, day='Monday', start_time=time(10), end_time=time(11), room='C')
+        users = User.objects.bulk_create(
+            User(student_id=f'S{i}', first_name='Stu', last_name='Dent', email=f's{i}@example.com',
+                 username=f's{i}', gender='Female', role='student', program=program)
+            for i in range(50)
+        )
+        self.students = Student.objects.bulk_create(Student(user=user) for user in users)
+
+    def post(self, pairs):
+        return self.client.post(self.url, {'enrollments': [
+            {'student_id': student_id, 'subject_id': subject_id} for student_id, subject_id in pairs
+        ]}, format='json')
+
+    def test_enrolls_cohort_in_constant_queries(self):
+        pairs = [(s.user.student_id, subject.pk) for s in self.students for subject in (self.math, self.art)]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.post(pairs)
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['enrolled'], 100)
+        self.assertLess(len(ctx.captured_queries), 15)
+        self.assertEqual(self.students[0].enrolled_subjects.count(), 2)
+
+    def test_rejects_overlaps_and_existing_enrollments(self):
+        student = self.students[0]
+        student.enrolled_subjects.add(self.math)
+        response = self.post([
+            (student.user.student_id, self.math.pk),
+            (student.user.student_id, self.physics.pk),
+            ('missing', self.art.pk),
+            (self.students[1].user.student_id, self.art.pk),
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e['index'] for e in response.data['errors']], [0, 1, 2])
+        self.assertFalse(self.students[1].enrolled_subjects.exists())
+
+    def test_overlaps_are_checked_against_the_database(self):
+        student = self.students[0]
+        schedule_index()  # built before the enrollment below, which bypasses its signals
+        Enrollment.objects.bulk_create([Enrollment(student_id=student.pk, subject_id=self.math.pk)])
+        response = self.post([(student.user.student_id, self.physics.pk)])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('overlaps with a subject the student is already enrolled in', response.data['errors'][0]['error'])
+
+
+class StudentProfileTests(TestCase):
+    def test_registration_creates_profile_linked_to_user(self):
+        response = APIClient().post('/api/students/register/', {
+            'email': 'new@example.com', 'username': 'new', 'password': 'pass12345', 'first_name': 'New',
+            'last_name': 'Student', 'gender': 'Female', 'student_id': 'S900'
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        student = Student.objects.select_related('user').get(user__email='new@example.com')
+        self.assertEqual(student.user.student_id, 'S900')
+
+    def test_registration_answers_503_when_the_hashing_pool_is_full(self):
+        with mock.patch('users.models.hash_password', side_effect=LoginCapacityError('busy')):
+            response = APIClient().post('/api/students/register/', {
+                'email': 'new@example.com', 'username': 'new', 'password': 'pass12345', 'first_name': 'New',
+                'last_name': 'Student', 'gender': 'Female', 'student_id': 'S900'
+            }, format='json')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertFalse(User.objects.filter(email='new@example.com').exists())
+
+    def test_teacher_account_has_no_student_profile(self):
+        user = User.objects.create_user(email='t@example.com', password='pass12345', username='t', role='teacher')
+        self.assertFalse(Student.objects.filter(user=user).exists())
+        self.assertTrue(user.teacher_profile.pk)
+
+
+class MyTermTests(TestCase):
+    url = '/api/students/me/term/'
+
+    def setUp(self):
+        caches['default'].clear()
+        caches['catalog'].clear()
+        self.program = Program.objects.create(code='BSCS', name='Computer Science')
+        self.user = User.objects.create_user(
+            email='s@example.com', password='pass12345', username='stud', first_name='S', last_name='Tudent',
+            role='student', student_id='S1', program=self.program
+        )
+        self.student = self.user.student_profile
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.subjects = 0
+
+    def enroll(self, count):
+        with self.captureOnCommitCallbacks(execute=True):  # terms are invalidated on commit
+            for _ in range(count):
+                self.subjects += 1
+                subject = Subject.objects.create(
+                    program=self.program, course_code=f'CS{self.subjects}', title='Subject', credits=3)
+                Schedule.objects.create(subject=subject, day='Monday', start_time=time(7 + self.subjects), end_time=time(8 + self.subjects), room='R1')
+                component = GradeComponent.objects.create(subject=subject, name='Exam', weight=100)
+                GradeEntry.objects.create(student=self.student, component=component, period='prelim', score=90)
+                self.student.enrolled_subjects.add(subject)
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(ctx.captured_queries)
+
+    def test_fixed_query_count_then_cached(self):
+        self.enroll(1)
+        self.assertEqual(self.count_queries(), 5)
+        self.enroll(5)
+        self.assertEqual(self.count_queries(), 5)
+        self.assertEqual(self.count_queries(), 0)
+
+    def test_grade_and_enrollment_changes_invalidate(self):
+        self.enroll(1)
+        first = self.client.get(self.url)
+        self.assertEqual(first.data['program']['code'], 'BSCS')
+        self.assertEqual(first.data['subjects'][0]['grades'][0]['score'], 90)
+        self.assertIsNone(first.data['gpa'])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            compute_final_grades()
+        self.assertEqual(self.client.get(self.url).data['gpa'], 90)
+        entry = GradeEntry.objects.get()
+        entry.score = 80
+        with self.captureOnCommitCallbacks(execute=True):
+            entry.save()
+        self.assertEqual(self.client.get(self.url).data['subjects'][0]['grades'][0]['score'], 80)
+        self.enroll(1)
+        self.assertEqual(len(self.client.get(self.url).data['subjects']), 2)
+        subject = Subject.objects.get(course_code='CS1')
+        subject.title = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            subject.save()
+        self.assertEqual(self.client.get(self.url).data['subjects'][0]['title'], 'Renamed')
+
+    def test_entry_is_dropped_only_once_the_write_commits(self):
+        self.enroll(1)
+        self.client.get(self.url)
+        key = term_cache_key(self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                GradeEntry.objects.update_or_create(
+                    student=self.student, component=GradeComponent.objects.get(), period='prelim', defaults={'score': 70})
+                self.assertIsNotNone(caches['default'].get(key))
+        self.assertIsNone(caches['default'].get(key))
+
+    def test_invalidation_reaches_other_workers_through_a_shared_cache(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        shared = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+        with self.settings(CACHES={**settings.CACHES, 'default': shared}):
+            self.enroll(1)
+            self.client.get(self.url)
+            other_worker = caches.create_connection('default')
+            self.assertIsNotNone(other_worker.get(term_cache_key(self.user.pk)))
+            self.enroll(1)
+            self.assertIsNone(other_worker.get(term_cache_key(self.user.pk)))
+
+    def test_only_students(self):
+        teacher = User.objects.create_user(email='t@example.com', password='pass12345', username='t', role='teacher')
+        self.client.force_authenticate(teacher)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class RecordTests(TestCase):
+    url = '/api/students/me/record/'
+
+    def setUp(self):
+        self.files = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.files, ignore_errors=True)
+        override = override_settings(RECORDS_ROOT=self.files)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.program = Program.objects.create(code='BSCS', name='Computer Science')
+        self.subject = Subject.objects.create(program=self.program, course_code='CS1', title='Programming', credits=3)
+        component = GradeComponent.objects.create(subject=self.subject, name='Exam', weight=100)
+        self.students = []
+        for n in range(3):
+            user = User.objects.create_user(
+                email=f's{n}@example.com', password='pass12345', username=f's{n}', first_name='Ana', last_name=f'Reyes{n}',
+                role='student', student_id=f'S{n}', program=self.program
+            )
+            user.student_profile.enrolled_subjects.add(self.subject)
+            GradeEntry.objects.create(student=user.student_profile, component=component, period='prelim', score=90 - n)
+            self.students.append(user)
+        compute_final_grades()
+        self.client = APIClient()
+        self.client.force_authenticate(self.students[0])
+
+    def stored(self):
+        storage = RecordStorage()
+        return sorted(
+            f'{kind}/{shard}/{name}'
+            for kind in storage.listdir('')[0] for shard in storage.listdir(kind)[0]
+            for name in storage.listdir(f'{kind}/{shard}')[1]
+        )
+
+    def test_rendered_once_until_the_data_changes(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(first.streaming_content).startswith(b'%PDF-1.4'))
+        self.assertEqual(self.client.get(self.url)['ETag'], first['ETag'])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.assertEqual(len(self.stored()), 1)
+
+        entry = GradeEntry.objects.get(student__user=self.students[0])
+        entry.score = 70
+        entry.save()
+        compute_final_grades()
+        self.assertNotEqual(self.client.get(self.url)['ETag'], first['ETag'])
+        self.assertEqual(len(self.stored()), 2)
+
+    def test_html_report_card_and_permissions(self):
+        response = self.client.get(self.url, {'kind': 'report_card', 'output': 'html'})
+        html = b''.join(response.streaming_content).decode()
+        self.assertIn('Reyes0, Ana', html)
+        self.assertIn('<th>Prelim</th>', html)
+        self.assertIn('<td>90.00</td>', html)
+        self.assertEqual(self.client.get(self.url, {'kind': 'diploma'}).status_code, 400)
+        other = self.students[1].student_profile.pk
+        self.assertEqual(self.client.get(f'/api/students/{other}/record/').status_code, 403)
+
+    def test_program_batch_renders_across_processes(self):
+        counts = render_program_records(self.program.pk, 'transcript', 'pdf', workers=2)
+        self.assertEqual(counts, {'students': 3, 'rendered': 3, 'stored': 0})
+        self.assertEqual(render_program_records(self.program.pk, 'transcript', 'pdf', workers=2)['stored'], 3)
+        teacher = User.objects.create_user(
+            email='teacher@example.com', password='pass12345', username='teacher', first_name='T', last_name='Eacher', role='teacher'
+        )
+        self.client.force_authenticate(teacher)
+        response = self.client.get(f'/api/students/{self.students[2].student_profile.pk}/record/')
+        self.assertIn(response['ETag'].strip('"') + '.pdf', ' '.join(self.stored()))
+        self.assertEqual(len(self.stored()), 3)
 
-# Create your tests here.
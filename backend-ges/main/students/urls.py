@@ -1,8 +1,17 @@
 from django.urls import path
-from .views import student_registration, student_login, StudentsByProgramListView
+from .views import (
+    student_registration, student_login, StudentsByProgramListView, StudentsByProgramExportView, bulk_enrollment, my_term,
+    my_record, student_record_view, render_program_records_view,
+)
 
 urlpatterns = [
     path('register/', student_registration, name='student_registration'),
     path('login/', student_login, name='student_login'),
     path('programs/<int:program_id>/students/', StudentsByProgramListView.as_view(), name='students-by-program'),
+    path('programs/<int:program_id>/students/export/', StudentsByProgramExportView.as_view(), name='students-by-program-export'),
+    path('me/term/', my_term, name='my-term'),
+    path('me/record/', my_record, name='my-record'),
+    path('<int:student_pk>/record/', student_record_view, name='student-record'),
+    path('programs/<int:program_id>/records/', render_program_records_view, name='program-records'),
+    path('enrollments/bulk/', bulk_enrollment, name='bulk-enrollment'),
 ]
\ No newline at end of file
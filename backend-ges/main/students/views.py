@@ -3,14 +3,23 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
-from rest_framework_simplejwt.tokens import RefreshToken
+from users.tokens import ClaimsRefreshToken
+from users.passwords import RETRY_AFTER, verify_password, LoginCapacityError
 from users.models import User
-from .serializers import StudentSerializer, StudentRegistrationSerializer
+from .serializers import StudentSerializer, StudentRegistrationSerializer, ProgramStudentSerializer, BulkEnrollmentSerializer
 from rest_framework import generics,permissions
 from rest_framework.permissions import IsAuthenticated
-from django.http import Http404
+from django.http import FileResponse, Http404, HttpResponseNotModified
 from programs.models import Program
+from programs.pagination import KeysetPagination
+from programs.cache import etag_matches
+from programs.exports import keyset_rows, requested_format, streaming_export
 from .models import Student
+from jobs.registry import enqueue
+from jobs.views import wants_background, job_accepted
+from .enrollment import bulk_enroll
+from .term import cached_term
+from .records import FORMATS, KINDS, TRANSCRIPT, RecordStorage, student_record
 
 
 class IsTeacherOrAdmin(permissions.BasePermission):
@@ -20,24 +29,135 @@ class IsTeacherOrAdmin(permissions.BasePermission):
         return request.user.role in ['teacher', 'admin'] or request.user.is_superuser
 
 
+class IsStudent(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and request.user.role == 'student'
+
+
 class StudentsByProgramListView(generics.ListAPIView):
-    serializer_class = StudentSerializer
+    serializer_class = ProgramStudentSerializer
     permission_classes =[IsTeacherOrAdmin]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         program_id = self.kwargs.get('program_id')
         try:
             program = Program.objects.get(id=program_id)
-            return Student.objects.filter(program=program)
+            return Student.objects.filter(user__program=program).select_related('user')
         except Program.DoesNotExist:
             raise Http404("Program does not exist")
+
+class StudentsByProgramExportView(StudentsByProgramListView):
+    """Streams a program's class list as CSV or JSON (`?output=`), or queues it with `?background=1`."""
+    columns = [
+        ('id', 'id'), ('user__student_id', 'student_id'), ('user__last_name', 'last_name'), ('user__first_name', 'first_name'),
+        ('user__middle_name', 'middle_name'), ('user__email', 'email'), ('user__gender', 'gender'),
+        ('user__contact_number', 'contact_number'),
+    ]
+
+    def get(self, request, *args, **kwargs):
+        output = requested_format(request)
+        if output is None:
+            return Response({"error": "Unsupported output format."}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = self.get_queryset()
+        if wants_background(request):
+            job = enqueue('students.export_by_program', {'program_id': self.kwargs['program_id'], 'output': output}, user=request.user)
+            return job_accepted(request, job)
+        rows = keyset_rows(queryset.values(*[key for key, _ in self.columns]))
+        return streaming_export(rows, self.columns, output, class_list_filename(self.kwargs['program_id']))
+
+
+def class_list_filename(program_id):
+    return f"program-{program_id}-students"
         
+@api_view(['POST'])
+@permission_classes([IsTeacherOrAdmin])
+def bulk_enrollment(request):
+    serializer = BulkEnrollmentSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    pairs = [(item['student_id'], item['subject_id']) for item in serializer.validated_data['enrollments']]
+    if wants_background(request):
+        return job_accepted(request, enqueue('students.bulk_enroll', {'pairs': pairs}, user=request.user))
+    created, errors = bulk_enroll(pairs)
+    if errors:
+        return Response({"enrolled": 0, "errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({"enrolled": created, "errors": []}, status=status.HTTP_201_CREATED)
+
+@api_view(['GET'])
+@permission_classes([IsStudent])
+def my_term(request):
+    """Profile, program, enrolled subjects with schedules, and grades in one response (see students.term)."""
+    try:
+        etag, data = cached_term(request.user.pk, {'request': request})
+    except Student.DoesNotExist:
+        return Response({"detail": "Student profile not found."}, status=status.HTTP_404_NOT_FOUND)
+    if etag_matches(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(data)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+def record_response(request, student_pk):
+    """A stored transcript or report card (`?kind=transcript|report_card&output=pdf|html`), see students.records."""
+    kind = request.query_params.get('kind', TRANSCRIPT)
+    output = request.query_params.get('output', 'pdf')
+    if kind not in KINDS or output not in FORMATS:
+        return Response({"detail": f"kind must be one of {', '.join(KINDS)}; output one of {', '.join(FORMATS)}."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        digest, path = student_record(student_pk, kind, output)
+    except Student.DoesNotExist:
+        return Response({"detail": "Student profile not found."}, status=status.HTTP_404_NOT_FOUND)
+    etag = f'"{digest}"'
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(RecordStorage().open(path, 'rb'), content_type=FORMATS[output],
+                                filename=f'{kind}-{student_pk}.{output}')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+@api_view(['GET'])
+@permission_classes([IsStudent])
+def my_record(request):
+    student_pk = Student.objects.filter(user_id=request.user.pk).values_list('pk', flat=True).first()
+    if student_pk is None:
+        return Response({"detail": "Student profile not found."}, status=status.HTTP_404_NOT_FOUND)
+    return record_response(request, student_pk)
+
+@api_view(['GET'])
+@permission_classes([IsTeacherOrAdmin])
+def student_record_view(request, student_pk):
+    return record_response(request, student_pk)
+
+@api_view(['POST'])
+@permission_classes([IsTeacherOrAdmin])
+def render_program_records_view(request, program_id):
+    """Queues rendering of a program's records that are not stored yet (term end), so downloads are then served from storage."""
+    kind = request.data.get('kind', TRANSCRIPT)
+    output = request.data.get('output', 'pdf')
+    if kind not in KINDS or output not in FORMATS:
+        return Response({"detail": f"kind must be one of {', '.join(KINDS)}; output one of {', '.join(FORMATS)}."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if not Program.objects.filter(pk=program_id).exists():
+        return Response({"detail": "Program not found."}, status=status.HTTP_404_NOT_FOUND)
+    job = enqueue('students.render_records', {'program_id': program_id, 'kind': kind, 'output': output}, user=request.user)
+    return job_accepted(request, job)
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def student_registration(request):
     serializer = StudentRegistrationSerializer(data=request.data)
     if serializer.is_valid():
-        user = serializer.save()
+        try:
+            user = serializer.save()
+        except LoginCapacityError as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': RETRY_AFTER})
         return Response(StudentSerializer(user).data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -55,10 +175,14 @@ def student_login(request):
     except User.DoesNotExist:
         return Response({"error": "Invalid student ID or user not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    if not user.check_password(password):
+    try:
+        valid = verify_password(user, password)
+    except LoginCapacityError as e:
+        return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': RETRY_AFTER})
+    if not valid:
         return Response({"error": "Incorrect password"}, status=status.HTTP_401_UNAUTHORIZED)
 
-    refresh = RefreshToken.for_user(user)
+    refresh = ClaimsRefreshToken.for_user(user)
     return Response({
         'refresh': str(refresh),
         'access': str(refresh.access_token),
@@ -79,10 +203,14 @@ def teacher_login(request):
     except User.DoesNotExist:
         return Response({"error": "Invalid email or user not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    if not user.check_password(password):
+    try:
+        valid = verify_password(user, password)
+    except LoginCapacityError as e:
+        return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': RETRY_AFTER})
+    if not valid:
         return Response({"error": "Incorrect password"}, status=status.HTTP_401_UNAUTHORIZED)
 
-    refresh = RefreshToken.for_user(user)
+    refresh = ClaimsRefreshToken.for_user(user)
     return Response({
         'refresh': str(refresh),
         'access': str(refresh.access_token),
@@ -0,0 +1,116 @@
+"""
+Links every Teacher row to its users.User identity, matching on email
+regardless of case.
+
+Runs in keyset batches of BATCH_SIZE rows, each in its own short transaction, so
+it can run against a live table. Teachers with no matching user get a User row
+(unusable password) created from their profile columns, and users gain the
+program they were missing.
+"""
+from django.contrib.auth.hashers import make_password
+from django.db import migrations, transaction
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+BATCH_SIZE = 1000
+COPIED_FIELDS = ('first_name', 'middle_name', 'last_name', 'contact_number', 'gender')
+
+
+def users_by_email(User, emails):
+    """Lowercased email -> user. Matched case-insensitively whatever the column's collation."""
+    keys = {email.lower() for email in emails}
+    rows = User.objects.annotate(email_key=Lower('email')).filter(email_key__in=keys).order_by('-id')
+    return {user.email.lower(): user for user in rows}  # the oldest account wins a case-only tie
+
+
+def free_usernames(User, people, fallback):
+    """
+    person pk -> username: their own if free, else `fallback(person)`, else that
+    with the first free numeric suffix. Compared case-insensitively, against
+    existing users and the rest of the batch.
+    """
+    candidates = {name.lower() for person in people for name in (person.username, fallback(person)) if name}
+    taken = set(User.objects.annotate(username_key=Lower('username')).filter(username_key__in=candidates)
+                .values_list('username_key', flat=True))
+    names = {}
+    for person in people:
+        name = next((name for name in (person.username, fallback(person)) if name and name.lower() not in taken), None)
+        suffix = 2
+        while name is None:
+            # Rare enough for a query per attempt.
+            name = f'{fallback(person)}-{suffix}'
+            if name.lower() in taken or User.objects.filter(username__iexact=name).exists():
+                name, suffix = None, suffix + 1
+        taken.add(name.lower())
+        names[person.pk] = name
+    return names
+
+
+def link_batch(User, Teacher, teachers):
+    users = users_by_email(User, [t.email for t in teachers])
+
+    missing = [t for t in teachers if t.email.lower() not in users]
+    if missing:
+        usernames = free_usernames(User, missing, lambda t: f'teacher-{t.teacher_id}')
+        User.objects.bulk_create([
+            User(
+                email=t.email,
+                username=usernames[t.pk],
+                role='teacher',
+                program_id=t.program_id,
+                password=make_password(None),
+                **{field: getattr(t, field) for field in COPIED_FIELDS},
+            )
+            for t in missing
+        ])
+        users.update(users_by_email(User, [t.email for t in missing]))
+
+    changed = []
+    for teacher in teachers:
+        user = users[teacher.email.lower()]
+        if user.program_id is None and teacher.program_id is not None:
+            user.program_id = teacher.program_id
+            changed.append(user)
+        teacher.user_id = user.id
+    User.objects.bulk_update(changed, ['program'])
+    Teacher.objects.bulk_update(teachers, ['user'])
+
+
+def check_case_duplicates(Teacher):
+    """Two legacy rows whose emails differ only in case would both match one user."""
+    duplicates = list(
+        Teacher.objects.annotate(email_key=Lower('email')).values('email_key').annotate(rows=Count('id'))
+        .filter(rows__gt=1).order_by('email_key').values_list('email_key', flat=True)
+    )
+    if duplicates:
+        raise RuntimeError(
+            f"{len(duplicates)} email(s) are used by more than one teacher row, differing only in case; "
+            "merge or fix them, then migrate again:\n" + '\n'.join(f"  {email}" for email in duplicates[:50])
+        )
+
+
+def link_teachers(apps, schema_editor):
+    Teacher = apps.get_model('teachers', 'Teacher')
+    User = apps.get_model('users', 'User')
+    check_case_duplicates(Teacher)
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            batch = list(Teacher.objects.filter(id__gt=last_id, user__isnull=True).order_by('id')[:BATCH_SIZE])
+            if not batch:
+                return
+            last_id = batch[-1].id
+            link_batch(User, Teacher, batch)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('teachers', '0002_teacher_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_teachers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+"""
+Drops the identity columns duplicated from users.User and gives every teacher
+user a profile row, in keyset batches.
+"""
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models, transaction
+
+BATCH_SIZE = 1000
+
+
+def create_missing_profiles(apps, schema_editor):
+    Teacher = apps.get_model('teachers', 'Teacher')
+    User = apps.get_model('users', 'User')
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                User.objects.filter(role='teacher', id__gt=last_id, teacher_profile__isnull=True)
+                .order_by('id').values_list('id', flat=True)[:BATCH_SIZE]
+            )
+            if not ids:
+                return
+            last_id = ids[-1]
+            Teacher.objects.bulk_create([Teacher(user_id=user_id) for user_id in ids])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teachers', '0003_link_teachers_to_users'),
+    ]
+
+    operations = [
+        migrations.RemoveField(model_name='teacher', name='first_name'),
+        migrations.RemoveField(model_name='teacher', name='middle_name'),
+        migrations.RemoveField(model_name='teacher', name='last_name'),
+        migrations.RemoveField(model_name='teacher', name='email'),
+        migrations.RemoveField(model_name='teacher', name='contact_number'),
+        migrations.RemoveField(model_name='teacher', name='username'),
+        migrations.RemoveField(model_name='teacher', name='gender'),
+        migrations.RemoveField(model_name='teacher', name='program'),
+        migrations.AlterField(
+            model_name='teacher',
+            name='teacher_id',
+            field=models.CharField(blank=True, max_length=15, null=True, unique=True),
+        ),
+        migrations.RunPython(create_missing_profiles, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='teacher',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='teacher_profile', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -1,8 +1,9 @@
 # teachers/serializers.py
 from rest_framework import serializers
 from users.models import User
+from users.serializers import AvatarSerializerMixin
 
-class TeacherSerializer(serializers.ModelSerializer):
+class TeacherSerializer(AvatarSerializerMixin, serializers.ModelSerializer):
     middle_name = serializers.CharField(required=False, allow_blank=True)
     student_id = serializers.CharField(required=False, allow_blank=True)
     address = serializers.CharField(required=False, allow_blank=True)
@@ -10,5 +11,5 @@ class TeacherSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = User
-        fields = ['id', 'first_name', 'middle_name', 'last_name', 'email', 'username', 'role', 'student_id', 'gender', 'address', 'contact_number', 'avatar']
+        fields = ['id', 'first_name', 'middle_name', 'last_name', 'email', 'username', 'role', 'student_id', 'gender', 'address', 'contact_number', 'avatar', 'avatar_renditions']
         read_only_fields = ["id"]
\ No newline at end of file
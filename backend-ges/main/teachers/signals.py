@@ -0,0 +1,12 @@
+# teachers/signals.py
+from django.conf import settings
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import Teacher
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_teacher_profile(sender, instance, created, raw=False, **kwargs):
+    """Every new teacher account gets its profile row; identity stays on the user."""
+    if created and not raw and instance.role == 'teacher':
+        Teacher.objects.get_or_create(user=instance)
@@ -3,7 +3,8 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
-from rest_framework_simplejwt.tokens import RefreshToken
+from users.tokens import ClaimsRefreshToken
+from users.passwords import RETRY_AFTER, verify_password, LoginCapacityError
 from users.models import User
 from .serializers import TeacherSerializer
 import logging
@@ -17,7 +18,7 @@ def teacher_login(request):
     password = request.data.get('password')
 
     if not email or not password:
-        logger.error(f"Missing email or password in teacher login request: email={email}")
+        logger.error("Missing email or password in teacher login request: email=%s", email)
         return Response(
             {"error": "Email and password are required"},
             status=status.HTTP_400_BAD_REQUEST
@@ -26,21 +27,31 @@ def teacher_login(request):
     try:
         user = User.objects.get(email=email, role='teacher')
     except User.DoesNotExist:
-        logger.error(f"No teacher found with email={email}")
+        logger.error("No teacher found with email=%s", email)
         return Response(
             {"error": "Invalid email or user not found"},
             status=status.HTTP_401_UNAUTHORIZED
         )
 
-    if not user.check_password(password):
-        logger.error(f"Incorrect password for email={email}")
+    try:
+        valid = verify_password(user, password)
+    except LoginCapacityError as e:
+        logger.error("Login hashing pool saturated for email=%s", email)
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={'Retry-After': RETRY_AFTER}
+        )
+
+    if not valid:
+        logger.error("Incorrect password for email=%s", email)
         return Response(
             {"error": "Incorrect password"},
             status=status.HTTP_401_UNAUTHORIZED
         )
 
-    refresh = RefreshToken.for_user(user)
-    logger.info(f"Successful teacher login for email={email}")
+    refresh = ClaimsRefreshToken.for_user(user)
+    logger.info("Successful teacher login for email=%s", email)
     return Response({
         'refresh': str(refresh),
         'access': str(refresh.access_token),
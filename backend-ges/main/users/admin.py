@@ -17,7 +17,8 @@ class UserAdmin(BaseUserAdmin):
     )
     list_display = ('email', 'username', 'role', 'is_staff')
     list_filter = ('role', 'is_staff', 'is_active')
-    search_fields = ('email', 'username')
+    # Prefix matches can use the unique indexes; '%...%' scans the whole table.
+    search_fields = ('^email', '^username', '^student_id')
     ordering = ('email',)
     filter_horizontal = ()
 
@@ -0,0 +1,15 @@
+# users/async_views.py
+from rest_framework.permissions import IsAuthenticated
+from programs.async_views import async_read_view, json_response
+from .authentication import LazyUser
+from .serializers import UserSerializer
+from .views import UserProfileView
+
+
+@async_read_view(IsAuthenticated, UserProfileView.as_view())
+async def user_profile(request):
+    """Async UserProfileView.get(); the row is read with one async query unless authentication already loaded it."""
+    user = request.user
+    if isinstance(user, LazyUser):
+        user = await user.aload()
+    return json_response(UserSerializer(user).data)
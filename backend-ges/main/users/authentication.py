@@ -0,0 +1,165 @@
+# users/authentication.py
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from main.db.replicas import anote_user, note_user, primary
+from .models import User
+from .tokens import USER_CLAIMS
+
+USER_CACHE_KEY = 'auth:user:{}'
+
+
+def user_cache_key(user_id):
+    return USER_CACHE_KEY.format(user_id)
+
+
+def _claims(user):
+    # Only what permission checks read: the default cache may be a shared file or
+    # server, so the row itself (with its password hash) is never stored there.
+    return {claim: getattr(user, claim) for claim in USER_CLAIMS}
+
+
+def _check_active(is_active):
+    if not is_active:
+        raise AuthenticationFailed("User is inactive", code='user_inactive')
+
+
+def _ttl():
+    return getattr(settings, 'AUTH_USER_CACHE_TTL', 30)
+
+
+def _get_row(user_id):
+    try:
+        return User.objects.get(pk=user_id)
+    except User.DoesNotExist:
+        raise AuthenticationFailed("User not found", code='user_not_found')
+
+
+async def _aget_row(user_id):
+    try:
+        return await User.objects.aget(pk=user_id)
+    except User.DoesNotExist:
+        raise AuthenticationFailed("User not found", code='user_not_found')
+
+
+class LazyUser:
+    """
+    Stand-in for `request.user` for a token carrying a user id.
+
+    `id`, `pk` and the USER_CLAIMS attributes are answered from the user's current
+    claims, kept in the default cache for AUTH_USER_CACHE_TTL seconds and dropped
+    when the user is saved. Touching anything else loads the full row from the
+    database once per request and delegates to it, including attribute writes
+    and save().
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id, claims, user=None):
+        object.__setattr__(self, '_user', user)
+        object.__setattr__(self, 'id', user_id)
+        object.__setattr__(self, 'pk', user_id)
+        for claim, value in claims.items():
+            object.__setattr__(self, claim, value)
+
+    @classmethod
+    def from_token(cls, user_id, token):
+        """Raises AuthenticationFailed if the user is gone or inactive; reads the database only on a cache miss."""
+        _check_active(token.get('is_active', True))
+        cache = caches['default']
+        claims = cache.get(user_cache_key(user_id))
+        user = None
+        if claims is None:
+            with primary():  # cached, so never read from a lagging replica
+                user = _get_row(user_id)
+            claims = _claims(user)
+            cache.set(user_cache_key(user_id), claims, _ttl())
+        _check_active(claims['is_active'])
+        return cls(user_id, claims, user)
+
+    @classmethod
+    async def afrom_token(cls, user_id, token):
+        """Async twin of `from_token()`."""
+        _check_active(token.get('is_active', True))
+        cache = caches['default']
+        claims = await cache.aget(user_cache_key(user_id))
+        user = None
+        if claims is None:
+            with primary():
+                user = await _aget_row(user_id)
+            claims = _claims(user)
+            await cache.aset(user_cache_key(user_id), claims, _ttl())
+        _check_active(claims['is_active'])
+        return cls(user_id, claims, user)
+
+    def _load(self):
+        if self._user is None:
+            user = _get_row(self.pk)
+            _check_active(user.is_active)
+            object.__setattr__(self, '_user', user)
+        return self._user
+
+    async def aload(self):
+        """Async twin of `_load()` for async views, which must not touch the ORM synchronously."""
+        if self._user is None:
+            user = await _aget_row(self.pk)
+            _check_active(user.is_active)
+            object.__setattr__(self, '_user', user)
+        return self._user
+
+    def __getattr__(self, name):
+        # Only reached for attributes the token did not provide.
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+        if name in self.__dict__:
+            object.__setattr__(self, name, value)
+
+    def __eq__(self, other):
+        return getattr(other, 'pk', None) == self.pk and isinstance(other, (LazyUser, User))
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return str(self._load())
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that does not fetch the user row per request: the user's
+    claims (USER_CLAIMS) come from the default cache and are read from the
+    database at most once per AUTH_USER_CACHE_TTL seconds. Saving a user drops
+    the entry, so deactivation and role changes apply on the next request.
+    Tokens issued before the claims existed are checked the simplejwt way.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        user_id = User._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        note_user(user_id)  # before anything reads, so a recent writer reads from the primary
+        return LazyUser.from_token(user_id, validated_token)
+
+    async def aauthenticate(self, request):
+        """
+        `authenticate()` for async views. Token checks are pure CPU and the claims
+        usually come from the cache; a miss reads the row with an async query.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            return await sync_to_async(super().get_user)(validated_token), validated_token
+        user_id = User._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        await anote_user(user_id)
+        return await LazyUser.afrom_token(user_id, validated_token), validated_token
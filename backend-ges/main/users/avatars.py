@@ -0,0 +1,130 @@
+# users/avatars.py
+"""
+Avatar processing.
+
+An upload is decoded once, rotated per its EXIF orientation, and re-encoded
+into square renditions of AVATAR_SIZES pixels in each of AVATAR_FORMATS.
+Re-encoding from pixels drops EXIF/GPS/ICC metadata. Files are stored under
+the SHA-256 of the upload (see `user_avatar_path`). Identical uploads share
+files, and a stored file never changes, so it can be cached forever.
+`User.avatar` points at the largest JPEG; the other renditions sit next to it.
+"""
+import hashlib
+import re
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .models import user_avatar_path
+
+DEFAULT_SIZES = (64, 128, 256)
+DEFAULT_FORMATS = ('webp', 'jpg')
+ENCODERS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+STORED_NAME = re.compile(r'^avatars/[0-9a-f]{2}/(?P<digest>[0-9a-f]{64})/\d+\.\w+$')
+
+
+class AvatarError(ValueError):
+    pass
+
+
+def avatar_sizes():
+    return tuple(sorted(getattr(settings, 'AVATAR_SIZES', DEFAULT_SIZES), reverse=True))
+
+
+def avatar_formats():
+    return tuple(getattr(settings, 'AVATAR_FORMATS', DEFAULT_FORMATS))
+
+
+def _primary_format():
+    formats = avatar_formats()
+    return 'jpg' if 'jpg' in formats else formats[0]
+
+
+class ProcessedAvatar:
+    """Encoded renditions of one upload, ready for `store()`."""
+
+    def __init__(self, digest, files):
+        self.digest = digest
+        self.files = files  # {(size, ext): bytes}
+
+    @property
+    def name(self):
+        return user_avatar_path(self.digest, max(size for size, _ in self.files), _primary_format())
+
+    def store(self, storage=default_storage):
+        """Writes renditions that are not stored yet and returns the name for `User.avatar`."""
+        for (size, ext), data in self.files.items():
+            path = user_avatar_path(self.digest, size, ext)
+            if not storage.exists(path):
+                storage.save(path, ContentFile(data))
+        return self.name
+
+
+def _open(data):
+    max_pixels = getattr(settings, 'AVATAR_MAX_PIXELS', 25_000_000)
+    try:
+        image = Image.open(BytesIO(data))
+        # Check the header's size before decoding anything, so an image bomb costs nothing.
+        if image.width * image.height > max_pixels:
+            raise AvatarError("Avatar image dimensions are too large.")
+        # JPEGs can be decoded at 1/2, 1/4 or 1/8 scale, which is much faster than full size.
+        image.draft('RGB', (avatar_sizes()[0],) * 2)
+        image.load()
+    except AvatarError:
+        raise
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        raise AvatarError("Upload a valid image.") from e
+    return ImageOps.exif_transpose(image)
+
+
+def _flatten(image):
+    """RGBA -> RGB on white, for formats without transparency."""
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def process_avatar(fileobj):
+    """Decodes and resizes an uploaded image; raises AvatarError if it is not a usable image."""
+    fileobj.seek(0)
+    data = fileobj.read()
+    digest = hashlib.sha256(data).hexdigest()
+    image = _open(data)
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    files = {}
+    # Largest first; each smaller size is scaled down from the previous one.
+    for size in avatar_sizes():
+        image = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        opaque = _flatten(image) if has_alpha else image
+        for ext in avatar_formats():
+            image_format, options = ENCODERS[ext]
+            out = BytesIO()
+            (image if image_format == 'WEBP' else opaque).save(out, image_format, **options)
+            files[size, ext] = out.getvalue()
+    return ProcessedAvatar(digest, files)
+
+
+def rendition_names(name):
+    """{size: {ext: name}} for a stored avatar; files saved before the pipeline only have themselves."""
+    match = STORED_NAME.match(name or '')
+    if match is None:
+        return {}
+    digest = match.group('digest')
+    return {size: {ext: user_avatar_path(digest, size, ext) for ext in avatar_formats()} for size in avatar_sizes()}
+
+
+def thumbnail_name(name):
+    """The AVATAR_THUMBNAIL_SIZE JPEG rendition of a stored avatar (or the file itself for old uploads)."""
+    renditions = rendition_names(name)
+    size = getattr(settings, 'AVATAR_THUMBNAIL_SIZE', 128)
+    if size in renditions:
+        return renditions[size][_primary_format()]
+    return name
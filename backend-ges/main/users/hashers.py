@@ -0,0 +1,15 @@
+# users/hashers.py
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 whose work factor comes from PASSWORD_HASH_ITERATIONS.
+
+    It keeps the `pbkdf2_sha256` algorithm name, so existing hashes verify as
+    before and are rehashed on the next successful login whenever the setting
+    changes (see users.passwords.verify_password).
+    """
+
+    def __init__(self):
+        self.iterations = getattr(settings, 'PASSWORD_HASH_ITERATIONS', PBKDF2PasswordHasher.iterations)
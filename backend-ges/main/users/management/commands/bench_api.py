@@ -0,0 +1,240 @@
+# users/management/commands/bench_api.py
+import http.client
+import io
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from programs.models import Program, Subject
+from students.models import Student
+from teachers.models import Teacher
+from users.models import User
+from users.tokens import ClaimsRefreshToken
+from .bench_asgi import percentile
+from .seed_university import SEED_DOMAIN, SEED_PREFIX
+
+ACCOUNTS = 50  # seeded students and teachers the requests rotate through
+
+
+class InProcessTransport:
+    """Calls the WSGI application directly: the full middleware and URL stack, no sockets."""
+
+    def __init__(self):
+        self.handler = WSGIHandler()
+        self.host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost'
+
+    def request(self, method, path, body, headers):
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': method, 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+            'SERVER_NAME': self.host, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1', 'HTTP_HOST': self.host,
+            'REMOTE_ADDR': '127.0.0.1', 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr, 'CONTENT_LENGTH': str(len(body)),
+            **{'HTTP_' + name.upper().replace('-', '_'): value for name, value in headers.items()},
+        }
+        if 'Content-Type' in headers:
+            environ['CONTENT_TYPE'] = headers['Content-Type']
+        status = []
+        response = self.handler(environ, lambda code, response_headers, exc_info=None: status.append(int(code[:3])))
+        try:
+            for _ in response:
+                pass
+        finally:
+            response.close()  # fires request_finished, as a real server would
+        return status[0]
+
+
+class HTTPTransport:
+    """Talks to a running server over one keep-alive connection per thread."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.local = threading.local()
+
+    def request(self, method, path, body, headers):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = self.connection_class(self.netloc, timeout=30)
+        try:
+            conn.request(method, self.prefix + path, body=body or None, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self.local.conn = None
+            return 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the real API routes against data from seed_university: logins, profile, "
+        "catalog, class lists, \"my term\", timetables and rankings. Each scenario runs "
+        "--requests times with --concurrency in flight, either in this process (default) or "
+        "against a running server (--base-url). Reports throughput and latency percentiles; "
+        "--output writes them as JSON (with the git commit) and --compare diffs against an "
+        "earlier file. Use a database that several threads can share (not SQLite :memory:)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help="Timed requests per scenario.")
+        parser.add_argument('--concurrency', type=int, default=8, help="Requests in flight.")
+        parser.add_argument('--warmup', type=int, default=20, help="Untimed requests per scenario first.")
+        parser.add_argument('--scenarios', default='', help="Comma-separated scenario names (default: all).")
+        parser.add_argument('--base-url', default='', help="e.g. http://127.0.0.1:8000; default is in-process.")
+        parser.add_argument('--password', default='bench-password', help="Password given to seed_university.")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help="Write the JSON report to this file.")
+        parser.add_argument('--compare', help="Earlier JSON report to compare against.")
+        parser.add_argument('--json', action='store_true', help="Print the JSON report.")
+
+    def accounts(self):
+        students = list(
+            Student.objects.filter(user__email__endswith=f'@{SEED_DOMAIN}')
+            .values_list('pk', 'user_id', 'user__student_id', 'user__program_id')[:ACCOUNTS]
+        )
+        teachers = list(
+            Teacher.objects.filter(user__email__endswith=f'@{SEED_DOMAIN}').values_list('user_id', 'user__email')[:ACCOUNTS]
+        )
+        if not students or not teachers:
+            raise CommandError("No seeded accounts found; run `manage.py seed_university` first.")
+        return students, teachers
+
+    def scenarios(self, password):
+        students, teachers = self.accounts()
+        users = User.objects.in_bulk([row[1] for row in students] + [row[0] for row in teachers])
+        student_tokens = [str(ClaimsRefreshToken.for_user(users[user_id]).access_token) for _, user_id, _, _ in students]
+        teacher_tokens = [str(ClaimsRefreshToken.for_user(users[user_id]).access_token) for user_id, _ in teachers]
+        program_ids = sorted({program_id for *_, program_id in students})
+        subject_ids = list(Subject.objects.filter(program_id__in=program_ids).values_list('pk', flat=True)[:200])
+        rng = self.random
+
+        def as_student():
+            return {'Authorization': f'Bearer {rng.choice(student_tokens)}'}
+
+        def as_teacher():
+            return {'Authorization': f'Bearer {rng.choice(teacher_tokens)}'}
+
+        def login_student():
+            _, _, student_id, _ = rng.choice(students)
+            return json.dumps({'student_id': student_id, 'password': password}).encode()
+
+        def login_teacher():
+            _, email = rng.choice(teachers)
+            return json.dumps({'email': email, 'password': password}).encode()
+
+        # name -> (method, path factory, body factory, headers factory)
+        return {
+            'student_login': ('POST', lambda: '/api/students/login/', login_student, dict),
+            'teacher_login': ('POST', lambda: '/api/teachers/login/', login_teacher, dict),
+            'profile': ('GET', lambda: '/api/users/me/', bytes, as_student),
+            'programs': ('GET', lambda: '/api/programs/programs/', bytes, as_teacher),
+            'subjects': ('GET', lambda: '/api/programs/subjects/', bytes, as_teacher),
+            'schedules': ('GET', lambda: f'/api/programs/schedules/?subject_id={rng.choice(subject_ids)}', bytes, as_teacher),
+            'class_list': ('GET', lambda: f'/api/students/programs/{rng.choice(program_ids)}/students/?page_size=50',
+                           bytes, as_teacher),
+            'my_term': ('GET', lambda: '/api/students/me/term/', bytes, as_student),
+            'timetable': ('GET', lambda: '/api/programs/timetables/me/', bytes, as_student),
+            'rankings': ('GET', lambda: f'/api/grades/rankings/?subject_id={rng.choice(subject_ids)}', bytes, as_teacher),
+        }
+
+    def run(self, transport, name, scenario, count, warmup, concurrency):
+        method, make_path, make_body, make_headers = scenario
+
+        def one(_):
+            headers = make_headers()
+            body = make_body()
+            if body:
+                headers['Content-Type'] = 'application/json'
+            started = time.perf_counter()
+            status = transport.request(method, make_path(), body, headers)
+            return time.perf_counter() - started, status
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(warmup)))
+            started = time.perf_counter()
+            results = list(pool.map(one, range(count)))
+            elapsed = time.perf_counter() - started
+        latencies = sorted(seconds for seconds, _ in results)
+        return {
+            'scenario': name,
+            'method': method,
+            'requests': count,
+            'errors': sum(1 for _, status in results if not 200 <= status < 400),
+            'rps': round(count / elapsed, 1),
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+            **{f'p{q}_ms': round(percentile(latencies, q / 100) * 1000, 2) for q in (50, 90, 95, 99)},
+            'max_ms': round(latencies[-1] * 1000, 2),
+        }
+
+    def commit(self):
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                  cwd=settings.BASE_DIR, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        scenarios = self.scenarios(options['password'])
+        selected = [name for name in options['scenarios'].split(',') if name] or list(scenarios)
+        unknown = set(selected) - set(scenarios)
+        if unknown:
+            raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}. Known: {', '.join(scenarios)}")
+        transport = HTTPTransport(options['base_url']) if options['base_url'] else InProcessTransport()
+
+        results = []
+        for name in selected:
+            results.append(self.run(transport, name, scenarios[name], options['requests'], options['warmup'],
+                                    options['concurrency']))
+            if not options['json']:
+                self.print_row(results[-1])
+
+        report = {
+            'commit': self.commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'target': options['base_url'] or 'in-process',
+            'database': connection.vendor,
+            'concurrency': options['concurrency'],
+            'programs': Program.objects.filter(code__startswith=SEED_PREFIX).count(),
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        if options['compare']:
+            with open(options['compare']) as f:
+                self.print_comparison(json.load(f), report)
+
+    def print_row(self, row):
+        self.stdout.write(
+            f"{row['scenario']:<14} {row['rps']:>8} req/s  p50 {row['p50_ms']:>8} ms  p95 {row['p95_ms']:>8} ms  "
+            f"p99 {row['p99_ms']:>8} ms  errors {row['errors']}"
+        )
+
+    def print_comparison(self, before, after):
+        previous = {row['scenario']: row for row in before['results']}
+        self.stdout.write(f"\nvs {before.get('commit') or before.get('timestamp')}:")
+        for row in after['results']:
+            old = previous.get(row['scenario'])
+            if old is None:
+                continue
+            rps = (row['rps'] - old['rps']) / old['rps'] * 100 if old['rps'] else 0.0
+            p95 = (row['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100 if old['p95_ms'] else 0.0
+            self.stdout.write(f"{row['scenario']:<14} throughput {rps:+7.1f}%   p95 latency {p95:+7.1f}%")
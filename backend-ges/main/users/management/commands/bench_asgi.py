@@ -0,0 +1,181 @@
+# users/management/commands/bench_asgi.py
+import asyncio
+import io
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from programs.models import Program, Subject
+from students.models import Student
+from users.models import User
+from users.tokens import ClaimsRefreshToken
+
+BENCH_DOMAIN = 'bench-asgi.invalid'
+BENCH_PREFIX = 'BENCHASGI-'
+
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drives the read endpoints through the WSGI handler (a thread pool, like a threaded "
+        "worker) and through main.asgi (one event loop, like a uvicorn worker) in this process, "
+        "and reports requests/sec and latency percentiles for each. Use a database that "
+        "several threads can share (not SQLite :memory:). Against a local database the "
+        "numbers mostly reflect per-request framework overhead; run it against the "
+        "production database host to see the effect of waiting on the network."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help="Requests per endpoint per server.")
+        parser.add_argument('--concurrency', type=int, default=50,
+                            help="Requests in flight: WSGI threads, or concurrent ASGI tasks.")
+        parser.add_argument('--students', type=int, default=300)
+        parser.add_argument('--subjects', type=int, default=100)
+        parser.add_argument('--keep', action='store_true', help="Keep the seeded rows afterwards.")
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def seed(self, students, subjects):
+        program = Program.objects.create(code=f'{BENCH_PREFIX}PROGRAM', name='Benchmark')
+        Subject.objects.bulk_create([
+            Subject(program=program, course_code=f'{BENCH_PREFIX}S{i}', title=f'Subject {i}', credits=3)
+            for i in range(subjects)
+        ])
+        User.objects.bulk_create([
+            User(email=f's{i}@{BENCH_DOMAIN}', username=f'{BENCH_PREFIX}s{i}', first_name='Bench', last_name=str(i),
+                 role='student', student_id=f'{BENCH_PREFIX}{i}', program=program)
+            for i in range(students)
+        ])
+        # bulk_create skips the profile signal; re-read the users since MySQL does not return new pks.
+        Student.objects.bulk_create([
+            Student(user=user) for user in User.objects.filter(email__endswith=f'@{BENCH_DOMAIN}', role='student')
+        ])
+        teacher = User.objects.create_user(
+            email=f'teacher@{BENCH_DOMAIN}', password=None, username=f'{BENCH_PREFIX}teacher',
+            first_name='Bench', last_name='Teacher', role='teacher',
+        )
+        return program, teacher
+
+    def cleanup(self):
+        Program.objects.filter(code__startswith=BENCH_PREFIX).delete()
+        User.objects.filter(email__endswith=f'@{BENCH_DOMAIN}').delete()
+
+    def summarize(self, server, path, latencies, statuses, elapsed):
+        latencies.sort()
+        return {
+            'server': server,
+            'path': path,
+            'requests': len(latencies),
+            'errors': sum(1 for code in statuses if code != 200),
+            'rps': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        }
+
+    def run_wsgi(self, path, headers, count, concurrency):
+        handler = WSGIHandler()
+        host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost'
+
+        def one():
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+                'SERVER_NAME': host, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1', 'HTTP_HOST': host,
+                'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(b''), 'wsgi.errors': sys.stderr,
+                **{'HTTP_' + name.upper().replace('-', '_'): value for name, value in headers.items()},
+            }
+            status = []
+            started = time.perf_counter()
+            response = handler(environ, lambda code, response_headers, exc_info=None: status.append(int(code[:3])))
+            try:
+                for _ in response:
+                    pass
+            finally:
+                response.close()  # fires request_finished, as a real server would
+            return time.perf_counter() - started, status[0]
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda _: one(), range(count)))
+        elapsed = time.perf_counter() - started
+        return self.summarize('wsgi', path, [r[0] for r in results], [r[1] for r in results], elapsed)
+
+    async def run_asgi(self, application, path, headers, count, concurrency):
+        host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost'
+        scope_headers = [(b'host', host.encode())] + [(k.lower().encode(), v.encode()) for k, v in headers.items()]
+        gate = asyncio.Semaphore(concurrency)
+        latencies, statuses = [], []
+
+        async def one():
+            async with gate:
+                scope = {
+                    'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                    'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+                    'root_path': '', 'headers': scope_headers, 'client': ('127.0.0.1', 0), 'server': (host, 80),
+                }
+                finished = asyncio.Event()
+                sent_body = False
+                status = []
+
+                async def receive():
+                    nonlocal sent_body
+                    if not sent_body:
+                        sent_body = True
+                        return {'type': 'http.request', 'body': b'', 'more_body': False}
+                    await finished.wait()
+                    return {'type': 'http.disconnect'}
+
+                async def send(message):
+                    if message['type'] == 'http.response.start':
+                        status.append(message['status'])
+                    elif message['type'] == 'http.response.body' and not message.get('more_body'):
+                        finished.set()
+
+                started = time.perf_counter()
+                await application(scope, receive, send)
+                latencies.append(time.perf_counter() - started)
+                statuses.append(status[0])
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(count)))
+        elapsed = time.perf_counter() - started
+        return self.summarize('asgi', path, latencies, statuses, elapsed)
+
+    def handle(self, *args, **options):
+        from main.asgi import application
+
+        with transaction.atomic():
+            program, teacher = self.seed(options['students'], options['subjects'])
+        headers = {'Authorization': f'Bearer {ClaimsRefreshToken.for_user(teacher).access_token}'}
+        paths = [
+            '/api/programs/programs/',
+            '/api/programs/subjects/',
+            '/api/users/me/',
+            f'/api/students/programs/{program.pk}/students/',
+        ]
+        count, concurrency = options['requests'], options['concurrency']
+        results = []
+        try:
+            for path in paths:
+                results.append(self.run_wsgi(path, headers, count, concurrency))
+                results.append(asyncio.run(self.run_asgi(application, path, headers, count, concurrency)))
+        finally:
+            if not options['keep']:
+                self.cleanup()
+
+        if options['json']:
+            self.stdout.write(json.dumps({'concurrency': concurrency, 'results': results}, indent=2))
+            return
+        self.stdout.write(f"{count} requests per endpoint, {concurrency} in flight")
+        for row in results:
+            self.stdout.write(
+                f"{row['server']:<5} {row['path']:<48} {row['rps']:>8} req/s  "
+                f"p50 {row['p50_ms']:>7} ms  p99 {row['p99_ms']:>7} ms  errors {row['errors']}"
+            )
@@ -0,0 +1,142 @@
+# users/management/commands/bench_connections.py
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.backends.signals import connection_created
+from django.db.utils import ConnectionHandler
+
+from main.db.pool import MODES, connection_settings, get_pool, reset_pools
+from .bench_asgi import percentile
+
+POOLED_ENGINES = {
+    'django.db.backends.mysql': 'main.db.mysql',
+    'django.db.backends.sqlite3': 'main.db.sqlite3',
+    'main.db.mysql': 'main.db.mysql',
+    'main.db.sqlite3': 'main.db.sqlite3',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Times short requests (connection handling plus one query, the way Django's "
+        "request_started/request_finished handlers see them) under each DB_CONNECTIONS mode: "
+        "per-request connects for every request, persistent keeps one connection per "
+        "thread, pool shares a bounded set of connections. Reports latency and how many "
+        "physical connections each mode opened. Run it against the real database host; "
+        "connecting to a local SQLite file is cheap, so the difference there is small."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help="Requests per mode.")
+        parser.add_argument('--concurrency', type=int, default=8, help="Threads issuing requests.")
+        parser.add_argument('--pool-size', type=int, default=None, help="Pool size (default: DB_POOL MAX_SIZE).")
+        parser.add_argument('--database', default='default', help="DATABASES entry to connect to.")
+        parser.add_argument('--query', default='SELECT 1', help="SQL each request runs.")
+        parser.add_argument('--modes', default='per-request,persistent,pool', help="Comma-separated modes to run.")
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def database(self, alias):
+        try:
+            base = dict(settings.DATABASES[alias])
+        except KeyError:
+            raise CommandError(f"No database {alias!r} in DATABASES.")
+        engine = POOLED_ENGINES.get(base['ENGINE'])
+        if engine is None:
+            raise CommandError(f"No pooled backend for {base['ENGINE']}.")
+        if 'sqlite3' in engine and str(base['NAME']).startswith((':memory:', 'file::memory:')):
+            raise CommandError("An in-memory SQLite database is never closed; use a file (DB_ENGINE=sqlite).")
+        base['ENGINE'] = engine
+        return base
+
+    def run(self, base, mode, count, concurrency, pool_size, query):
+        pool = dict(getattr(settings, 'DB_POOL', {}))
+        if pool_size:
+            pool['MAX_SIZE'] = pool_size
+        alias = f'bench-{mode}'
+        # A separate handler, so the benchmark's connections never mix with the command's own.
+        handler = ConnectionHandler({
+            'default': {'ENGINE': 'django.db.backends.dummy'},
+            alias: {**base, **connection_settings(mode, 600, pool)},
+        })
+        connects = []
+        lock = threading.Lock()
+
+        def on_connect(sender, connection, **kwargs):
+            if connection.alias == alias:
+                with lock:
+                    connects.append(1)
+
+        def worker(share, samples):
+            conn = handler[alias]
+            try:
+                for _ in range(share):
+                    started = time.perf_counter()
+                    conn.close_if_unusable_or_obsolete()  # request_started
+                    with conn.cursor() as cursor:
+                        cursor.execute(query)
+                        cursor.fetchall()
+                    conn.close_if_unusable_or_obsolete()  # request_finished
+                    samples.append(time.perf_counter() - started)
+            finally:
+                conn.close()
+
+        connection_created.connect(on_connect, weak=False)
+        try:
+            shares = [count // concurrency + (n < count % concurrency) for n in range(concurrency)]
+            samples = [[] for _ in shares]
+            threads = [threading.Thread(target=worker, args=(share, out)) for share, out in zip(shares, samples)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            pool_stats = get_pool(handler.settings[alias], alias).stats() if mode == 'pool' else None
+        finally:
+            connection_created.disconnect(on_connect)
+            reset_pools()
+
+        latencies = sorted(seconds for out in samples for seconds in out)
+        if len(latencies) != count:
+            raise CommandError(f"{count - len(latencies)} {mode} requests failed.")
+        return {
+            'mode': mode,
+            'requests': count,
+            'rps': round(count / elapsed, 1),
+            'mean_ms': round(sum(latencies) / count * 1000, 3),
+            **{f'p{q}_ms': round(percentile(latencies, q / 100) * 1000, 3) for q in (50, 95, 99)},
+            'connections_opened': pool_stats['opened'] if pool_stats else len(connects),
+        }
+
+    def handle(self, *args, **options):
+        modes = [mode for mode in options['modes'].split(',') if mode]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f"Unknown mode(s): {', '.join(sorted(unknown))}. Known: {', '.join(MODES)}")
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError("--requests and --concurrency must be positive.")
+        base = self.database(options['database'])
+        results = [
+            self.run(base, mode, options['requests'], options['concurrency'], options['pool_size'], options['query'])
+            for mode in modes
+        ]
+
+        if options['json']:
+            self.stdout.write(json.dumps({'engine': base['ENGINE'], 'concurrency': options['concurrency'],
+                                          'results': results}, indent=2))
+            return
+        for row in results:
+            self.stdout.write(
+                f"{row['mode']:<12} {row['rps']:>9} req/s  mean {row['mean_ms']:>7} ms  p95 {row['p95_ms']:>7} ms  "
+                f"p99 {row['p99_ms']:>7} ms  {row['connections_opened']} connections opened"
+            )
+        by_mode = {row['mode']: row for row in results}
+        baseline = by_mode.get('per-request')
+        for mode in ('persistent', 'pool'):
+            if baseline and mode in by_mode:
+                saved = baseline['mean_ms'] - by_mode[mode]['mean_ms']
+                self.stdout.write(f"{mode}: {saved:.3f} ms of connection overhead removed per request "
+                                  f"({saved / baseline['mean_ms'] * 100:.0f}% of the per-request mean)")
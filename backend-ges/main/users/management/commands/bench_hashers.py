@@ -0,0 +1,75 @@
+# users/management/commands/bench_hashers.py
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, get_hashers_by_algorithm
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Measures password verifications (logins) per second, in total and per core, for each hasher configuration."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', default='260000,600000,1000000',
+                            help="Comma-separated PBKDF2 iteration counts to try.")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Threads verifying concurrently (default: CPU count).")
+        parser.add_argument('--duration', type=float, default=3.0,
+                            help="Seconds to run each configuration.")
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def configurations(self, iterations):
+        for count in iterations:
+            hasher = PBKDF2PasswordHasher()
+            hasher.iterations = count
+            yield f"pbkdf2_sha256/{count}", hasher
+        available = get_hashers_by_algorithm()
+        for algorithm in ('argon2', 'bcrypt_sha256', 'scrypt'):
+            hasher = available.get(algorithm)
+            if hasher is None:
+                continue
+            try:
+                hasher._load_library()
+            except ValueError:
+                continue  # optional library not installed
+            yield algorithm, hasher
+
+    def measure(self, hasher, workers, duration):
+        encoded = hasher.encode('correct horse battery staple', hasher.salt())
+        deadline = time.perf_counter() + duration
+
+        def run():
+            done = 0
+            while time.perf_counter() < deadline:
+                hasher.verify('correct horse battery staple', encoded)
+                done += 1
+            return done
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            total = sum(pool.map(lambda _: run(), range(workers)))
+        elapsed = time.perf_counter() - started
+        return total / elapsed
+
+    def handle(self, *args, **options):
+        iterations = [int(value) for value in options['iterations'].split(',') if value]
+        workers = options['workers']
+        cores = min(workers, os.cpu_count() or 1)
+        results = []
+        for name, hasher in self.configurations(iterations):
+            rate = self.measure(hasher, workers, options['duration'])
+            results.append({
+                'hasher': name,
+                'workers': workers,
+                'logins_per_sec': round(rate, 2),
+                'logins_per_sec_per_core': round(rate / cores, 2),
+            })
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"{'hasher':<24}{'logins/s':>12}{'per core':>12}")
+        for row in results:
+            self.stdout.write(f"{row['hasher']:<24}{row['logins_per_sec']:>12}{row['logins_per_sec_per_core']:>12}")
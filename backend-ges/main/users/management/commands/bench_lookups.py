@@ -0,0 +1,127 @@
+# users/management/commands/bench_lookups.py
+import json
+import random
+import statistics
+import time
+from datetime import time as clock
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from programs.models import Program, Subject, Schedule
+from users.models import User
+
+BENCH_DOMAIN = 'bench.invalid'
+BENCH_PREFIX = 'BENCH-'
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds synthetic users and schedules, then times the login and schedule lookups "
+        "the API performs and prints each query plan, to confirm they use index seeks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500_000)
+        parser.add_argument('--subjects', type=int, default=500)
+        parser.add_argument('--lookups', type=int, default=2000, help="Timed lookups per query shape.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--keep', action='store_true', help="Keep the seeded rows afterwards.")
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def seed(self, users, subjects, batch_size):
+        password = make_password('bench-password')  # hashed once, shared by every seeded user
+        for start in range(0, users, batch_size):
+            User.objects.bulk_create([
+                User(
+                    email=f'u{i}@{BENCH_DOMAIN}', username=f'{BENCH_PREFIX}u{i}', first_name='Bench', last_name=str(i),
+                    role='student' if i % 20 else 'teacher', student_id=f'{BENCH_PREFIX}{i}' if i % 20 else None,
+                    password=password,
+                )
+                for i in range(start, min(start + batch_size, users))
+            ], batch_size=batch_size)
+
+        program = Program.objects.create(code=f'{BENCH_PREFIX}PROGRAM', name='Benchmark')
+        Subject.objects.bulk_create([
+            Subject(program=program, course_code=f'{BENCH_PREFIX}S{i}', title=f'Subject {i}', credits=3)
+            for i in range(subjects)
+        ])
+        schedules = []
+        for n, subject in enumerate(Subject.objects.filter(program=program)):
+            for k in range(2):
+                slot = n * 2 + k
+                schedules.append(Schedule(
+                    subject=subject, day=DAYS[slot % 5], start_time=clock(7 + (slot // 5) % 12),
+                    end_time=clock(8 + (slot // 5) % 12), room=f'{BENCH_PREFIX}R{slot // 60}',
+                ))
+        Schedule.objects.bulk_create(schedules, batch_size=batch_size)
+        return program
+
+    def cleanup(self):
+        Program.objects.filter(code__startswith=BENCH_PREFIX).delete()
+        User.objects.filter(email__endswith=f'@{BENCH_DOMAIN}').delete()
+
+    def time_lookups(self, name, make_query, count):
+        samples = []
+        for _ in range(count):
+            query = make_query()
+            started = time.perf_counter()
+            list(query)
+            samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        return {
+            'query': name,
+            'lookups': count,
+            'mean_ms': round(statistics.fmean(samples), 3),
+            'p50_ms': round(samples[len(samples) // 2], 3),
+            'p99_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 3),
+            'plan': make_query().explain(),
+        }
+
+    def handle(self, *args, **options):
+        users, lookups = options['users'], options['lookups']
+        started = time.perf_counter()
+        with transaction.atomic():
+            program = self.seed(users, options['subjects'], options['batch_size'])
+        seeded_in = time.perf_counter() - started
+
+        subject_ids = list(Subject.objects.filter(program=program).values_list('id', flat=True))
+        rooms = list(Schedule.objects.filter(subject__program=program).values_list('room', flat=True).distinct())
+        student_numbers = [i for i in range(users) if i % 20]
+        teacher_numbers = [i for i in range(users) if not i % 20]
+        try:
+            results = [
+                self.time_lookups(
+                    'student_login: User by student_id + role',
+                    lambda: User.objects.filter(student_id=f'{BENCH_PREFIX}{random.choice(student_numbers)}', role='student'),
+                    lookups,
+                ),
+                self.time_lookups(
+                    'teacher_login: User by email + role',
+                    lambda: User.objects.filter(email=f'u{random.choice(teacher_numbers)}@{BENCH_DOMAIN}', role='teacher'),
+                    lookups,
+                ),
+                self.time_lookups(
+                    'schedule list: Schedule by subject ordered by day, start_time',
+                    lambda: Schedule.objects.filter(subject_id=random.choice(subject_ids)).order_by('day', 'start_time'),
+                    lookups,
+                ),
+                self.time_lookups(
+                    'room availability: Schedule by room + day',
+                    lambda: Schedule.objects.filter(room=random.choice(rooms), day=random.choice(DAYS)).order_by('start_time'),
+                    lookups,
+                ),
+            ]
+        finally:
+            if not options['keep']:
+                self.cleanup()
+
+        if options['json']:
+            self.stdout.write(json.dumps({'users': users, 'seed_seconds': round(seeded_in, 2), 'results': results}, indent=2))
+            return
+        self.stdout.write(f"Seeded {users} users in {seeded_in:.1f}s")
+        for row in results:
+            self.stdout.write(f"\n{row['query']}\n  mean {row['mean_ms']} ms, p50 {row['p50_ms']} ms, p99 {row['p99_ms']} ms")
+            self.stdout.write('  plan: ' + row['plan'].replace('\n', '\n        '))
@@ -0,0 +1,147 @@
+# users/management/commands/bench_search.py
+import json
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+
+from programs.search import STUDENT, TEACHER, SearchIndex, program_document, subject_document, user_document
+from .bench_asgi import percentile
+from .seed_university import FIRST_NAMES, LAST_NAMES
+
+
+def typo(word, rng):
+    """`word` with two neighbouring letters swapped, as fast typing does."""
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds the search index (programs.search) over --users synthetic students and "
+        "teachers, or over this database with --from-database, then times autocomplete "
+        "queries: name prefixes as they are typed, full names, student IDs, emails, codes "
+        "and misspelt names. Reports build time, memory, incremental updates and "
+        "query latency percentiles per query type."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200_000, help="Synthetic accounts to index.")
+        parser.add_argument('--subjects', type=int, default=5_000, help="Synthetic subjects to index.")
+        parser.add_argument('--from-database', action='store_true', help="Index this database instead.")
+        parser.add_argument('--queries', type=int, default=500, help="Timed queries per query type.")
+        parser.add_argument('--limit', type=int, default=10, help="Results per query.")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def documents(self, users, subjects):
+        rng = random.Random(self.seed)
+        # The seeder's small name pool makes every name common: a worst case for prefixes.
+        for pk in range(1, users + 1):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            role = TEACHER if pk % 50 == 0 else STUDENT
+            email = f"{first}.{last}{pk}@example.edu".lower().replace(' ', '')
+            yield user_document(pk, role, first, None, last, email, f'2024-{pk:06d}' if role == STUDENT else None)
+        for pk in range(1, subjects + 1):
+            yield subject_document(pk, f'CS{pk:04d}', f'{rng.choice(LAST_NAMES)} Studies {pk}')
+        yield program_document(1, 'BSCS', 'Bachelor of Science in Computer Science')
+
+    def build(self, options):
+        tracemalloc.start()
+        started = time.perf_counter()
+        if options['from_database']:
+            index = SearchIndex.build()
+        else:
+            index = SearchIndex.from_documents(self.documents(options['users'], options['subjects']))
+        elapsed = time.perf_counter() - started
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        if not len(index):
+            raise CommandError("Nothing to index; seed the database or drop --from-database.")
+        return index, elapsed, memory
+
+    def samples(self, index):
+        """name -> query factory, drawn from what is actually indexed."""
+        rng = self.random
+        documents = list(index._documents.items())
+        people = [(key, entry) for key, entry in documents if key[0] in (STUDENT, TEACHER)] or documents
+        subjects = [(key, entry) for key, entry in documents if key[0] not in (STUDENT, TEACHER)] or documents
+
+        def label():
+            return rng.choice(people)[1][0]
+
+        return {
+            'prefix_2': lambda: label()[:2],
+            'prefix_4': lambda: label()[:4],
+            'full_name': label,
+            'first_last_prefix': lambda: ' '.join(part[:3] for part in label().split()[::2]),
+            'typo': lambda: ' '.join(typo(part, rng) for part in label().split()),
+            'student_id': lambda: rng.choice(people)[1][1][:9],
+            'code': lambda: rng.choice(subjects)[1][1],
+        }
+
+    def updates(self, index, count):
+        """Median milliseconds to rename a random account, as the post_save signal does."""
+        people = [key for key in index._documents if key[0] in (STUDENT, TEACHER)]
+        latencies = []
+        for key in self.random.sample(people, min(count, len(people))):
+            label, detail, *_ = index._documents[key]
+            first, *rest = label.split()
+            document = user_document(key[1], key[0], first + 'a', None, ' '.join(rest), detail, None)
+            started = time.perf_counter()
+            index.save(document)
+            latencies.append(time.perf_counter() - started)
+        latencies.sort()
+        return round(percentile(latencies, 0.5) * 1000, 3)
+
+    def run(self, index, name, make_query, count, limit):
+        latencies, empty = [], 0
+        for _ in range(count):
+            query = make_query()
+            started = time.perf_counter()
+            results = index.search(query, limit=limit)
+            latencies.append(time.perf_counter() - started)
+            empty += not results
+        latencies.sort()
+        return {
+            'query': name,
+            'queries': count,
+            'empty': empty,
+            'mean_ms': round(sum(latencies) / count * 1000, 3),
+            **{f'p{q}_ms': round(percentile(latencies, q / 100) * 1000, 3) for q in (50, 95, 99)},
+            'max_ms': round(latencies[-1] * 1000, 3),
+        }
+
+    def handle(self, *args, **options):
+        if options['queries'] < 1 or options['limit'] < 1:
+            raise CommandError("--queries and --limit must be positive.")
+        self.seed = options['seed']
+        self.random = random.Random(options['seed'])
+        index, build_seconds, memory = self.build(options)
+
+        update_ms = self.updates(index, options['queries'])
+
+        results = [
+            self.run(index, name, make_query, options['queries'], options['limit'])
+            for name, make_query in self.samples(index).items()
+        ]
+        report = {
+            'documents': len(index),
+            'build_seconds': round(build_seconds, 2),
+            'memory_mb': round(memory / 1e6, 1),
+            'update_ms': round(update_ms, 3),
+            'results': results,
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(f"Indexed {report['documents']} documents in {report['build_seconds']}s "
+                          f"({report['memory_mb']} MB); an update takes {report['update_ms']} ms")
+        for row in results:
+            self.stdout.write(
+                f"{row['query']:<18} p50 {row['p50_ms']:>7} ms  p95 {row['p95_ms']:>7} ms  p99 {row['p99_ms']:>7} ms  "
+                f"max {row['max_ms']:>7} ms  {row['empty']} with no results"
+            )
@@ -0,0 +1,36 @@
+# users/management/commands/process_avatars.py
+from django.core.management.base import BaseCommand
+
+from users.avatars import AvatarError, process_avatar, rendition_names
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs avatars uploaded before the rendition pipeline through it, storing the "
+        "thumbnails and pointing each user at them. The original files are left in place."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only list the avatars that would be processed.")
+
+    def handle(self, *args, **options):
+        storage = User._meta.get_field('avatar').storage
+        processed = failed = 0
+        users = User.objects.exclude(avatar='').exclude(avatar__isnull=True).only('pk', 'avatar')
+        for user in users.iterator(chunk_size=500):
+            if rendition_names(user.avatar.name):
+                continue
+            if options['dry_run']:
+                self.stdout.write(user.avatar.name)
+                continue
+            try:
+                with storage.open(user.avatar.name, 'rb') as f:
+                    name = process_avatar(f).store(storage)
+            except (OSError, AvatarError) as e:
+                failed += 1
+                self.stderr.write(f"{user.avatar.name}: {e}")
+                continue
+            User.objects.filter(pk=user.pk).update(avatar=name)
+            processed += 1
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} avatar(s), {failed} failed"))
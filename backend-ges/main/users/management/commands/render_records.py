@@ -0,0 +1,40 @@
+# users/management/commands/render_records.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from programs.models import Program
+from students.records import FORMATS, KINDS, TRANSCRIPT, render_program_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Renders the transcripts or report cards of every student in a program that are "
+        "not stored yet, across a process pool (see students.records), so term-end "
+        "downloads are served from storage. Records whose data has not changed are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('program', help="Program id or code.")
+        parser.add_argument('--kind', choices=list(KINDS), default=TRANSCRIPT)
+        parser.add_argument('--output', choices=list(FORMATS), default='pdf')
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Rendering processes (default: RECORDS_BATCH_WORKERS, or one per CPU).")
+
+    def handle(self, *args, **options):
+        lookup = Q(code=options['program'])
+        if options['program'].isdigit():
+            lookup |= Q(pk=int(options['program']))
+        program = Program.objects.filter(lookup).first()
+        if program is None:
+            raise CommandError(f"No program {options['program']!r}.")
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError("--workers must be positive.")
+        started = time.perf_counter()
+        counts = render_program_records(program.pk, options['kind'], options['output'], options['workers'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{program.code}: {counts['rendered']} rendered, {counts['stored']} already stored "
+            f"({counts['students']} students) in {elapsed:.1f}s"
+        ))
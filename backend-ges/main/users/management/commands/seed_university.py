@@ -0,0 +1,179 @@
+# users/management/commands/seed_university.py
+import random
+import time
+from datetime import time as clock
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from grades.engine import compute_final_grades
+from grades.models import GradeComponent, GradeEntry, PERIOD_CHOICES
+from programs.conflicts import reset_schedule_index
+from programs.models import Program, Subject, Schedule
+from programs.search import reset_search_index
+from students.models import Student
+from teachers.models import Teacher
+from users.models import User
+
+SEED_DOMAIN = 'seed.invalid'
+SEED_PREFIX = 'SEED-'
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+FIRST_HOUR, LAST_HOUR = 7, 19
+SLOTS_PER_WEEK = len(DAYS) * (LAST_HOUR - FIRST_HOUR + 1)
+FIRST_NAMES = ['Maria', 'Jose', 'Ana', 'Juan', 'Angel', 'Mark', 'Grace', 'John', 'Joy', 'Paul', 'Rose', 'Carlo',
+               'Bea', 'Miguel', 'Liza', 'Noel', 'Kim', 'Rico', 'Mae', 'Leo']
+LAST_NAMES = ['Santos', 'Reyes', 'Cruz', 'Bautista', 'Garcia', 'Mendoza', 'Torres', 'Flores', 'Ramos', 'Aquino',
+              'Castillo', 'Villanueva', 'Rivera', 'Gonzales', 'Navarro', 'Dela Cruz']
+DEPARTMENTS = ['Computing', 'Engineering', 'Business', 'Education', 'Arts and Sciences']
+COMPONENTS = [('Quizzes', Decimal(30)), ('Exams', Decimal(50)), ('Project', Decimal(20))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a synthetic university with bulk inserts: programs, subjects with clash-free "
+        "weekly schedules, students and teachers (sharing one password), enrollments, "
+        "teaching assignments, grade components, grade entries and final grades. Seeded "
+        "rows are marked with SEED- codes and @seed.invalid emails, and --clear removes them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--programs', type=int, default=10)
+        parser.add_argument('--subjects', type=int, default=40, help=f"Subjects per program (at most {SLOTS_PER_WEEK}).")
+        parser.add_argument('--students', type=int, default=5000)
+        parser.add_argument('--teachers', type=int, default=200)
+        parser.add_argument('--enrollments', type=int, default=6, help="Subjects per student.")
+        parser.add_argument('--no-grades', action='store_true', help="Skip grade components, entries and final grades.")
+        parser.add_argument('--password', default='bench-password', help="Password of every seeded account.")
+        parser.add_argument('--seed', type=int, default=1, help="Random seed, for repeatable data.")
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--clear', action='store_true', help="Delete previously seeded rows first (or only, with --programs 0).")
+
+    def handle(self, *args, **options):
+        if options['subjects'] > SLOTS_PER_WEEK:
+            raise CommandError(f"--subjects must be at most {SLOTS_PER_WEEK} so a program's classes never clash.")
+        if options['programs'] and options['teachers'] < options['programs']:
+            raise CommandError("--teachers must be at least --programs.")
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        if options['clear']:
+            self.clear()
+        if not options['programs']:
+            return
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            counts = self.seed(options)
+        reset_schedule_index()  # bulk inserts bypass the index signals
+        reset_search_index()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded in {elapsed:.1f}s: " + ", ".join(f"{count} {name}" for name, count in counts.items())
+        ))
+
+    def clear(self):
+        Program.objects.filter(code__startswith=SEED_PREFIX).delete()
+        User.objects.filter(email__endswith=f'@{SEED_DOMAIN}').delete()
+        reset_schedule_index()
+        reset_search_index()
+
+    def name(self):
+        return self.random.choice(FIRST_NAMES), self.random.choice(LAST_NAMES)
+
+    def seed(self, options):
+        Program.objects.bulk_create([
+            Program(code=f'{SEED_PREFIX}P{p}', name=f'Program {p}', department=DEPARTMENTS[p % len(DEPARTMENTS)])
+            for p in range(options['programs'])
+        ])
+        # Re-read rather than trusting bulk_create pks, which MySQL does not return.
+        programs = list(Program.objects.filter(code__startswith=SEED_PREFIX).order_by('id'))
+        Subject.objects.bulk_create([
+            Subject(program=program, course_code=f'{SEED_PREFIX}{p}-{n}', title=f'Subject {n} of {program.name}',
+                    credits=self.random.choice((2, 3, 3, 4)))
+            for p, program in enumerate(programs) for n in range(options['subjects'])
+        ], batch_size=self.batch_size)
+        subjects = {}  # program pk -> subjects in course order
+        for subject in Subject.objects.filter(program__in=programs).order_by('id'):
+            subjects.setdefault(subject.program_id, []).append(subject)
+
+        # Slot n of a program is (day n % 5, hour 7 + n // 5) in a room of that program
+        # and column, so no two classes of a program, and no two rooms, ever overlap.
+        Schedule.objects.bulk_create([
+            Schedule(subject=subject, day=DAYS[n % len(DAYS)], start_time=clock(FIRST_HOUR + n // len(DAYS)),
+                     end_time=clock(FIRST_HOUR + n // len(DAYS) + 1), room=f'{SEED_PREFIX}R{p}-{n % len(DAYS)}')
+            for p, program in enumerate(programs) for n, subject in enumerate(subjects[program.pk])
+        ], batch_size=self.batch_size)
+
+        password = make_password(options['password'])  # hashed once, shared by every seeded account
+        users = [
+            User(email=f's{i}@{SEED_DOMAIN}', username=f'{SEED_PREFIX}s{i}', first_name=first, last_name=last,
+                 role='student', student_id=f'{SEED_PREFIX}{i:06}', program=programs[i % len(programs)], password=password)
+            for i, (first, last) in ((i, self.name()) for i in range(options['students']))
+        ] + [
+            User(email=f't{i}@{SEED_DOMAIN}', username=f'{SEED_PREFIX}t{i}', first_name=first, last_name=last,
+                 role='teacher', program=programs[i % len(programs)], password=password)
+            for i, (first, last) in ((i, self.name()) for i in range(options['teachers']))
+        ]
+        User.objects.bulk_create(users, batch_size=self.batch_size)
+        seeded = User.objects.filter(email__endswith=f'@{SEED_DOMAIN}')
+        # bulk_create skips the profile signals.
+        Student.objects.bulk_create(
+            [Student(user_id=pk) for pk in seeded.filter(role='student').values_list('pk', flat=True)],
+            batch_size=self.batch_size)
+        Teacher.objects.bulk_create(
+            [Teacher(user_id=pk, teacher_id=f'{SEED_PREFIX}{pk}') for pk in seeded.filter(role='teacher').values_list('pk', flat=True)],
+            batch_size=self.batch_size)
+
+        teachers_by_program = {}
+        for teacher_pk, program_id in Teacher.objects.filter(user__in=seeded).values_list('pk', 'user__program_id').order_by('pk'):
+            teachers_by_program.setdefault(program_id, []).append(teacher_pk)
+        Assignment = Teacher.assigned_subjects.through
+        # A teacher only teaches within their program, where slots never clash.
+        Assignment.objects.bulk_create([
+            Assignment(teacher_id=teachers[n % len(teachers)], subject_id=subject.pk)
+            for program_id, teachers in teachers_by_program.items() for n, subject in enumerate(subjects[program_id])
+        ], batch_size=self.batch_size)
+
+        Enrollment = Student.enrolled_subjects.through
+        enrollments = []
+        per_student = min(options['enrollments'], options['subjects'])
+        for student_pk, program_id in Student.objects.filter(user__in=seeded).values_list('pk', 'user__program_id'):
+            for subject in self.random.sample(subjects[program_id], per_student):
+                enrollments.append(Enrollment(student_id=student_pk, subject_id=subject.pk))
+        Enrollment.objects.bulk_create(enrollments, batch_size=self.batch_size)
+
+        counts = {
+            'programs': len(programs), 'subjects': sum(len(s) for s in subjects.values()),
+            'students': options['students'], 'teachers': options['teachers'], 'enrollments': len(enrollments),
+        }
+        if not options['no_grades']:
+            counts.update(self.seed_grades(programs, enrollments))
+        return counts
+
+    def seed_grades(self, programs, enrollments):
+        GradeComponent.objects.bulk_create([
+            GradeComponent(subject_id=subject_id, name=name, weight=weight)
+            for subject_id in Subject.objects.filter(program__in=programs).values_list('pk', flat=True)
+            for name, weight in COMPONENTS
+        ], batch_size=self.batch_size)
+        components = {}
+        for component_pk, subject_id in GradeComponent.objects.filter(subject__program__in=programs).values_list('pk', 'subject_id'):
+            components.setdefault(subject_id, []).append(component_pk)
+
+        periods = [period for period, _ in PERIOD_CHOICES]
+        entries = 0
+        batch = []
+        for enrollment in enrollments:
+            for component_pk in components[enrollment.subject_id]:
+                for period in periods:
+                    score = Decimal(min(100, max(50, round(self.random.gauss(84, 8), 2)))).quantize(Decimal('0.01'))
+                    batch.append(GradeEntry(student_id=enrollment.student_id, component_id=component_pk, period=period, score=score))
+            if len(batch) >= self.batch_size:
+                GradeEntry.objects.bulk_create(batch)
+                entries += len(batch)
+                batch = []
+        GradeEntry.objects.bulk_create(batch)
+        entries += len(batch)
+        finals = sum(compute_final_grades(program_id=program.pk) for program in programs)
+        return {'grade entries': entries, 'final grades': finals}
@@ -0,0 +1,35 @@
+# users/management/commands/sync_sqlite_replicas.py
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from main.db.replicas import copy_sqlite_replica
+
+
+class Command(BaseCommand):
+    help = (
+        "Local stand-in for replication: copies the SQLite primary into every replica in "
+        "DATABASE_REPLICAS (run with DB_ENGINE=sqlite DB_REPLICAS=replica.sqlite3). With "
+        "--every N it keeps copying every N seconds, so the replicas trail the primary by up "
+        "to N seconds; pick N above REPLICA_MAX_LAG to watch reads fall back to the primary."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, default=0, help="Repeat every N seconds until interrupted.")
+
+    def handle(self, *args, **options):
+        replicas = list(getattr(settings, 'DATABASE_REPLICAS', ()))
+        if not replicas:
+            raise CommandError("No replicas configured; set DB_REPLICAS.")
+        for alias in ['default', *replicas]:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f"{alias} is not a SQLite database; use real replication instead.")
+        while True:
+            for alias in replicas:
+                copy_sqlite_replica(alias)
+            self.stdout.write(f"Copied the primary to {', '.join(replicas)}")
+            if not options['every']:
+                return
+            time.sleep(options['every'])
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:07
+
+from django.db import migrations, models
+from django.db.models import Count
+
+# Duplicates listed in the error; the rest are counted.
+REPORTED_DUPLICATES = 50
+
+
+def blank_student_ids_to_null(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    User.objects.filter(student_id='').update(student_id=None)
+
+
+def check_duplicate_student_ids(apps, schema_editor):
+    """Fails with the accounts to fix, instead of the IntegrityError the unique index would raise."""
+    User = apps.get_model('users', 'User')
+    duplicates = list(
+        User.objects.filter(student_id__isnull=False)
+        .values('student_id').annotate(accounts=Count('id')).filter(accounts__gt=1)
+        .order_by('student_id').values_list('student_id', flat=True)
+    )
+    if not duplicates:
+        return
+    emails = {}
+    rows = User.objects.filter(student_id__in=duplicates[:REPORTED_DUPLICATES]).order_by('student_id', 'id')
+    for student_id, email in rows.values_list('student_id', 'email'):
+        emails.setdefault(student_id, []).append(email)
+    lines = [f"  {student_id}: {', '.join(accounts)}" for student_id, accounts in emails.items()]
+    if len(duplicates) > REPORTED_DUPLICATES:
+        lines.append(f"  ... and {len(duplicates) - REPORTED_DUPLICATES} more")
+    raise RuntimeError(
+        f"Cannot make users.User.student_id unique: {len(duplicates)} student ID(s) belong to more "
+        "than one account. Give each account its own ID (or clear it), then migrate again.\n" + '\n'.join(lines)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_user_program'),
+    ]
+
+    operations = [
+        migrations.RunPython(blank_student_ids_to_null, migrations.RunPython.noop),
+        migrations.RunPython(check_duplicate_student_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='user',
+            name='student_id',
+            field=models.CharField(blank=True, max_length=20, null=True, unique=True),
+        ),
+    ]
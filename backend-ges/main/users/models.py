@@ -1,7 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
-from django.utils.text import slugify
-import os
+from .passwords import hash_password
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -9,7 +8,10 @@ class CustomUserManager(BaseUserManager):
             raise ValueError("Users must have an email address")
         email = self.normalize_email(email)
         user = self.model(email=email, **extra_fields)
-        user.set_password(password)
+        if password is None:
+            user.set_unusable_password()
+        else:
+            user.password = hash_password(password)
         user.save(using=self._db)
         return user
 
@@ -19,11 +21,9 @@ class CustomUserManager(BaseUserManager):
         extra_fields.setdefault('is_superuser', True)
         return self.create_user(email, password, **extra_fields)
     
-def user_avatar_path(instance, filename):
-    # Sanitize filename by replacing spaces with underscores
-    base, ext = os.path.splitext(filename)
-    sanitized_filename = f"{slugify(base)}{ext}"
-    return f"avatars/{sanitized_filename}"
+def user_avatar_path(digest, size, ext):
+    # Content-addressed (see users.avatars): the path changes whenever the image does.
+    return f"avatars/{digest[:2]}/{digest}/{size}.{ext}"
 
 class User(AbstractBaseUser):
     first_name = models.CharField(max_length=50)
@@ -33,7 +33,7 @@ class User(AbstractBaseUser):
     username = models.CharField(max_length=150, unique=True)
     gender = models.CharField(max_length=10, choices=[('Male', 'Male'), ('Female', 'Female'), ('Other', 'Other')], default="Other")
     role = models.CharField(max_length=20, choices=[('teacher', 'Teacher'), ('student', 'Student'), ('admin', 'Admin')])
-    student_id = models.CharField(max_length=20, blank=True, null=True)
+    student_id = models.CharField(max_length=20, blank=True, null=True, unique=True)
     address = models.TextField(blank=True, null=True)
     contact_number = models.CharField(max_length=15, blank=True, null=True)
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
@@ -47,6 +47,12 @@ class User(AbstractBaseUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name']
 
+    def save(self, *args, **kwargs):
+        # Blank IDs are stored as NULL so the unique index only covers real student IDs.
+        if not self.student_id:
+            self.student_id = None
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.username
 
@@ -0,0 +1,84 @@
+# users/passwords.py
+"""
+Password hashing off the request thread.
+
+Hash computations run in a bounded thread pool (hashlib, argon2 and bcrypt all
+release the GIL while hashing), so at most LOGIN_HASH_WORKERS hashes run at once
+per process no matter how many requests arrive. Up to LOGIN_HASH_QUEUE_LIMIT more
+may wait; beyond that callers get LoginCapacityError and the view answers 503
+with Retry-After: RETRY_AFTER instead of letting requests pile up behind the
+CPU. That covers logins and registration, which hashes the new password here
+through `User.objects.create_user`.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, identify_hasher, make_password
+
+RETRY_AFTER = '1'  # seconds; a queued hash finishes in well under that
+
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+
+class LoginCapacityError(Exception):
+    pass
+
+
+def _pool():
+    global _executor, _slots
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                workers = getattr(settings, 'LOGIN_HASH_WORKERS', None) or os.cpu_count() or 1
+                queue_limit = getattr(settings, 'LOGIN_HASH_QUEUE_LIMIT', workers * 4)
+                _slots = threading.BoundedSemaphore(workers + queue_limit)
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+    return _executor
+
+
+def submit(fn, *args):
+    """Runs `fn(*args)` in the hashing pool and returns a Future."""
+    executor = _pool()
+    if not _slots.acquire(blocking=False):
+        raise LoginCapacityError("Too many sign-ins in progress, please retry.")
+    future = executor.submit(fn, *args)
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+def _verify(raw_password, encoded):
+    """Returns (valid, new_encoded); new_encoded is set when the stored hash is outdated."""
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False, None
+    if not hasher.verify(raw_password, encoded):
+        return False, None
+    preferred = get_hasher('default')
+    if hasher.algorithm != preferred.algorithm or preferred.must_update(encoded):
+        return True, make_password(raw_password)
+    return True, None
+
+
+def verify_password(user, raw_password):
+    """
+    Checks `raw_password` against `user` in the hashing pool. On success with an
+    outdated hash (different hasher or work factor), the new hash is stored with a
+    single-column UPDATE.
+    """
+    if not raw_password or not user.password:
+        return False
+    valid, new_encoded = submit(_verify, raw_password, user.password).result()
+    if new_encoded:
+        type(user).objects.filter(pk=user.pk).update(password=new_encoded)
+        user.password = new_encoded
+    return valid
+
+
+def hash_password(raw_password):
+    """make_password() in the hashing pool."""
+    return submit(make_password, raw_password).result()
@@ -1,12 +1,67 @@
 from rest_framework import serializers
+from .avatars import AvatarError, ProcessedAvatar, process_avatar, rendition_names, thumbnail_name
 from .models import User
 
-class UserSerializer(serializers.ModelSerializer):
+
+class AvatarField(serializers.FileField):
+    """
+    Takes an image upload and returns it processed by users.avatars (stored on save);
+    renders as the URL of the small thumbnail rather than the full-size image.
+    """
+    max_size = 2 * 1024 * 1024  # 2MB
+
+    def to_internal_value(self, data):
+        upload = super().to_internal_value(data)
+        if upload.size > self.max_size:
+            raise serializers.ValidationError("Avatar file size must be under 2MB.")
+        try:
+            return process_avatar(upload)
+        except AvatarError as e:
+            raise serializers.ValidationError(str(e))
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        return self.url(thumbnail_name(value.name))
+
+    def url(self, name):
+        url = User._meta.get_field('avatar').storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+
+class AvatarSerializerMixin(serializers.Serializer):
+    """`avatar` (thumbnail URL, writable) plus `avatar_renditions`: {size: {format: URL}} for srcset."""
+    avatar = AvatarField(required=False, allow_null=True)
+    avatar_renditions = serializers.SerializerMethodField()
+
+    def get_avatar_renditions(self, user):
+        field = self.fields['avatar']
+        return {
+            str(size): {ext: field.url(name) for ext, name in formats.items()}
+            for size, formats in rendition_names(user.avatar.name if user.avatar else None).items()
+        }
+
+    def _store_avatar(self, validated_data):
+        avatar = validated_data.get('avatar')
+        if isinstance(avatar, ProcessedAvatar):
+            validated_data['avatar'] = avatar.store(User._meta.get_field('avatar').storage)
+
+    def create(self, validated_data):
+        self._store_avatar(validated_data)
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        self._store_avatar(validated_data)
+        return super().update(instance, validated_data)
+
+
+class UserSerializer(AvatarSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = [
             'id', 'first_name', 'middle_name', 'last_name', 'email', 'username',
-            'role', 'student_id', 'gender', 'address', 'contact_number', 'avatar'
+            'role', 'student_id', 'gender', 'address', 'contact_number', 'avatar', 'avatar_renditions'
         ]
         read_only_fields = ['id', 'role', 'email']
 
@@ -18,9 +73,3 @@ class UserSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Only students can have a student ID.")
         return value
 
-    def validate_avatar(self, value):
-        if value:
-            max_size = 2 * 1024 * 1024  # 2MB
-            if value.size > max_size:
-                raise serializers.ValidationError("Avatar file size must be under 2MB.")
-        return value
\ No newline at end of file
@@ -0,0 +1,15 @@
+# users/signals.py
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import User
+from .authentication import user_cache_key
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_user(sender, instance, **kwargs):
+    # After commit, or a request racing the write could cache the old claims again.
+    key = user_cache_key(instance.pk)
+    transaction.on_commit(lambda: caches['default'].delete(key))
@@ -1,3 +1,196 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APIClient
+
+from grades.models import FinalGrade, GradeEntry
+from programs.conflicts import schedule_index
+from programs.models import Schedule
+from students.models import Student
+from .authentication import user_cache_key
+from .models import User
+from .tokens import ClaimsRefreshToken
+
+
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        caches['catalog'].clear()
+        self.teacher = User.objects.create_user(
+            email='teacher@example.com', password='pass12345', username='teacher',
+            first_name='T', last_name='Eacher', role='teacher'
+        )
+        self.client = APIClient()
+        token = ClaimsRefreshToken.for_user(self.teacher).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_permission_check_needs_no_user_query(self):
+        self.client.get('/api/programs/programs/')  # warm the catalog cache
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/programs/programs/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_profile_loads_row_once_per_request_and_caches_only_claims(self):
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get('/api/users/me/')
+        self.assertEqual(response.data['email'], 'teacher@example.com')
+        self.assertEqual(len(first.captured_queries), 1)  # the row, which also fills the claims entry
+        with CaptureQueriesContext(connection) as second:
+            self.client.get('/api/users/me/')
+        self.assertEqual(len(second.captured_queries), 1)
+        self.assertEqual(caches['default'].get(user_cache_key(self.teacher.pk)), {
+            'role': 'teacher', 'is_superuser': False, 'program_id': None, 'is_active': True,
+        })
+
+    def test_deactivated_user_is_rejected_on_the_next_request(self):
+        self.assertEqual(self.client.get('/api/programs/programs/').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teacher.is_active = False
+            self.teacher.save()
+        response = self.client.get('/api/programs/programs/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['detail'].code, 'user_inactive')
+
+        token = ClaimsRefreshToken.for_user(self.teacher).access_token
+        self.assertIs(token['is_active'], False)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_profile_update_writes_through_and_invalidates(self):
+        response = self.client.put('/api/users/me/', {'first_name': 'Tina'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.teacher.refresh_from_db()
+        self.assertEqual(self.teacher.first_name, 'Tina')
+        self.assertEqual(self.client.get('/api/users/me/').data['first_name'], 'Tina')
+
+    def test_student_claims_are_rejected_by_teacher_views(self):
+        student = User.objects.create_user(
+            email='s@example.com', password='pass12345', username='stud',
+            first_name='S', last_name='Tudent', role='student', student_id='S1'
+        )
+        token = ClaimsRefreshToken.for_user(student).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.client.get('/api/programs/programs/').status_code, 403)
+
+
+@override_settings(ROOT_URLCONF='main.asgi_urls')
+class AsyncProfileTests(TestCase):
+    async def test_profile_served_by_async_view(self):
+        await caches['default'].aclear()
+        user = await User.objects.acreate(email='t@example.com', username='t', first_name='Tess', role='teacher')
+        token = ClaimsRefreshToken.for_user(user).access_token
+        response = await self.async_client.get('/api/users/me/', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['first_name'], 'Tess')
+
+
+class LoginPasswordTests(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user(
+            email='s@example.com', password='pass12345', username='stud',
+            first_name='S', last_name='Tudent', role='student', student_id='S1'
+        )
+
+    def login(self, password):
+        return APIClient().post('/api/students/login/', {'student_id': 'S1', 'password': password}, format='json')
+
+    def test_login_issues_claims_token(self):
+        response = self.login('pass12345')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user']['student_id'], 'S1')
+
+    def test_wrong_password_rejected(self):
+        self.assertEqual(self.login('nope').status_code, 401)
+
+    def test_outdated_hash_is_upgraded_on_login(self):
+        User.objects.filter(pk=self.student.pk).update(password=make_password('pass12345', hasher='pbkdf2_sha1'))
+        self.assertEqual(self.login('pass12345').status_code, 200)
+        self.student.refresh_from_db()
+        self.assertTrue(self.student.password.startswith('pbkdf2_sha256$'))
+        self.assertTrue(self.student.check_password('pass12345'))
+
+
+class AvatarUploadTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media, AVATAR_SIZES=(32, 128), AVATAR_THUMBNAIL_SIZE=32)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user(email='t@example.com', password='pass12345', username='t', role='teacher')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, data, name='me.jpg'):
+        return self.client.put('/api/users/me/', {'avatar': SimpleUploadedFile(name, data)}, format='multipart')
+
+    def jpeg_with_exif(self):
+        image = Image.new('RGB', (400, 300), 'red')
+        exif = Image.Exif()
+        exif[0x010F] = 'CameraMaker'  # Make
+        out = BytesIO()
+        image.save(out, 'JPEG', exif=exif)
+        return out.getvalue()
+
+    def test_upload_is_stored_as_stripped_square_renditions(self):
+        self.assertEqual(self.upload(self.jpeg_with_exif()).status_code, 200)
+        self.user.refresh_from_db()
+        self.assertRegex(self.user.avatar.name, r'^avatars/[0-9a-f]{2}/[0-9a-f]{64}/128\.jpg$')
+
+        folder = os.path.dirname(os.path.join(self.media, self.user.avatar.name))
+        self.assertEqual(sorted(os.listdir(folder)), ['128.jpg', '128.webp', '32.jpg', '32.webp'])
+        with Image.open(os.path.join(folder, '32.webp')) as thumb:
+            self.assertEqual(thumb.size, (32, 32))
+            self.assertNotIn('exif', thumb.info)
+
+        data = self.client.get('/api/users/me/').data
+        self.assertTrue(data['avatar'].endswith('/32.jpg'))
+        self.assertEqual(set(data['avatar_renditions']), {'32', '128'})
+
+    def test_identical_uploads_share_files(self):
+        other = User.objects.create_user(email='o@example.com', password='pass12345', username='o', role='teacher')
+        self.upload(self.jpeg_with_exif())
+        self.client.force_authenticate(other)
+        self.upload(self.jpeg_with_exif(), name='other.jpg')
+        self.user.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.user.avatar.name, other.avatar.name)
+
+    def test_non_image_is_rejected(self):
+        with self.assertLogs('users.views', 'ERROR'):
+            response = self.upload(b'not an image', name='me.png')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('avatar', response.data)
+
+    @override_settings(AVATAR_MAX_PIXELS=100)
+    def test_oversized_dimensions_are_rejected(self):
+        with self.assertLogs('users.views', 'ERROR'):
+            self.assertEqual(self.upload(self.jpeg_with_exif()).status_code, 400)
+
+
+class SeedUniversityTests(TestCase):
+    def test_seeds_clash_free_data_and_clears_it(self):
+        call_command('seed_university', programs=2, subjects=12, students=30, teachers=4, enrollments=5, stdout=StringIO())
+        self.assertEqual(Student.objects.filter(user__email__endswith='@seed.invalid').count(), 30)
+        self.assertEqual(Student.enrolled_subjects.through.objects.count(), 150)
+        self.assertEqual(GradeEntry.objects.count(), 150 * 3 * 3)
+        self.assertEqual(FinalGrade.objects.count(), 150)
+        self.assertEqual(list(schedule_index().all_conflicts()), [])
+        login = {'student_id': 'SEED-000001', 'password': 'bench-password'}
+        self.assertEqual(APIClient().post('/api/students/login/', login, format='json').status_code, 200)
+
+        call_command('seed_university', programs=0, clear=True, stdout=StringIO())
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(Schedule.objects.exists())
@@ -0,0 +1,14 @@
+# users/tokens.py
+from rest_framework_simplejwt.tokens import RefreshToken
+
+# User attributes copied into every token so permission checks can run on the
+# claims alone (see users.authentication.ClaimsJWTAuthentication).
+USER_CLAIMS = ('role', 'is_superuser', 'program_id', 'is_active')
+
+class ClaimsRefreshToken(RefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
@@ -22,8 +22,8 @@ class UserProfileView(APIView):
             if serializer.is_valid():
                 serializer.save()
                 return Response({'message': 'Profile updated successfully'}, status=status.HTTP_200_OK)
-            logger.error(f"Serializer errors: {serializer.errors}")
+            logger.error("Serializer errors: %s", serializer.errors)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            logger.error(f"Error updating profile: {str(e)}")
+            logger.error("Error updating profile: %s", e)
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file